@@ -0,0 +1,160 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from dataclasses import asdict
+from typing import Any, Dict, Optional
+
+from backtest_engine import BacktestEngine
+from strategies import BacktestConfig, StrategyContext
+from visualization import format_backtest_result
+
+
+class BacktestResultCache:
+    """回测结果磁盘缓存
+
+    缓存键为 (回测参数, 回测配置, 数据版本) 的 sha256：
+    - 回测参数: StrategyContext.to_dict + 上下文全部字段（策略类型、各腿参数）
+    - 回测配置: BacktestConfig 全部字段
+    - 数据版本: 该ETF在 option_daily / etf_daily 中的最大日期和行数，导入新行情后自动失效
+
+    每个结果一个 JSON 文件（文件名以ETF代码为前缀），按访问时间做 LRU 淘汰。
+    """
+
+    def __init__(self, cache_dir: str = os.path.join('cache', 'backtest'),
+                 db_path: str = os.path.join('db', 'market_data.db'),
+                 max_entries: int = 200):
+        self.cache_dir = cache_dir
+        self.db_path = db_path
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_data_version(self, etf_code: str) -> Dict[str, Any]:
+        """获取ETF行情数据版本指纹"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            version = {}
+            for table in ('option_daily', 'etf_daily'):
+                row = conn.execute(
+                    f"SELECT MAX(date), COUNT(*) FROM {table} WHERE etf_code = ?", (etf_code,)
+                ).fetchone()
+                version[table] = [row[0], row[1]]
+            return version
+        finally:
+            conn.close()
+
+    def make_key(self, context: StrategyContext, config: BacktestConfig,
+                 data_version: Dict[str, Any]) -> str:
+        """生成缓存键"""
+        # 各策略上下文把具体参数存放在 sell_put_value 等字段中（strategy_params 可能为空），
+        # 因此在 to_dict 基础上合并上下文全部字段
+        context_fields = {**vars(context), **context.to_dict(None)}
+        context_fields['strategy_type'] = context.strategy_type.name if context.strategy_type else None
+        payload = {
+            'context': context_fields,
+            'config': asdict(config),
+            'data_version': data_version
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, etf_code: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{etf_code}_{key}.json")
+
+    def get(self, etf_code: str, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，命中时刷新访问时间"""
+        path = self._path(etf_code, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path, None)
+            return entry['result']
+        except (OSError, ValueError, KeyError):
+            # 文件损坏或已被并发淘汰，视为未命中
+            return None
+
+    def put(self, etf_code: str, key: str, data_version: Dict[str, Any], result: Dict[str, Any]):
+        """写入缓存，同时清理该ETF旧数据版本的结果并执行 LRU 淘汰"""
+        path = self._path(etf_code, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'data_version': data_version, 'result': result}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            # 写入失败（磁盘满、权限、无法序列化）时不留下临时文件
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._purge_stale(etf_code, data_version, keep=path)
+        self._evict()
+
+    def _purge_stale(self, etf_code: str, data_version: Dict[str, Any], keep: str):
+        """删除该ETF数据版本已过期的缓存"""
+        for path in glob.glob(os.path.join(self.cache_dir, f"{etf_code}_*.json")):
+            if path == keep:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('data_version') != data_version:
+                        os.remove(path)
+            except (OSError, ValueError):
+                continue
+
+    def _evict(self):
+        """超过容量时按最近访问时间淘汰"""
+        paths = glob.glob(os.path.join(self.cache_dir, '*.json'))
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in paths[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+    def invalidate(self, etf_code: Optional[str] = None) -> int:
+        """手动清除缓存，etf_code 为空时清除全部"""
+        pattern = f"{etf_code}_*.json" if etf_code else '*.json'
+        removed = 0
+        for path in glob.glob(os.path.join(self.cache_dir, pattern)):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+def run_backtest_cached(context: StrategyContext, config: BacktestConfig,
+                        cache: Optional[BacktestResultCache] = None) -> Optional[Dict[str, Any]]:
+    """运行回测并返回格式化结果，命中缓存时直接返回
+
+    Returns:
+        Optional[Dict]: format_backtest_result 的结果，回测失败返回None
+    """
+    cache = cache or BacktestResultCache()
+    data_version = cache.get_data_version(context.etf_code)
+    key = cache.make_key(context, config, data_version)
+
+    cached = cache.get(context.etf_code, key)
+    if cached is not None:
+        return cached
+
+    engine = BacktestEngine(config)
+    result = engine.run_backtest(context)
+    if not result:
+        return None
+
+    formatted_result = format_backtest_result(result)
+    # 缓存写入失败不影响已经算出的回测结果
+    try:
+        cache.put(context.etf_code, key, data_version, formatted_result)
+    except Exception as e:
+        logging.warning(f"Backtest cache write failed for {context.etf_code}: {e}")
+    return formatted_result
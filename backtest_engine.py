@@ -9,9 +9,11 @@ from logger import TradeLogger
 from strategies import BacktestConfig, StrategyContext
 from strategies.base import OptionStrategy
 from strategies.factory import StrategyFactory
+from strategies.fast_simulator import FastOptionSimulator
+from strategies.option_chain import OptionChainIndex
 from strategies.types import BacktestResult
 from strategy_analyzer import StrategyAnalyzer
-from utils import get_trading_dates
+from utils import ExpiryCalendar, get_trading_dates
 from visualization import StrategyVisualizer
 
 
@@ -26,6 +28,8 @@ class BacktestEngine:
         self.config = config
         self.option_data = None
         self.etf_data = None
+        self.option_chain: Optional[OptionChainIndex] = None
+        self.expiry_calendar: Optional[ExpiryCalendar] = None
         self.logger = TradeLogger()
         self.visualizer = StrategyVisualizer()
         
@@ -66,13 +70,40 @@ class BacktestEngine:
         Args:
             context: 回测参数对象
             
+        Returns:
+            Optional[BacktestResult]: 回测结果对象，如果回测失败则返回None
+        """
+        if not self.load_data(context):
+            return None
+        return self.simulate(context)
+
+    def set_data(self, option_data: pd.DataFrame, etf_data: pd.DataFrame,
+                 option_chain: Optional[OptionChainIndex] = None,
+                 expiry_calendar: Optional[ExpiryCalendar] = None):
+        """直接注入已加载的行情数据（参数扫描时多次模拟共享同一份数据）
+
+        Args:
+            option_data: 期权数据（已完成列名转换）
+            etf_data: ETF数据（以日期为索引）
+            option_chain: 按日分区的期权链索引，为空时自动构建
+            expiry_calendar: 到期日历，为空时按期权链交易日构建
+        """
+        self.option_data = option_data
+        self.etf_data = etf_data
+        self.option_chain = option_chain if option_chain is not None else OptionChainIndex(option_data)
+        self.expiry_calendar = expiry_calendar if expiry_calendar is not None else ExpiryCalendar(self.option_chain.dates)
+
+    def simulate(self, context: StrategyContext, create_plots: bool = True) -> Optional[BacktestResult]:
+        """在已加载的数据上执行一次回测模拟
+        
+        Args:
+            context: 回测参数对象
+            create_plots: 是否生成可视化图表，参数扫描时关闭以节省时间
+            
         Returns:
             Optional[BacktestResult]: 回测结果对象，如果回测失败则返回None
         """
         try:
-            if not self.load_data(context):
-                return None
-                
             # 创建策略实例
             strategy = self._create_strategy(context)
             if not strategy:
@@ -80,6 +111,8 @@ class BacktestEngine:
                 
             # 设置策略的期权数据和初始资金
             strategy.set_option_data(self.option_data)
+            strategy.set_option_chain(self.option_chain)
+            strategy.set_expiry_calendar(self.expiry_calendar)
             strategy.cash = self.config.initial_capital  # 设置初始资金
             
             # 获取交易日期列表
@@ -102,30 +135,12 @@ class BacktestEngine:
                 "结束日期": trading_dates[-1].strftime('%Y-%m-%d')
             })
             
-            # 遍历每个交易日
-            daily_portfolio_values = {}
-            for current_date in trading_dates:
-                # 获取当日市场数据
-                market_data = {
-                    'etf': self.etf_data[self.etf_data.index == current_date],
-                    'option': self.option_data[self.option_data['日期'] == current_date]
-                }
-                
-                # 执行策略
-                strategy.execute(current_date, market_data)
-                
-                # 计算当日投资组合价值
-                portfolio_value = strategy.calculate_portfolio_value(current_date)
-                
-                # 记录每日投资组合状态
-                self.logger.log_daily_portfolio(current_date, {
-                    'cash': strategy.cash,
-                    'portfolio_value': portfolio_value,
-                    'positions': len(strategy.positions)
-                })
-                
-                # 记录每日投资组合价值
-                daily_portfolio_values[current_date] = portfolio_value
+            if self.config.fast_path and FastOptionSimulator.supports(strategy):
+                # 月度滚动的价差/单腿策略走数组化快速路径，结果与逐日循环一致
+                simulator = FastOptionSimulator(self.option_chain, self.etf_data)
+                daily_portfolio_values = simulator.run(strategy, trading_dates)
+            else:
+                daily_portfolio_values = self._simulate_daily(strategy, trading_dates)
 
             # 分析策略结果
             analysis_results = StrategyAnalyzer.calculate_metrics(
@@ -143,13 +158,15 @@ class BacktestEngine:
             })
             
             # 生成可视化图表
-            plots = self.visualizer.create_plots(
-                daily_portfolio_values,
-                strategy.trades,
-                context.etf_code,
-                self.etf_data,
-                analysis_results
-            )
+            plots = None
+            if create_plots:
+                plots = self.visualizer.create_plots(
+                    daily_portfolio_values,
+                    strategy.trades,
+                    context.etf_code,
+                    self.etf_data,
+                    analysis_results
+                )
             
             # 返回回测结果
             return BacktestResult(
@@ -169,6 +186,41 @@ class BacktestEngine:
             print(traceback.format_exc())
             return None
 
+    def _simulate_daily(self, strategy: OptionStrategy, trading_dates) -> dict:
+        """逐日执行策略并计算投资组合价值"""
+        # ETF日期 -> 行号，逐日取数时直接切片
+        etf_positions = {date: i for i, date in enumerate(self.etf_data.index)}
+        empty_etf = self.etf_data.iloc[0:0]
+
+        # 遍历每个交易日
+        daily_portfolio_values = {}
+        for current_date in trading_dates:
+            # 获取当日市场数据（按日预分区，避免每日全表扫描）
+            etf_pos = etf_positions.get(current_date)
+            market_data = {
+                'etf': self.etf_data.iloc[etf_pos:etf_pos + 1] if etf_pos is not None else empty_etf,
+                'option': self.option_chain.get_day(current_date),
+                'chain': self.option_chain
+            }
+
+            # 执行策略
+            strategy.execute(current_date, market_data)
+
+            # 计算当日投资组合价值
+            portfolio_value = strategy.calculate_portfolio_value(current_date)
+
+            # 记录每日投资组合状态
+            self.logger.log_daily_portfolio(current_date, {
+                'cash': strategy.cash,
+                'portfolio_value': portfolio_value,
+                'positions': len(strategy.positions)
+            })
+
+            # 记录每日投资组合价值
+            daily_portfolio_values[current_date] = portfolio_value
+
+        return daily_portfolio_values
+
     def load_data(self, context: StrategyContext) -> bool:
         """加载数据
         
@@ -245,6 +297,8 @@ class BacktestEngine:
                 'option_type': '认购认沽'
             })
             # self.option_data = self.option_data.set_index('日期')
+            self.option_chain = OptionChainIndex(self.option_data)
+            self.expiry_calendar = ExpiryCalendar.for_etf(context.etf_code, self.option_chain.dates)
             
             if self.option_data.empty:
                 raise ValueError(
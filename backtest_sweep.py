@@ -0,0 +1,149 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from backtest_engine import BacktestEngine
+from strategies import BacktestConfig, StrategyContextFactory
+
+# 比较表中输出的核心指标：(输出字段, 指标分组, 指标名)
+HEADLINE_METRICS = [
+    ('total_return', 'portfolio_metrics', 'total_return'),
+    ('annual_return', 'portfolio_metrics', 'annual_return'),
+    ('annual_volatility', 'portfolio_metrics', 'annual_volatility'),
+    ('sharpe_ratio', 'portfolio_metrics', 'sharpe_ratio'),
+    ('max_drawdown', 'portfolio_metrics', 'max_drawdown'),
+    ('total_trades', 'trade_metrics', 'total_trades'),
+    ('win_rate', 'trade_metrics', 'win_rate'),
+    ('total_pnl', 'trade_metrics', 'total_pnl'),
+]
+
+# 工作进程内复用的回测引擎（由进程池 initializer 创建）
+_worker_engine: Optional[BacktestEngine] = None
+
+
+def _init_worker(config: BacktestConfig, option_data: pd.DataFrame, etf_data: pd.DataFrame):
+    """进程池初始化：每个工作进程只接收一次只读行情数据并构建期权链索引"""
+    global _worker_engine
+    _worker_engine = BacktestEngine(config)
+    _worker_engine.set_data(option_data, etf_data)
+
+
+def _run_combo(base_data: Dict[str, Any], strategy_params: Dict[str, Any]) -> Dict[str, Any]:
+    """在工作进程中执行单个参数组合"""
+    return _simulate_combo(_worker_engine, base_data, strategy_params)
+
+
+def _simulate_combo(engine: BacktestEngine, base_data: Dict[str, Any],
+                    strategy_params: Dict[str, Any]) -> Dict[str, Any]:
+    """使用已加载数据的引擎模拟一个参数组合，返回比较表的一行"""
+    row = {'strategy_params': strategy_params}
+    try:
+        context = StrategyContextFactory.create_context({**base_data, 'strategy_params': strategy_params})
+        result = engine.simulate(context, create_plots=False)
+        if result is None:
+            row['error'] = '回测执行失败，未返回结果'
+            return row
+
+        row['strategy_type'] = result.strategy_type
+        for field_name, group, metric in HEADLINE_METRICS:
+            value = result.analysis.get(group, {}).get(metric, 0)
+            row[field_name] = float(value) if value is not None else None
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+class ParameterSweep:
+    """期权策略参数扫描
+
+    行情数据只从数据库加载一次，所有参数组合共享同一份只读数据，
+    通过进程池并行执行各组合的模拟，最后汇总核心指标的比较表
+    """
+
+    def __init__(self, config: Optional[BacktestConfig] = None, max_workers: Optional[int] = None):
+        """
+        Args:
+            config: 回测配置，默认使用 BacktestConfig()
+            max_workers: 进程数，默认为CPU核数；为1时在当前进程内顺序执行
+        """
+        self.config = config or BacktestConfig()
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def expand_grid(param_grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """将参数网格展开为参数组合列表
+
+        Args:
+            param_grid: 参数名 -> 候选值列表，如 {'put_sell_delta': [-0.3, -0.4], 'put_buy_delta': [-0.1, -0.2]}
+        """
+        if not param_grid:
+            raise ValueError("参数网格不能为空")
+        names = list(param_grid.keys())
+        values = [v if isinstance(v, (list, tuple)) else [v] for v in param_grid.values()]
+        empty = [name for name, v in zip(names, values) if not v]
+        if empty:
+            raise ValueError(f"参数候选值不能为空: {empty}")
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+    def run(self, base_data: Dict[str, Any], param_grid: Dict[str, List[Any]],
+            sort_by: Optional[str] = None) -> Dict[str, Any]:
+        """执行参数扫描
+
+        Args:
+            base_data: 公共回测参数，包含 etf_code、start_date、end_date（格式同 /api/backtest）
+            param_grid: 策略参数网格
+            sort_by: 排序指标（降序），如 'sharpe_ratio'；为空时保持网格顺序
+
+        Returns:
+            Dict: {'results': 比较表, 'combinations': 组合数, 'load_time': 加载耗时, 'elapsed': 总耗时}
+        """
+        start_time = time.time()
+        combos = self.expand_grid(param_grid)
+        base_data = {k: v for k, v in base_data.items() if k not in ('strategy_params', 'param_grid')}
+
+        # 用第一个组合确定策略类型，并只加载一次行情数据
+        context = StrategyContextFactory.create_context({**base_data, 'strategy_params': combos[0]})
+        engine = BacktestEngine(self.config)
+        if not engine.load_data(context):
+            raise ValueError("加载回测数据失败")
+
+        # 加载时可能补全了日期范围，后续组合统一使用
+        base_data['start_date'] = pd.Timestamp(context.start_date).strftime('%Y-%m-%d')
+        base_data['end_date'] = pd.Timestamp(context.end_date).strftime('%Y-%m-%d')
+        load_time = time.time() - start_time
+
+        workers = min(self.max_workers, len(combos))
+        if workers <= 1:
+            results = [_simulate_combo(engine, base_data, combo) for combo in combos]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.config, engine.option_data, engine.etf_data)
+            ) as executor:
+                results = list(executor.map(
+                    _run_combo,
+                    itertools.repeat(base_data),
+                    combos,
+                    chunksize=max(1, len(combos) // (workers * 4))
+                ))
+
+        if sort_by:
+            results.sort(
+                key=lambda r: r.get(sort_by) if r.get(sort_by) is not None else float('-inf'),
+                reverse=True
+            )
+
+        return {
+            'results': results,
+            'combinations': len(combos),
+            'workers': workers,
+            'load_time': round(load_time, 3),
+            'elapsed': round(time.time() - start_time, 3),
+            'finished_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
@@ -1,82 +1,191 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from contextlib import contextmanager
 
+# 每个连接缓存的预编译语句数（sqlite3 内置的语句缓存，默认 128）
+STATEMENT_CACHE_SIZE = 256
+
+# 连接建立时设置的 PRAGMA
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',          # 读写不互斥，多个请求线程可同时读
+    'PRAGMA synchronous=NORMAL',        # WAL 下 NORMAL 即可保证一致性，写入少一次 fsync
+    'PRAGMA cache_size=-32000',         # 页缓存 32MB
+    'PRAGMA mmap_size=268435456',       # 256MB 内存映射读取
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',
+)
+
+# 线程本地连接池：{db_path: 连接}，每个线程每个数据库文件一个持久连接
+_local = threading.local()
+
+# 本进程内已执行过的建表初始化
+_schema_lock = threading.Lock()
+_initialized_schemas = set()
+
+
+def _thread_state() -> Dict[str, Any]:
+    if not hasattr(_local, 'connections'):
+        _local.connections = {}
+        _local.tx_depth = {}
+    return _local.__dict__
+
+
 class Database:
     def __init__(self, db_path: str):
-        """初始化数据库连接
-        
+        """初始化数据库访问对象（连接按线程复用，不在此处建立）
+
         Args:
             db_path: 数据库文件路径
         """
         self.db_path = db_path
         self._ensure_db_directory()
-    
+
     def _ensure_db_directory(self):
         """确保数据库目录存在"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-    
+
+    def _connect(self) -> sqlite3.Connection:
+        """当前线程的持久连接，首次使用时建立并设置 PRAGMA"""
+        state = _thread_state()
+        conn = state['connections'].get(self.db_path)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            state['connections'][self.db_path] = conn
+            state['tx_depth'][self.db_path] = 0
+        return conn
+
+    @property
+    def in_transaction(self) -> bool:
+        """当前线程是否处于 transaction() 上下文中"""
+        return _thread_state()['tx_depth'].get(self.db_path, 0) > 0
+
     @contextmanager
     def get_connection(self):
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """获取当前线程的数据库连接（持久连接，退出上下文时不关闭）"""
+        yield self._connect()
+
+    @contextmanager
+    def transaction(self):
+        """事务上下文：其中的 execute / execute_many 不再逐条提交，正常退出时统一提交，异常时回滚。
+        可嵌套，只有最外层负责提交。
+
+        Example:
+            with db.transaction():
+                db.execute('DELETE FROM t WHERE k = ?', (k,))
+                db.execute_many('INSERT INTO t VALUES (?, ?)', rows)
+        """
+        conn = self._connect()
+        depth = _thread_state()['tx_depth']
+        depth[self.db_path] += 1
         try:
             yield conn
-        finally:
-            conn.close()
-    
+        except BaseException:
+            depth[self.db_path] -= 1
+            if depth[self.db_path] == 0:
+                conn.rollback()
+            raise
+        else:
+            depth[self.db_path] -= 1
+            if depth[self.db_path] == 0:
+                conn.commit()
+
+    def _autocommit(self, conn: sqlite3.Connection):
+        """事务上下文之外的写操作立即提交"""
+        if not self.in_transaction:
+            conn.commit()
+
+    def init_schema_once(self, key: str, init_func: Callable[[], None]):
+        """同一数据库文件的建表 / 迁移 (init_func) 在本进程内只执行一次
+
+        Args:
+            key: 初始化标识，通常为类名
+            init_func: 执行建表语句的函数
+        """
+        schema_key = (os.path.abspath(self.db_path), key)
+        if schema_key in _initialized_schemas:
+            return
+        with _schema_lock:
+            if schema_key in _initialized_schemas:
+                return
+            with self.transaction():
+                init_func()
+            _initialized_schemas.add(schema_key)
+
     def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
         """执行SQL语句
-        
+
         Args:
             query: SQL查询语句
             params: 查询参数
-            
+
         Returns:
             sqlite3.Cursor: 数据库游标对象，可用于获取lastrowid等信息
         """
-        with self.get_connection() as conn:
-            with conn:  # 自动处理事务
-                cursor = conn.execute(query, params)
-                return cursor
-    
+        conn = self._connect()
+        try:
+            cursor = conn.execute(query, params)
+        except Exception:
+            if not self.in_transaction:
+                conn.rollback()
+            raise
+        self._autocommit(conn)
+        return cursor
+
     def execute_insert(self, query: str, params: tuple = ()) -> int:
         """执行插入语句并返回自增ID
-        
+
         Args:
             query: SQL插入语句
             params: 参数
-            
+
         Returns:
             int: lastrowid
         """
-        with self.get_connection() as conn:
-            with conn:
-                cursor = conn.execute(query, params)
-                return cursor.lastrowid
+        return self.execute(query, params).lastrowid
 
     def execute_many(self, query: str, params_list: List[tuple]) -> None:
         """执行多条SQL语句"""
-        with self.get_connection() as conn:
-            with conn:  # 自动处理事务
-                conn.executemany(query, params_list)
-    
+        conn = self._connect()
+        try:
+            conn.executemany(query, params_list)
+        except Exception:
+            if not self.in_transaction:
+                conn.rollback()
+            raise
+        self._autocommit(conn)
+
     def fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
         """获取单条记录"""
-        with self.get_connection() as conn:
-            cursor = conn.execute(query, params)
-            return cursor.fetchone()
-    
+        return self._connect().execute(query, params).fetchone()
+
     def fetch_all(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """获取所有记录"""
-        with self.get_connection() as conn:
-            cursor = conn.execute(query, params)
-            return cursor.fetchall() 
-    
+        return self._connect().execute(query, params).fetchall()
+
     def commit(self):
-        """提交"""
-        with self.get_connection() as conn:
-            conn.commit()
\ No newline at end of file
+        """提交当前线程连接上未提交的修改（事务上下文中由最外层统一提交）"""
+        if not self.in_transaction:
+            self._connect().commit()
+
+    def close(self):
+        """关闭当前线程在该数据库上的连接"""
+        state = _thread_state()
+        conn = state['connections'].pop(self.db_path, None)
+        state['tx_depth'].pop(self.db_path, None)
+        if conn is not None:
+            conn.close()
+
+    @staticmethod
+    def close_all():
+        """关闭当前线程持有的全部连接"""
+        state = _thread_state()
+        for conn in state['connections'].values():
+            conn.close()
+        state['connections'].clear()
+        state['tx_depth'].clear()
@@ -1,18 +1,20 @@
 import sqlite3
 import logging
 from db.config import HPC_DB
+from db.database import Database
 
 class HPCDatabase:
     def __init__(self):
         self.db_path = HPC_DB
-        self.init_tables()
+        self.db = Database(self.db_path)
+        self.db.init_schema_once('HPCDatabase', self.init_tables)
 
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """当前线程的持久连接（由 Database 管理，调用方不要关闭）"""
+        return self.db._connect()
 
     def init_tables(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         # 1. 策略实例表 (Strategy Instance)
         # 用于管理不同的跟投计划，如 "长赢计划", "螺丝钉" 等
@@ -85,133 +87,76 @@ class HPCDatabase:
             for i, d in enumerate(defaults):
                 cursor.execute("INSERT INTO hpc_categories (name, display_order) VALUES (?, ?)", (d, i))
 
-        conn.commit()
-        conn.close()
         logging.info("HPC tables initialized.")
 
     # --- Category CRUD ---
     def get_categories(self):
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        rows = cursor.execute("SELECT * FROM hpc_categories ORDER BY display_order, id").fetchall()
-        conn.close()
+        rows = self.db.fetch_all("SELECT * FROM hpc_categories ORDER BY display_order, id")
         return [dict(row) for row in rows]
 
     def add_category(self, name):
-        conn = self.get_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute("INSERT INTO hpc_categories (name) VALUES (?)", (name,))
-            conn.commit()
+            self.db.execute("INSERT INTO hpc_categories (name) VALUES (?)", (name,))
             return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
 
     def delete_category(self, cid):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM hpc_categories WHERE id=?", (cid,))
-        conn.commit()
-        conn.close()
+        self.db.execute("DELETE FROM hpc_categories WHERE id=?", (cid,))
 
     # --- Strategy CRUD ---
     def create_strategy(self, name, equity, url=""):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO hpc_strategies (name, current_equity, source_url) VALUES (?, ?, ?)", 
-                       (name, equity, url))
-        sid = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return sid
+        return self.db.execute_insert("INSERT INTO hpc_strategies (name, current_equity, source_url) VALUES (?, ?, ?)", 
+                                      (name, equity, url))
 
     def get_all_strategies(self):
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        rows = cursor.execute("SELECT * FROM hpc_strategies ORDER BY created_at DESC").fetchall()
-        conn.close()
+        rows = self.db.fetch_all("SELECT * FROM hpc_strategies ORDER BY created_at DESC")
         return [dict(row) for row in rows]
     
     def get_strategy(self, sid):
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        row = cursor.execute("SELECT * FROM hpc_strategies WHERE id=?", (sid,)).fetchone()
-        conn.close()
+        row = self.db.fetch_one("SELECT * FROM hpc_strategies WHERE id=?", (sid,))
         return dict(row) if row else None
 
     def update_strategy_equity(self, sid, equity):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE hpc_strategies SET current_equity = ? WHERE id = ?", (equity, sid))
-        conn.commit()
-        conn.close()
+        self.db.execute("UPDATE hpc_strategies SET current_equity = ? WHERE id = ?", (equity, sid))
 
     # --- Virtual Holdings CRUD ---
     def upsert_virtual_holding(self, strategy_id, code, name, shares, nav, source='MANUAL', type='', weight=0, cat2=''):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Check if exists
-        exist = cursor.execute("SELECT id FROM hpc_virtual_holdings WHERE strategy_id=? AND target_code=?", (strategy_id, code)).fetchone()
-        
-        if exist:
-            cursor.execute('''
-                UPDATE hpc_virtual_holdings 
-                SET target_name=?, base_shares=?, latest_nav=?, source_type=?, target_type=?, weight=?, target_category_2=?, updated_at=CURRENT_TIMESTAMP
-                WHERE id=?
-            ''', (name, shares, nav, source, type, weight, cat2, exist[0]))
-        else:
-            cursor.execute('''
-                INSERT INTO hpc_virtual_holdings (strategy_id, target_code, target_name, base_shares, latest_nav, source_type, target_type, weight, target_category_2)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (strategy_id, code, name, shares, nav, source, type, weight, cat2))
+        with self.db.transaction():
+            # Check if exists
+            exist = self.db.fetch_one("SELECT id FROM hpc_virtual_holdings WHERE strategy_id=? AND target_code=?", (strategy_id, code))
             
-        conn.commit()
-        conn.close()
+            if exist:
+                self.db.execute('''
+                    UPDATE hpc_virtual_holdings 
+                    SET target_name=?, base_shares=?, latest_nav=?, source_type=?, target_type=?, weight=?, target_category_2=?, updated_at=CURRENT_TIMESTAMP
+                    WHERE id=?
+                ''', (name, shares, nav, source, type, weight, cat2, exist[0]))
+            else:
+                self.db.execute('''
+                    INSERT INTO hpc_virtual_holdings (strategy_id, target_code, target_name, base_shares, latest_nav, source_type, target_type, weight, target_category_2)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (strategy_id, code, name, shares, nav, source, type, weight, cat2))
 
     def update_virtual_holding_cat2(self, strategy_id, target_code, cat2):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE hpc_virtual_holdings SET target_category_2 = ? WHERE strategy_id=? AND target_code=?", 
-                       (cat2, strategy_id, target_code))
-        conn.commit()
-        conn.close()
+        self.db.execute("UPDATE hpc_virtual_holdings SET target_category_2 = ? WHERE strategy_id=? AND target_code=?", 
+                        (cat2, strategy_id, target_code))
 
     def get_virtual_holdings(self, strategy_id):
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        rows = cursor.execute("SELECT * FROM hpc_virtual_holdings WHERE strategy_id=?", (strategy_id,)).fetchall()
-        conn.close()
+        rows = self.db.fetch_all("SELECT * FROM hpc_virtual_holdings WHERE strategy_id=?", (strategy_id,))
         return [dict(row) for row in rows]
 
     # --- Mappings CRUD ---
     def get_mappings(self, strategy_id, target_code):
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        rows = cursor.execute("SELECT * FROM hpc_mappings WHERE strategy_id=? AND target_code=?", (strategy_id, target_code)).fetchall()
-        conn.close()
+        rows = self.db.fetch_all("SELECT * FROM hpc_mappings WHERE strategy_id=? AND target_code=?", (strategy_id, target_code))
         return [dict(row) for row in rows]
 
     def save_mapping(self, strategy_id, target_code, mappings):
         # mappings is a list of dicts: [{local_code, local_type, ratio, ...}]
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         # Strategy: Delete old mappings for this target, insert new ones (Full replace)
-        cursor.execute("DELETE FROM hpc_mappings WHERE strategy_id=? AND target_code=?", (strategy_id, target_code))
-        
-        for m in mappings:
-            cursor.execute('''
+        with self.db.transaction():
+            self.db.execute("DELETE FROM hpc_mappings WHERE strategy_id=? AND target_code=?", (strategy_id, target_code))
+            self.db.execute_many('''
                 INSERT INTO hpc_mappings (strategy_id, target_code, local_code, local_name, local_type, allocation_ratio)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (strategy_id, target_code, m['local_code'], m.get('local_name',''), m['local_type'], m['ratio']))
-            
-        conn.commit()
-        conn.close()
+            ''', [(strategy_id, target_code, m['local_code'], m.get('local_name',''), m['local_type'], m['ratio']) for m in mappings])
@@ -15,6 +15,10 @@ class MarketDatabase:
         """
         self.db = Database(db_path)
         self.fund_info_manager = FundInfoManager(db_path)
+        self.db.init_schema_once('MarketDatabase', self._init_tables)
+
+    def _init_tables(self):
+        """建表与迁移，每个进程只执行一次"""
         self._init_asset_classification_table()
         self._init_valuation_tables()
         
@@ -129,23 +133,14 @@ class MarketDatabase:
         fund_info = self.fund_info_manager.get_fund_info(etf_code)
         etf_name = fund_info["fund_name"] if fund_info else etf_code
         
-        # 先删除已有数据
-        self.db.execute("DELETE FROM grid_trade WHERE etf_code = ?", (etf_code,))
-        
-        # 逐条插入数据
         insert_sql = """
             INSERT INTO grid_trade (
                 etf_code, etf_name, date, open_price, close_price, 
                 low_price, high_price, volume
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """
-        
-        for i in range(len(data['date'])):
-            # 跳过任何包含None的数据
-            if None in [data['open'][i], data['close'][i], data['high'][i], data['low'][i]]:
-                continue
-                
-            self.db.execute(insert_sql, (
+        rows = [
+            (
                 etf_code,
                 etf_name,
                 data['date'][i],
@@ -154,9 +149,16 @@ class MarketDatabase:
                 data['low'][i],
                 data['high'][i],
                 data['volume'][i]
-            ))
-        
-        self.db.commit()
+            )
+            for i in range(len(data['date']))
+            # 跳过任何包含None的数据
+            if None not in [data['open'][i], data['close'][i], data['high'][i], data['low'][i]]
+        ]
+
+        # 删除旧数据与写入新数据在同一事务中完成
+        with self.db.transaction():
+            self.db.execute("DELETE FROM grid_trade WHERE etf_code = ?", (etf_code,))
+            self.db.execute_many(insert_sql, rows)
 
     def get_buy_sell_signals(self, etf_code: str, trend_indicator: str) -> Dict[str, List[Dict[str, Any]]]:
         """获取指定ETF的买卖点数据
@@ -8,7 +8,7 @@ class PortfolioDatabase:
     def __init__(self, db_path: str = PORTFOLIO_DB):
         """初始化资产组合数据库"""
         self.db = Database(db_path)
-        self._init_table()
+        self.db.init_schema_once('PortfolioDatabase', self._init_table)
 
     def _init_table(self):
         """初始化资产持仓表"""
@@ -15,7 +15,7 @@ class SchemeDatabase:
             db_path: 数据库文件路径
         """
         self.db = Database(db_path)
-        self._init_table()
+        self.db.init_schema_once('SchemeDatabase', self._init_table)
         
     def _init_table(self):
         """初始化数据表"""
@@ -18,7 +18,7 @@ class USStockDatabase:
             db_path: 数据库文件路径
         """
         self.db = Database(db_path)  # 使用Database类
-        self._init_table()
+        self.db.init_schema_once('USStockDatabase', self._init_table)
 
     def _init_table(self):
         """初始化数据表"""  
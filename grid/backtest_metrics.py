@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from grid.shannon_engine import day_start_index
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def daily_index(timestamps):
+    """
+    由分钟时间戳得到每个交易日最后一根 K 线的下标和交易日数，
+    供 ShannonEngine.run_batch 的 day_end_idx / n_days 使用（不假设每天 240 根）。
+    """
+    day_starts = day_start_index(timestamps)
+    return day_starts[1:] - 1, len(day_starts) - 1
+
+
+def daily_bars(timestamps, opens, highs, lows, closes, day_starts=None) -> dict:
+    """按交易日边界下标把分钟 OHLC 聚合为日线（reduceat，无字符串转换和 groupby）"""
+    if day_starts is None:
+        day_starts = day_start_index(timestamps)
+    starts = day_starts[:-1]
+    ends = day_starts[1:] - 1
+    return {
+        'date': np.asarray(timestamps, dtype=np.int64)[starts] // 10000,
+        'open': np.asarray(opens)[starts],
+        'high': np.maximum.reduceat(highs, starts),
+        'low': np.minimum.reduceat(lows, starts),
+        'close': np.asarray(closes)[ends],
+        'end_idx': ends,
+    }
+
+
+def underwater_runs(equity_curve: np.ndarray) -> np.ndarray:
+    """连续处于历史最高水位之下的各段长度（K 线根数）"""
+    equity_curve = np.asarray(equity_curve, dtype=np.float64)
+    if len(equity_curve) == 0:
+        return np.zeros(0, dtype=np.int64)
+    under = equity_curve < np.maximum.accumulate(equity_curve)
+    edges = np.diff(np.r_[0, under.astype(np.int8), 0])
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+def max_drawdown_pct(values: np.ndarray) -> float:
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    return float(np.max((peak - values) / peak) * 100)
+
+
+def annualized_sharpe(daily_values: np.ndarray) -> float:
+    """日收益率年化夏普（样本标准差），收益率不足或无波动时为 0"""
+    daily_values = np.asarray(daily_values, dtype=np.float64)
+    if len(daily_values) < 3:
+        return 0.0
+    rets = daily_values[1:] / daily_values[:-1] - 1
+    std = np.std(rets, ddof=1)
+    return float(np.mean(rets) / std * np.sqrt(TRADING_DAYS_PER_YEAR)) if std > 0 else 0.0
+
+
+def annualized_return(total_return_pct: float, n_days: float) -> float:
+    """复合年化收益率 (CAGR)，不足 10 个交易日时直接用总收益，避免年化失真"""
+    if n_days > 10:
+        return ((1 + total_return_pct / 100) ** (TRADING_DAYS_PER_YEAR / n_days) - 1) * 100
+    return total_return_pct
+
+
+def calmar(annual_return_pct: float, max_dd_pct: float) -> float:
+    return annual_return_pct / max_dd_pct if max_dd_pct > 0.1 else annual_return_pct / 0.1
+
+
+def _improvement(value: float, base: float) -> float:
+    return (value - base) / abs(base) * 100 if abs(base) > 0.01 else 0.0
+
+
+def daily_moving_averages(daily_cache: pd.DataFrame, dates: np.ndarray, windows=(20, 250)) -> dict:
+    """
+    从日线缓存 (MinDataLoader.load_daily_data) 计算均线并对齐到回测交易日，
+    回测首日之前的历史自然作为预热；缓存中缺失的日期为 NaN。
+    """
+    result = {f'ma{w}': np.full(len(dates), np.nan) for w in windows}
+    if daily_cache is None or daily_cache.empty:
+        return result
+    cache_dates = daily_cache['date'].dt.strftime('%Y%m%d').astype('int64').to_numpy()
+    closes = daily_cache['close'].astype('float64')
+    pos = np.searchsorted(cache_dates, dates)
+    pos_clipped = np.minimum(pos, len(cache_dates) - 1)
+    found = (pos < len(cache_dates)) & (cache_dates[pos_clipped] == dates)
+    for w in windows:
+        ma = closes.rolling(w).mean().to_numpy()
+        result[f'ma{w}'][found] = ma[pos_clipped[found]]
+    return result
+
+
+def compute_backtest_metrics(timestamps, opens, highs, lows, closes, equity_curve, cash_history,
+                             initial_capital: float, daily_cache: pd.DataFrame = None) -> dict:
+    """
+    分钟净值曲线的回测指标：回撤、套牢时长、资金占用、日线净值、夏普 / 卡玛及买入持有基准对应指标。
+    daily_cache 为日线缓存时附带 MA20 / MA250。
+
+    Returns:
+        dict: metrics（汇总指标）和 daily（按交易日对齐的数组：date / equity / benchmark / OHLC / 均线）
+    """
+    equity_curve = np.asarray(equity_curve, dtype=np.float64)
+    cash_history = np.asarray(cash_history, dtype=np.float64)
+    if len(equity_curve) == 0:
+        raise ValueError("Backtest generated no daily data (time range too short?)")
+
+    day_starts = day_start_index(timestamps)
+    n_days = len(day_starts) - 1
+    bars = daily_bars(timestamps, opens, highs, lows, closes, day_starts)
+
+    final = float(equity_curve[-1])
+    total_return = (final - initial_capital) / initial_capital * 100
+    max_dd = max_drawdown_pct(equity_curve)
+
+    # 套牢时长：最长水下段的 K 线根数按平均每日根数换算为交易日
+    runs = underwater_runs(equity_curve)
+    bars_per_day = len(equity_curve) / n_days
+    max_underwater_days = round(float(runs.max()) / bars_per_day, 1) if len(runs) else 0.0
+
+    utilization = np.where(equity_curve > 0, (equity_curve - cash_history) / equity_curve, 0)
+
+    daily_equity = equity_curve[bars['end_idx']]
+    base_close = bars['close'][0]
+    benchmark = initial_capital * (bars['close'] / base_close)
+    bench_return = (bars['close'][-1] - base_close) / base_close * 100
+    bench_max_dd = max_drawdown_pct(bars['close'])
+
+    sharpe = annualized_sharpe(daily_equity)
+    bench_sharpe = annualized_sharpe(benchmark)
+    annual = annualized_return(total_return, n_days)
+    bench_annual = annualized_return(bench_return, n_days)
+    calmar_ratio = calmar(annual, max_dd)
+    bench_calmar = calmar(bench_annual, bench_max_dd)
+
+    daily = {
+        'date': bars['date'],
+        'equity': daily_equity,
+        'benchmark': benchmark,
+        'open': bars['open'],
+        'high': bars['high'],
+        'low': bars['low'],
+        'close': bars['close'],
+        **daily_moving_averages(daily_cache, bars['date'])
+    }
+    metrics = {
+        'total_return': total_return,
+        'annualized_return': annual,
+        'max_drawdown': max_dd,
+        'final_equity': final,
+        'max_underwater_days': max_underwater_days,
+        'avg_utilization': float(np.mean(utilization) * 100),
+        'max_utilization': float(np.max(utilization) * 100),
+        'min_cash': float(np.min(cash_history)),
+        'bench_return': float(bench_return),
+        'bench_max_drawdown': bench_max_dd,
+        'sharpe_ratio': sharpe,
+        'bench_sharpe': bench_sharpe,
+        'sharpe_imp': _improvement(sharpe, bench_sharpe),
+        'calmar_ratio': calmar_ratio,
+        'bench_calmar': bench_calmar,
+        'calmar_imp': _improvement(calmar_ratio, bench_calmar),
+        # 回撤优化率
+        'dd_reduction': (bench_max_dd - max_dd) / bench_max_dd * 100 if bench_max_dd > 0.001 else 0.0,
+        'n_days': n_days
+    }
+    return {'metrics': metrics, 'daily': daily}
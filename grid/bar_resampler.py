@@ -0,0 +1,72 @@
+import numpy as np
+
+# 支持的 K 线周期 -> 分钟数（'1d' 为按交易日聚合）
+TIMEFRAME_MINUTES = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1d': None}
+
+# 由 MinDataLoader 物化存储的分钟级周期（日线另存于 etf_daily_from_min）
+PYRAMID_TIMEFRAMES = ('5m', '15m', '60m')
+
+# A 股上下午开盘时刻（当日分钟数），周期 K 线从各自开盘时刻起切分，如 60m 为 10:30 / 11:30 / 14:00 / 15:00
+MORNING_OPEN = 9 * 60 + 30
+AFTERNOON_OPEN = 13 * 60
+SESSION_CLOSE = 1500
+
+
+def timeframe_minutes(timeframe: str):
+    """周期对应的分钟数，日线返回 None"""
+    if timeframe not in TIMEFRAME_MINUTES:
+        raise ValueError(f'Unsupported timeframe: {timeframe}')
+    return TIMEFRAME_MINUTES[timeframe]
+
+
+def bucket_keys(ts, timeframe: str) -> np.ndarray:
+    """
+    每根分钟 K 线所属周期 K 线的时间戳 (YYYYMMDDHHMM)，以周期结束时刻标记，
+    如 5m 下 09:31~09:35 -> 09:35。09:30 集合竞价、13:00 等开盘时刻的分钟并入各自时段的第一根。
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    minutes = timeframe_minutes(timeframe)
+    if minutes is None:
+        return ts // 10000 * 10000 + SESSION_CLOSE
+
+    hhmm = ts % 10000
+    day_minute = hhmm // 100 * 60 + hhmm % 100
+    session_open = np.where(day_minute >= AFTERNOON_OPEN, AFTERNOON_OPEN, MORNING_OPEN)
+    n_buckets = np.maximum(-(-(day_minute - session_open) // minutes), 1)
+    label = session_open + n_buckets * minutes
+    return ts - hhmm + label // 60 * 100 + label % 60
+
+
+def resample_arrays(arrays: dict, timeframe: str) -> dict:
+    """
+    按时间升序的分钟数组 (MinDataLoader.load_arrays 格式) 聚合为指定周期：
+    open 取首根、high / low 取极值、close 取末根、volume / amount 求和（reduceat，无 groupby）。
+    对已按该周期聚合的数据重复调用结果不变。
+    """
+    if timeframe_minutes(timeframe) == 1:
+        return arrays
+
+    ts = np.asarray(arrays['ts'], dtype=np.int64)
+    if len(ts) == 0:
+        return {col: np.asarray(values)[:0] for col, values in arrays.items()}
+
+    keys = bucket_keys(ts, timeframe)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    result = {'ts': keys[starts]}
+    for col, values in arrays.items():
+        if col == 'ts':
+            continue
+        values = np.asarray(values)
+        if col == 'open':
+            result[col] = values[starts]
+        elif col == 'high':
+            result[col] = np.maximum.reduceat(values, starts)
+        elif col == 'low':
+            result[col] = np.minimum.reduceat(values, starts)
+        elif col == 'close':
+            result[col] = values[ends]
+        elif col in ('volume', 'amount'):
+            result[col] = np.add.reduceat(values, starts)
+    return result
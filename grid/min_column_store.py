@@ -0,0 +1,154 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+VALUE_COLUMNS = PRICE_COLUMNS + ('volume', 'amount')
+COLUMN_DTYPES = {'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64,
+                 'volume': np.int64, 'amount': np.float64}
+
+
+def timestamp_to_int(values) -> np.ndarray:
+    """
+    'YYYY-MM-DD HH:MM:SS' 字符串（或 datetime）向量化转换为 YYYYMMDDHHMM 整数。
+    """
+    dt = pd.DatetimeIndex(pd.to_datetime(values))
+    return (
+        dt.year.values.astype('int64') * 100000000
+        + dt.month.values.astype('int64') * 1000000
+        + dt.day.values.astype('int64') * 10000
+        + dt.hour.values.astype('int64') * 100
+        + dt.minute.values.astype('int64')
+    )
+
+
+def int_to_timestamp(ts_int: np.ndarray) -> np.ndarray:
+    """YYYYMMDDHHMM 整数转换回 'YYYY-MM-DD HH:MM:SS' 字符串，与 SQLite 中的格式保持一致。"""
+    dt = pd.to_datetime(np.asarray(ts_int).astype(str), format='%Y%m%d%H%M')
+    return dt.strftime('%Y-%m-%d %H:%M:%S').values
+
+
+def date_to_ts_bound(date_str: str, end: bool = False) -> int:
+    """'YYYY-MM-DD' 转为分钟整数区间边界（与 SQLite 查询的 09:30 / 15:00 口径一致）。"""
+    day = int(date_str.replace('-', '')[:8])
+    return day * 10000 + (1500 if end else 930)
+
+
+class MinColumnStore:
+    """
+    分钟线列式存储。
+    每个标的一个目录，每列一个 .npy 文件：
+        ts.npy      int64   YYYYMMDDHHMM
+        open/high/low/close/amount.npy  float64
+        volume.npy  int64
+    读取时使用 mmap，按时间区间切片返回零拷贝视图，可直接交给 ShannonEngine。
+    """
+
+    def __init__(self, root='db/min_columns'):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, str(symbol))
+
+    def has_symbol(self, symbol: str) -> bool:
+        return os.path.exists(os.path.join(self._symbol_dir(symbol), 'ts.npy'))
+
+    def symbols(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(s for s in os.listdir(self.root) if self.has_symbol(s))
+
+    def write(self, symbol: str, ts: np.ndarray, columns: dict):
+        """
+        全量写入某标的的列数据（覆盖）。
+        ts 需已升序且唯一；先写入临时目录再整体替换，避免读到写了一半的数据。
+        """
+        target = self._symbol_dir(symbol)
+        tmp_dir = target + '.tmp'
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        np.save(os.path.join(tmp_dir, 'ts.npy'), np.ascontiguousarray(ts, dtype=np.int64))
+        for col in VALUE_COLUMNS:
+            values = columns.get(col)
+            if values is None:
+                values = np.zeros(len(ts), dtype=COLUMN_DTYPES[col])
+            np.save(os.path.join(tmp_dir, f'{col}.npy'), np.ascontiguousarray(values, dtype=COLUMN_DTYPES[col]))
+
+        old_dir = target + '.old'
+        if os.path.exists(target):
+            if os.path.exists(old_dir):
+                shutil.rmtree(old_dir)
+            os.replace(target, old_dir)
+        os.replace(tmp_dir, target)
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+
+    def write_df(self, symbol: str, df: pd.DataFrame):
+        """从 etf_min_1m 格式的 DataFrame（timestamp 为文本）全量写入。"""
+        df = df.sort_values('timestamp').drop_duplicates(subset=['timestamp'], keep='last')
+        ts = timestamp_to_int(df['timestamp'].values)
+        self.write(symbol, ts, {col: df[col].values for col in VALUE_COLUMNS if col in df.columns})
+
+    def merge_df(self, symbol: str, df: pd.DataFrame):
+        """
+        增量合并：新数据按时间戳覆盖旧数据（与 INSERT OR REPLACE 语义一致）。
+        """
+        if df is None or df.empty:
+            return
+        if not self.has_symbol(symbol):
+            self.write_df(symbol, df)
+            return
+
+        old = self.load_arrays(symbol, mmap=False)
+        new_ts = timestamp_to_int(df['timestamp'].values)
+        ts = np.concatenate([old['ts'], new_ts])
+        merged = {col: np.concatenate([old[col], df[col].values.astype(COLUMN_DTYPES[col])]) for col in VALUE_COLUMNS}
+
+        # 同一时间戳保留后写入的（新数据）
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        keep = np.ones(len(ts), dtype=bool)
+        keep[:-1] = ts[1:] != ts[:-1]
+        self.write(symbol, ts[keep], {col: values[order][keep] for col, values in merged.items()})
+
+    def load_arrays(self, symbol: str, start_date: str = None, end_date: str = None, mmap: bool = True) -> dict:
+        """
+        读取某标的的列数组，按日期区间切片。
+        返回 {'ts', 'open', 'high', 'low', 'close', 'volume', 'amount'}；mmap=True 时为只读内存映射视图。
+        """
+        base = self._symbol_dir(symbol)
+        mode = 'r' if mmap else None
+        ts = np.load(os.path.join(base, 'ts.npy'), mmap_mode=mode)
+
+        lo = 0
+        hi = len(ts)
+        if start_date:
+            lo = int(np.searchsorted(ts, date_to_ts_bound(start_date), side='left'))
+        if end_date:
+            hi = int(np.searchsorted(ts, date_to_ts_bound(end_date, end=True), side='right'))
+        hi = max(lo, hi)
+
+        arrays = {'ts': ts[lo:hi]}
+        for col in VALUE_COLUMNS:
+            arrays[col] = np.load(os.path.join(base, f'{col}.npy'), mmap_mode=mode)[lo:hi]
+        return arrays
+
+    def get_range(self, symbol: str):
+        """获取可用时间范围，格式与 MinDataLoader.get_available_range 一致。"""
+        if not self.has_symbol(symbol):
+            return None
+        ts = np.load(os.path.join(self._symbol_dir(symbol), 'ts.npy'), mmap_mode='r')
+        if len(ts) == 0:
+            return None
+        start, end = int_to_timestamp(np.array([ts[0], ts[-1]]))
+        return {'start': start, 'end': end, 'count': int(len(ts))}
+
+    def delete(self, symbol: str):
+        target = self._symbol_dir(symbol)
+        if os.path.exists(target):
+            shutil.rmtree(target)
@@ -1,17 +1,75 @@
 import glob
+import hashlib
 import logging
 import os
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import repeat
 
 import akshare as ak
+import numpy as np
 import pandas as pd
 
+from grid.bar_resampler import PYRAMID_TIMEFRAMES, SESSION_CLOSE, resample_arrays, timeframe_minutes
+from grid.min_data_quality import BREAK_JUMP_PCT, ISSUE_FIELDS, QUALITY_FIELDS, scan_minute_arrays, summarize_report
+from grid.min_column_store import COLUMN_DTYPES, MinColumnStore, int_to_timestamp, timestamp_to_int
+
+# 批量导入时每次 executemany 写入的行数
+BULK_CHUNK_ROWS = 200000
+
+# 计算数据版本摘要时参与的列
+DIGEST_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def _batch_digest(df: pd.DataFrame) -> str:
+    """一批写入数据的内容摘要（向量化逐行哈希后整体 SHA1）"""
+    row_hash = pd.util.hash_pandas_object(df[list(DIGEST_COLUMNS)], index=False).to_numpy()
+    return hashlib.sha1(row_hash.tobytes()).hexdigest()
+
+
+def _read_parquet_minutes(file_path: str) -> dict:
+    """
+    批量导入的进程池任务：读取并规范化单个 Parquet 文件，返回可 pickle 的列数组。
+    文件名格式: 510300.SH.parquet -> 标的 510300
+    """
+    symbol = os.path.basename(file_path).split('.')[0]
+    raw_df = pd.read_parquet(file_path)
+    df = MinDataLoader._normalize_parquet_df(raw_df, symbol, file_path)
+    return {
+        'symbol': symbol,
+        'file_path': file_path,
+        'rows_read': len(raw_df),
+        'ts_int': df['ts_int'].to_numpy(),
+        'timestamp': df['timestamp'].to_numpy(),
+        **{col: df[col].to_numpy() for col in ('open', 'high', 'low', 'close', 'volume', 'amount')},
+    }
+
 
 class MinDataLoader:
-    def __init__(self, db_path='db/market_data_min.db'):
+    def __init__(self, db_path='db/market_data_min.db', backend='auto', column_root='db/min_columns'):
+        """
+        backend:
+            'sqlite'   只从 etf_min_1m 表读取
+            'columnar' 读取列式存储（grid/min_column_store.py）
+            'auto'     标的已迁移到列式存储则读列式存储，否则读 SQLite
+        无论哪种 backend，写入时都会同步更新已迁移到列式存储的标的
+        """
+        if backend not in ('sqlite', 'columnar', 'auto'):
+            raise ValueError(f'Unsupported backend: {backend}')
         self.db_path = db_path
+        self.backend = backend
+        self.column_store = MinColumnStore(column_root)
         self._init_db()
 
+    def _use_columnar(self, symbol: str) -> bool:
+        if self.backend == 'sqlite':
+            return False
+        if self.backend == 'columnar':
+            return True
+        return self.column_store.has_symbol(symbol)
+
     def _init_db(self):
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         conn = sqlite3.connect(self.db_path)
@@ -31,28 +89,190 @@ class MinDataLoader:
             )
             '''
         )
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbol_time ON etf_min_1m (symbol, timestamp)')
+        # 旧版的 (symbol, timestamp) 二级索引与主键重复，只增加写入开销
+        cursor.execute('DROP INDEX IF EXISTS idx_symbol_time')
+        # 标的目录：每个标的的起止时间、行数、最近写入来源与数据版本，随每次写入在同一事务中维护
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS minute_symbol_catalog (
+                symbol TEXT PRIMARY KEY,
+                start_ts TEXT,
+                end_ts TEXT,
+                row_count INTEGER,
+                last_source TEXT,
+                data_version TEXT,
+                updated_at TEXT
+            )
+            '''
+        )
+        # 分钟线聚合出的日线缓存，写入分钟数据时按受影响的交易日增量维护
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS etf_daily_from_min (
+                symbol TEXT,
+                date TEXT,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                PRIMARY KEY (symbol, date)
+            )
+            '''
+        )
+        # 分钟线聚合出的多周期 K 线 (PYRAMID_TIMEFRAMES)，timestamp 为周期结束时刻
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS etf_min_bars (
+                symbol TEXT,
+                timeframe TEXT,
+                timestamp TEXT,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                amount REAL,
+                PRIMARY KEY (symbol, timeframe, timestamp)
+            )
+            '''
+        )
+        # 多周期 K 线对应的分钟数据版本，与 minute_symbol_catalog.data_version 不一致时整体重建
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS etf_min_bars_state (
+                symbol TEXT PRIMARY KEY,
+                data_version TEXT,
+                updated_at TEXT
+            )
+            '''
+        )
+        # 分钟数据完整性检查结果（grid/min_data_quality.py），每个标的每个交易日一行
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS minute_data_quality (
+                symbol TEXT,
+                date TEXT,
+                bar_count INTEGER,
+                missing_bars INTEGER,
+                off_session_bars INTEGER,
+                max_gap INTEGER,
+                duplicate_bars INTEGER,
+                bad_ohlc INTEGER,
+                zero_price INTEGER,
+                gap_pct REAL,
+                max_jump_pct REAL,
+                duplicate_session INTEGER,
+                suspect_break INTEGER,
+                PRIMARY KEY (symbol, date)
+            )
+            '''
+        )
+        # 完整性检查对应的分钟数据版本，未变化的标的不重复检查
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS minute_quality_state (
+                symbol TEXT PRIMARY KEY,
+                data_version TEXT,
+                scanned_at TEXT
+            )
+            '''
+        )
         conn.commit()
+
+        # 已有分钟数据但目录为空（升级前的旧库）时一次性回填
+        catalog_empty = cursor.execute('SELECT 1 FROM minute_symbol_catalog LIMIT 1').fetchone() is None
+        if catalog_empty and cursor.execute('SELECT 1 FROM etf_min_1m LIMIT 1').fetchone():
+            self._rebuild_catalog(conn)
+            conn.commit()
         conn.close()
 
-    def _upsert_minute_df(self, df: pd.DataFrame) -> int:
+    @staticmethod
+    def _update_catalog(conn: sqlite3.Connection, symbol: str, source: str, digest: str):
+        """
+        在调用方的事务中刷新某标的的目录记录（按主键索引聚合该标的，不扫全表）。
+        data_version 由上一版本和本次写入内容的摘要链式生成，数据有任何写入都会变化。
+        """
+        start, end, count = conn.execute(
+            'SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM etf_min_1m WHERE symbol = ?', (symbol,)
+        ).fetchone()
+        prev = conn.execute('SELECT data_version FROM minute_symbol_catalog WHERE symbol = ?', (symbol,)).fetchone()
+        version = hashlib.sha1(f'{prev[0] if prev else ""}|{start}|{end}|{count}|{digest}'.encode()).hexdigest()[:16]
+        conn.execute(
+            'INSERT OR REPLACE INTO minute_symbol_catalog VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (symbol, start, end, count, source, version, datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+        )
+
+    def _rebuild_catalog(self, conn: sqlite3.Connection):
+        """按 etf_min_1m 全表重建标的目录（仅用于旧库回填 / 手工修复）"""
+        rows = conn.execute(
+            'SELECT symbol, MIN(timestamp), MAX(timestamp), COUNT(*) FROM etf_min_1m GROUP BY symbol'
+        ).fetchall()
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute('DELETE FROM minute_symbol_catalog')
+        conn.executemany(
+            'INSERT INTO minute_symbol_catalog VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [
+                (symbol, start, end, count, 'rebuild', hashlib.sha1(f'{start}|{end}|{count}'.encode()).hexdigest()[:16], now)
+                for symbol, start, end, count in rows
+            ],
+        )
+        logging.info(f'Rebuilt minute_symbol_catalog for {len(rows)} symbols.')
+
+    def rebuild_catalog(self):
+        """全量重建标的目录"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self._rebuild_catalog(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_data_version(self, symbol: str) -> str | None:
+        """标的分钟数据的版本号，数据写入后变化，可作为下游缓存的失效键"""
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute('SELECT data_version FROM minute_symbol_catalog WHERE symbol = ?', (symbol,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def _upsert_minute_df(self, df: pd.DataFrame, source: str = 'manual') -> int:
         if df is None or df.empty:
             return 0
 
         data_to_insert = df[['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'amount']].values.tolist()
+        prev_versions = {symbol: self.get_data_version(symbol) for symbol in df['symbol'].unique()}
         conn = sqlite3.connect(self.db_path)
-        conn.executemany(
-            '''
-            INSERT OR REPLACE INTO etf_min_1m (symbol, timestamp, open, high, low, close, volume, amount)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''',
-            data_to_insert,
-        )
-        conn.commit()
-        conn.close()
+        try:
+            conn.executemany(
+                '''
+                INSERT OR REPLACE INTO etf_min_1m (symbol, timestamp, open, high, low, close, volume, amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''',
+                data_to_insert,
+            )
+            for symbol, group in df.groupby('symbol'):
+                self._update_catalog(conn, symbol, source, _batch_digest(group))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        # 列式存储已有该标的时同步合并，保持两份数据一致
+        for symbol, group in df.groupby('symbol'):
+            if self.backend == 'columnar' or self.column_store.has_symbol(symbol):
+                self.column_store.merge_df(symbol, group)
+
+        # 只重算本次写入涉及的交易日
+        for symbol, group in df.groupby('symbol'):
+            dates = sorted(group['timestamp'].astype(str).str[:10].unique())
+            self._refresh_daily_bars(symbol, dates[0], dates[-1], dates)
+            self._refresh_pyramid_bars(symbol, dates[0], dates[-1], prev_versions[symbol])
         return len(data_to_insert)
 
-    def _normalize_parquet_df(self, df: pd.DataFrame, symbol: str, file_path: str) -> pd.DataFrame:
+    @staticmethod
+    def _normalize_parquet_df(df: pd.DataFrame, symbol: str, file_path: str) -> pd.DataFrame:
         if df.empty:
             raise ValueError(f'Parquet file {file_path} is empty.')
 
@@ -68,7 +288,10 @@ class MinDataLoader:
         if 'trade_time' not in df.columns:
             raise ValueError(f"Missing 'trade_time' column in {file_path}")
 
-        df['timestamp'] = pd.to_datetime(df['trade_time']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        # 排序 / 去重用 int64 分钟时间戳，TEXT 只在写库时使用
+        trade_time = pd.to_datetime(df['trade_time'])
+        df['ts_int'] = timestamp_to_int(trade_time)
+        df['timestamp'] = trade_time.dt.strftime('%Y-%m-%d %H:%M:%S')
         df['symbol'] = symbol
 
         if 'vol' in df.columns:
@@ -79,7 +302,8 @@ class MinDataLoader:
         if missing_cols:
             raise ValueError(f'Missing columns in {file_path}: {missing_cols}')
 
-        return df[required_cols].sort_values('timestamp').drop_duplicates(subset=['symbol', 'timestamp'], keep='last')
+        df = df.sort_values('ts_int', kind='stable').drop_duplicates(subset=['ts_int'], keep='last')
+        return df[required_cols + ['ts_int']].reset_index(drop=True)
 
     def _normalize_akshare_df(self, df: pd.DataFrame, symbol: str) -> pd.DataFrame:
         if df.empty:
@@ -118,6 +342,22 @@ class MinDataLoader:
         加载本地分钟数据。
         start_date, end_date format: 'YYYY-MM-DD'
         """
+        if self._use_columnar(symbol):
+            if not self.column_store.has_symbol(symbol):
+                return pd.DataFrame(columns=['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'amount'])
+            arrays = self.column_store.load_arrays(symbol, start_date, end_date)
+            df = pd.DataFrame({
+                'symbol': symbol,
+                'timestamp': int_to_timestamp(arrays['ts']),
+                'open': arrays['open'],
+                'high': arrays['high'],
+                'low': arrays['low'],
+                'close': arrays['close'],
+                'volume': arrays['volume'],
+                'amount': arrays['amount'],
+            })
+            return df
+
         conn = sqlite3.connect(self.db_path)
         query = 'SELECT * FROM etf_min_1m WHERE symbol = ?'
         params = [symbol]
@@ -136,11 +376,80 @@ class MinDataLoader:
         conn.close()
         return df
 
+    def load_arrays(self, symbol: str, start_date: str = None, end_date: str = None) -> dict:
+        """
+        加载分钟数据为 NumPy 数组（供 ShannonEngine.from_arrays 直接使用）。
+        返回 {'ts': int64 YYYYMMDDHHMM, 'open'/'high'/'low'/'close': float64}。
+        列式存储下为内存映射的零拷贝视图；SQLite 下只查询所需列并向量化转换时间戳。
+        """
+        if self._use_columnar(symbol):
+            if self.column_store.has_symbol(symbol):
+                return self.column_store.load_arrays(symbol, start_date, end_date)
+            return self._empty_arrays()
+
+        conn = sqlite3.connect(self.db_path)
+        query = 'SELECT timestamp, open, high, low, close, volume, amount FROM etf_min_1m WHERE symbol = ?'
+        params = [symbol]
+        if start_date:
+            query += ' AND timestamp >= ?'
+            params.append(f'{start_date} 09:30:00')
+        if end_date:
+            query += ' AND timestamp <= ?'
+            params.append(f'{end_date} 15:00:00')
+        query += ' ORDER BY timestamp ASC'
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+
+        if not rows:
+            return self._empty_arrays()
+        timestamps, opens, highs, lows, closes, volumes, amounts = zip(*rows)
+        return {
+            'ts': timestamp_to_int(timestamps),
+            'open': np.array(opens, dtype=np.float64),
+            'high': np.array(highs, dtype=np.float64),
+            'low': np.array(lows, dtype=np.float64),
+            'close': np.array(closes, dtype=np.float64),
+            'volume': np.array(volumes, dtype=np.int64),
+            'amount': np.array(amounts, dtype=np.float64),
+        }
+
+    @staticmethod
+    def _empty_arrays() -> dict:
+        arrays = {'ts': np.array([], dtype=np.int64)}
+        for col, dtype in COLUMN_DTYPES.items():
+            arrays[col] = np.array([], dtype=dtype)
+        return arrays
+
+    def migrate_to_columnar(self, symbols: list = None) -> dict:
+        """
+        将 etf_min_1m 表中的分钟数据迁移到列式存储。
+        symbols 为空时迁移全部标的，返回 {symbol: 行数}。
+        """
+        store = self.column_store
+        conn = sqlite3.connect(self.db_path)
+        if symbols is None:
+            symbols = [r[0] for r in conn.execute('SELECT DISTINCT symbol FROM etf_min_1m ORDER BY symbol').fetchall()]
+
+        result = {}
+        for symbol in symbols:
+            df = pd.read_sql_query(
+                'SELECT timestamp, open, high, low, close, volume, amount FROM etf_min_1m WHERE symbol = ? ORDER BY timestamp',
+                conn,
+                params=(symbol,),
+            )
+            if df.empty:
+                continue
+            store.write_df(symbol, df)
+            result[symbol] = len(df)
+            logging.info(f'Migrated {len(df)} minute bars of {symbol} to columnar store.')
+        conn.close()
+        return result
+
     def get_etf_list(self) -> list:
         """
         获取已有分钟线数据的 ETF 列表。
         逻辑：
-        1. 从 etf_min_1m 表提取所有 symbol 及其起止时间。
+        1. 从 minute_symbol_catalog 目录表读取各标的起止时间（不扫描 etf_min_1m）。
         2. 关联 fund_info 表获取名称。
         """
         try:
@@ -153,22 +462,18 @@ class MinDataLoader:
                     SELECT
                         t1.symbol,
                         COALESCE(t2.fund_name, t1.symbol) as name,
-                        MIN(t1.timestamp) as start_date,
-                        MAX(t1.timestamp) as end_date
-                    FROM etf_min_1m t1
+                        t1.start_ts,
+                        t1.end_ts,
+                        t1.row_count,
+                        t1.data_version
+                    FROM minute_symbol_catalog t1
                     LEFT JOIN info_db.fund_info t2 ON t1.symbol = t2.fund_code
-                    GROUP BY t1.symbol
                     ORDER BY t1.symbol
                 '''
             else:
                 query = '''
-                    SELECT
-                        symbol,
-                        symbol as name,
-                        MIN(timestamp) as start_date,
-                        MAX(timestamp) as end_date
-                    FROM etf_min_1m
-                    GROUP BY symbol
+                    SELECT symbol, symbol as name, start_ts, end_ts, row_count, data_version
+                    FROM minute_symbol_catalog
                     ORDER BY symbol
                 '''
 
@@ -181,7 +486,10 @@ class MinDataLoader:
             for r in rows:
                 start = r[2].split(' ')[0] if r[2] else ''
                 end = r[3].split(' ')[0] if r[3] else ''
-                data.append({'code': r[0], 'name': r[1], 'start_date': start, 'end_date': end})
+                data.append({
+                    'code': r[0], 'name': r[1], 'start_date': start, 'end_date': end,
+                    'count': r[4], 'data_version': r[5]
+                })
 
             return data
         except Exception as e:
@@ -219,7 +527,7 @@ class MinDataLoader:
             raw_df = pd.read_parquet(file_path)
             result['rows_read'] = len(raw_df)
             normalized = self._normalize_parquet_df(raw_df, symbol, file_path)
-            result['rows_written'] = self._upsert_minute_df(normalized)
+            result['rows_written'] = self._upsert_minute_df(normalized, source='parquet')
             result['range'] = {
                 'start': normalized['timestamp'].min(),
                 'end': normalized['timestamp'].max(),
@@ -232,6 +540,160 @@ class MinDataLoader:
             logging.error(f'Error importing from local parquet for {symbol}: {e}', exc_info=True)
             return result
 
+    def bulk_import_parquet(self, parquet_dir='data/etf_1min', symbols: list = None, workers: int = None,
+                            chunk_rows: int = BULK_CHUNK_ROWS) -> dict:
+        """
+        批量导入目录下的全部 Parquet 分钟数据（首次建库 / 全量重建用）。
+        1. 进程池并行读取、复权和规范化各文件
+        2. 主进程单连接按块写入，全程一个事务；事务从第一个文件读取完成时开始，读取期间不占用写锁
+        3. 读取时只保留各标的的首末时间戳及单文件新标的的日线 / 多周期 K 线，原始数组写入后即释放
+        4. 提交后已迁移到列式存储的标的从表中回读导入范围合并，再刷新日线缓存和多周期 K 线
+
+        Returns:
+            dict: files / rows_read / rows_written / seconds / rows_per_sec / symbols / errors
+        """
+        files = sorted(glob.glob(os.path.join(parquet_dir, '*.parquet')))
+        if symbols:
+            wanted = set(symbols)
+            files = [f for f in files if os.path.basename(f).split('.')[0] in wanted]
+
+        result = {
+            'files': len(files),
+            'rows_read': 0,
+            'rows_written': 0,
+            'seconds': 0.0,
+            'rows_per_sec': 0.0,
+            'symbols': {},
+            'errors': {},
+        }
+        if not files:
+            return result
+
+        start = time.time()
+        imported = {}
+        # 导入前库中已有数据的标的，日线缓存需要从合并后的分钟数据重算
+        existing = set()
+        conn = sqlite3.connect(self.db_path)
+        prev_versions = dict(conn.execute('SELECT symbol, data_version FROM minute_symbol_catalog').fetchall())
+        # 只影响本连接：导入失败时整个事务回滚，无需逐条 fsync
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('PRAGMA cache_size=-200000')
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_read_parquet_minutes, f): f for f in files}
+                for future in as_completed(futures):
+                    file_path = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        result['errors'][file_path] = str(e)
+                        logging.error(f'Error reading parquet {file_path}: {e}')
+                        continue
+
+                    if not conn.in_transaction:
+                        conn.execute('BEGIN')
+                    symbol = data['symbol']
+                    n = len(data['timestamp'])
+                    if conn.execute('SELECT 1 FROM etf_min_1m WHERE symbol = ? LIMIT 1', (symbol,)).fetchone():
+                        existing.add(symbol)
+                    for lo in range(0, n, chunk_rows):
+                        hi = min(lo + chunk_rows, n)
+                        conn.executemany(
+                            '''
+                            INSERT OR REPLACE INTO etf_min_1m (symbol, timestamp, open, high, low, close, volume, amount)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                            ''',
+                            zip(
+                                repeat(symbol, hi - lo),
+                                data['timestamp'][lo:hi].tolist(),
+                                *(data[col][lo:hi].tolist() for col in ('open', 'high', 'low', 'close', 'volume', 'amount'))
+                            ),
+                        )
+                    self._update_catalog(conn, symbol, 'parquet', _batch_digest(pd.DataFrame(
+                        {col: data[col] for col in DIGEST_COLUMNS}
+                    )))
+                    result['rows_read'] += data['rows_read']
+                    result['rows_written'] += n
+                    result['symbols'][symbol] = result['symbols'].get(symbol, 0) + n
+                    if n:
+                        # 只保留提交后需要的摘要，原始列数组随 data 释放
+                        summary = imported.get(symbol)
+                        if summary is None and symbol not in existing:
+                            arrays = {'ts': data['ts_int'], **{col: data[col] for col in COLUMN_DTYPES}}
+                            imported[symbol] = {
+                                'first': data['timestamp'][0],
+                                'last': data['timestamp'][-1],
+                                'daily': self._daily_from_arrays(data),
+                                'pyramid': self._pyramid_from_arrays(arrays),
+                            }
+                        elif summary is None:
+                            imported[symbol] = {'first': data['timestamp'][0], 'last': data['timestamp'][-1]}
+                        else:
+                            # 同一标的多个文件：日线和多周期 K 线改为按日期范围从表中重算
+                            summary['first'] = min(summary['first'], data['timestamp'][0])
+                            summary['last'] = max(summary['last'], data['timestamp'][-1])
+                            summary.pop('daily', None)
+                            summary.pop('pyramid', None)
+                    del data
+                    logging.info(f'Bulk imported {n} minute bars of {symbol} from {file_path}.')
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        for symbol, summary in imported.items():
+            if self.backend == 'columnar' or self.column_store.has_symbol(symbol):
+                # 列式存储从已提交的表中按导入范围回读合并
+                conn = sqlite3.connect(self.db_path)
+                try:
+                    merge_df = pd.read_sql_query(
+                        '''
+                        SELECT timestamp, open, high, low, close, volume, amount
+                        FROM etf_min_1m WHERE symbol = ? AND timestamp >= ? AND timestamp <= ?
+                        ORDER BY timestamp
+                        ''',
+                        conn,
+                        params=(symbol, summary['first'], summary['last']),
+                    )
+                finally:
+                    conn.close()
+                self.column_store.merge_df(symbol, merge_df)
+                del merge_df
+            if 'daily' in summary:
+                # 单文件新标的：直接写入读取时按交易日边界聚合好的日线和多周期 K 线
+                self._write_daily_bars(symbol, summary['daily'])
+                self._write_pyramid_bars(symbol, summary['pyramid'], self.get_data_version(symbol), replace_all=True)
+            else:
+                first, last = summary['first'][:10], summary['last'][:10]
+                self._refresh_daily_bars(symbol, first, last)
+                self._refresh_pyramid_bars(symbol, first, last, prev_versions.get(symbol))
+
+        result['seconds'] = round(time.time() - start, 2)
+        result['rows_per_sec'] = round(result['rows_written'] / result['seconds'], 1) if result['seconds'] > 0 else 0.0
+        logging.info(
+            f"Bulk parquet import: {result['rows_written']} rows from {len(files)} files "
+            f"in {result['seconds']}s ({result['rows_per_sec']} rows/s)"
+        )
+        return result
+
+    @staticmethod
+    def _daily_from_arrays(data: dict) -> pd.DataFrame:
+        """已按时间升序去重的分钟列数组聚合为日线"""
+        days = data['ts_int'] // 10000
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        ends = np.r_[starts[1:], len(days)] - 1
+        return pd.DataFrame({
+            'date': pd.to_datetime(days[starts].astype(str), format='%Y%m%d').strftime('%Y-%m-%d'),
+            'open': data['open'][starts],
+            'high': np.maximum.reduceat(data['high'], starts),
+            'low': np.minimum.reduceat(data['low'], starts),
+            'close': data['close'][ends],
+            'volume': np.add.reduceat(data['volume'], starts),
+        })
+
     def import_from_akshare(self, symbol: str, latest_timestamp: str | None = None) -> dict:
         result = {
             'success': False,
@@ -257,7 +719,7 @@ class MinDataLoader:
 
             filtered = self._filter_new_rows(normalized, latest_timestamp)
             result['rows_after_filter'] = len(filtered)
-            result['rows_written'] = self._upsert_minute_df(filtered)
+            result['rows_written'] = self._upsert_minute_df(filtered, source='akshare')
             result['success'] = True
             logging.info(
                 'AKShare sync finished for %s: read=%s, after_filter=%s, written=%s',
@@ -291,6 +753,8 @@ class MinDataLoader:
 
         akshare_result = self.import_from_akshare(symbol, latest_local_ts)
         final_range = self.get_available_range(symbol)
+        # 两个来源合并后检查缺失分钟、重复整日数据和复权断点
+        quality = self.scan_quality([symbol]).get(symbol)
 
         success = bool((parquet_result.get('success') or akshare_result.get('success')) and final_range)
         used_sources = []
@@ -306,6 +770,11 @@ class MinDataLoader:
             warnings.append(akshare_result['error'])
         elif akshare_result.get('success') and akshare_result.get('rows_written', 0) == 0 and latest_local_ts:
             warnings.append('AKShare 未补到比本地更晚的数据，当前库中分钟数据已是 AKShare 可提供的最新范围。')
+        if quality and quality['issue_days']:
+            warnings.append(
+                f"数据完整性检查：{quality['issue_days']} 个交易日存在问题"
+                f"（缺失 {quality['missing_bars']} 根分钟线，疑似复权断点 {quality['suspect_breaks']} 处）。"
+            )
 
         return {
             'success': success,
@@ -314,6 +783,7 @@ class MinDataLoader:
             'parquet': parquet_result,
             'akshare': akshare_result,
             'info': final_range,
+            'quality': quality,
             'warnings': warnings,
             'message': self._build_sync_message(parquet_result, akshare_result, final_range),
         }
@@ -330,42 +800,378 @@ class MinDataLoader:
 
     def get_available_range(self, symbol: str):
         """获取本地数据的可用时间范围"""
+        if self._use_columnar(symbol):
+            return self.column_store.get_range(symbol)
+
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM etf_min_1m WHERE symbol = ?', (symbol,))
-        res = cursor.fetchone()
+        res = conn.execute(
+            'SELECT start_ts, end_ts, row_count, data_version FROM minute_symbol_catalog WHERE symbol = ?', (symbol,)
+        ).fetchone()
         conn.close()
         if res and res[0]:
-            return {'start': res[0], 'end': res[1], 'count': res[2]}
+            return {'start': res[0], 'end': res[1], 'count': res[2], 'data_version': res[3]}
         return None
 
+    def _aggregate_daily(self, symbol: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        从分钟数据聚合日线，date 列为 'YYYY-MM-DD' 文本。
+        """
+        agg_rules = {
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum',
+        }
+
+        if self._use_columnar(symbol):
+            if not self.column_store.has_symbol(symbol):
+                return pd.DataFrame()
+            arrays = self.column_store.load_arrays(symbol, start_date, end_date)
+            if len(arrays['ts']) == 0:
+                return pd.DataFrame()
+            df = pd.DataFrame({col: arrays[col] for col in ('open', 'high', 'low', 'close', 'volume')})
+            df['date'] = arrays['ts'] // 10000
+            daily_df = df.groupby('date', sort=True).agg(agg_rules).reset_index()
+            daily_df['date'] = pd.to_datetime(daily_df['date'].astype(str), format='%Y%m%d').dt.strftime('%Y-%m-%d')
+            return daily_df
+
+        query = 'SELECT timestamp, open, high, low, close, volume FROM etf_min_1m WHERE symbol = ?'
+        params = [symbol]
+        if start_date:
+            query += ' AND timestamp >= ?'
+            params.append(f'{start_date} 00:00:00')
+        if end_date:
+            query += ' AND timestamp <= ?'
+            params.append(f'{end_date} 23:59:59')
+        query += ' ORDER BY timestamp'
+
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+
+        if df.empty:
+            return pd.DataFrame()
+
+        df['date'] = df['timestamp'].astype(str).str[:10]
+        return df.groupby('date', sort=True).agg(agg_rules).reset_index()
+
+    def _refresh_daily_bars(self, symbol: str, start_date: str, end_date: str, dates: list = None) -> int:
+        """
+        重算 [start_date, end_date] 区间内的日线缓存；dates 不为空时只写入这些交易日。
+        """
+        daily_df = self._aggregate_daily(symbol, start_date, end_date)
+        if daily_df.empty:
+            return 0
+        if dates is not None:
+            daily_df = daily_df[daily_df['date'].isin(dates)]
+        return self._write_daily_bars(symbol, daily_df)
+
+    def _write_daily_bars(self, symbol: str, daily_df: pd.DataFrame) -> int:
+        """写入日线缓存（date 为 'YYYY-MM-DD'）"""
+        rows = [
+            (symbol, r.date, float(r.open), float(r.high), float(r.low), float(r.close), int(r.volume))
+            for r in daily_df.itertuples(index=False)
+        ]
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany(
+            '''
+            INSERT OR REPLACE INTO etf_daily_from_min (symbol, date, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''',
+            rows,
+        )
+        conn.commit()
+        conn.close()
+        return len(rows)
+
+    def _minute_date_bounds(self, symbol: str):
+        """分钟数据的首末交易日 ('YYYY-MM-DD', 'YYYY-MM-DD')，无数据返回 None。"""
+        if self._use_columnar(symbol):
+            data_range = self.column_store.get_range(symbol)
+            if not data_range:
+                return None
+            return data_range['start'][:10], data_range['end'][:10]
+
+        # MIN / MAX 分开查询才能各自走索引
+        conn = sqlite3.connect(self.db_path)
+        first = conn.execute('SELECT MIN(timestamp) FROM etf_min_1m WHERE symbol = ?', (symbol,)).fetchone()[0]
+        last = conn.execute('SELECT MAX(timestamp) FROM etf_min_1m WHERE symbol = ?', (symbol,)).fetchone()[0]
+        conn.close()
+        if not first:
+            return None
+        return first[:10], last[:10]
+
+    def _sync_daily_bars(self, symbol: str):
+        """
+        校验日线缓存是否覆盖分钟数据的日期范围（绕过 _upsert_minute_df 直接写库的脚本也能被补齐）：
+        缓存为空或起点晚于分钟数据时全量回填，终点落后时从缓存最后一天开始补算。
+        """
+        bounds = self._minute_date_bounds(symbol)
+        if bounds is None:
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        cached_first = conn.execute('SELECT MIN(date) FROM etf_daily_from_min WHERE symbol = ?', (symbol,)).fetchone()[0]
+        cached_last = conn.execute('SELECT MAX(date) FROM etf_daily_from_min WHERE symbol = ?', (symbol,)).fetchone()[0]
+        conn.close()
+
+        if not cached_first or bounds[0] < cached_first:
+            self._refresh_daily_bars(symbol, None, None)
+        elif bounds[1] > cached_last:
+            self._refresh_daily_bars(symbol, cached_last, bounds[1])
+
+    def rebuild_daily_bars(self, symbol: str = None) -> int:
+        """全量重建日线缓存，symbol 为空时重建全部标的。"""
+        conn = sqlite3.connect(self.db_path)
+        if symbol:
+            symbols = [symbol]
+            conn.execute('DELETE FROM etf_daily_from_min WHERE symbol = ?', (symbol,))
+        else:
+            symbols = [r[0] for r in conn.execute('SELECT DISTINCT symbol FROM etf_min_1m').fetchall()]
+            symbols = sorted(set(symbols) | set(self.column_store.symbols()))
+            conn.execute('DELETE FROM etf_daily_from_min')
+        conn.commit()
+        conn.close()
+        return sum(self._refresh_daily_bars(s, None, None) for s in symbols)
+
     def load_daily_data(self, symbol: str) -> pd.DataFrame:
         """
-        从分钟数据聚合出日线数据 (用于相似度搜索等)
+        读取分钟数据聚合出的日线数据 (用于相似度搜索等)
+        优先读取 etf_daily_from_min 缓存表，缓存缺失或落后时先增量补齐
         """
+        self._sync_daily_bars(symbol)
+
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query(
-            'SELECT timestamp, open, high, low, close, volume FROM etf_min_1m WHERE symbol = ? ORDER BY timestamp',
+        daily_df = pd.read_sql_query(
+            'SELECT date, open, high, low, close, volume FROM etf_daily_from_min WHERE symbol = ? ORDER BY date',
             conn,
             params=(symbol,),
         )
         conn.close()
 
-        if df.empty:
+        if daily_df.empty:
             return pd.DataFrame()
 
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.date
+        daily_df['date'] = pd.to_datetime(daily_df['date'])
+        return daily_df
+
+    def _pyramid_version(self, symbol: str) -> str | None:
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute('SELECT data_version FROM etf_min_bars_state WHERE symbol = ?', (symbol,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    @staticmethod
+    def _pyramid_from_arrays(arrays: dict) -> dict:
+        """分钟数组聚合为 {周期: K 线数组}（PYRAMID_TIMEFRAMES）"""
+        return {timeframe: resample_arrays(arrays, timeframe) for timeframe in PYRAMID_TIMEFRAMES}
+
+    def _write_pyramid_bars(self, symbol: str, pyramid: dict, version: str | None, replace_all: bool = False) -> int:
+        """
+        写入 _pyramid_from_arrays 聚合出的各周期 K 线，覆盖其所含交易日（replace_all 时覆盖该标的全部周期 K 线），
+        同一事务中记录对应的分钟数据版本。
+        """
+        ts = pyramid[PYRAMID_TIMEFRAMES[0]]['ts']
+        conn = sqlite3.connect(self.db_path)
+        written = 0
+        try:
+            if replace_all:
+                conn.execute('DELETE FROM etf_min_bars WHERE symbol = ?', (symbol,))
+            elif len(ts):
+                first, last = int_to_timestamp(ts[[0, -1]])
+                conn.execute(
+                    'DELETE FROM etf_min_bars WHERE symbol = ? AND timestamp >= ? AND timestamp <= ?',
+                    (symbol, f'{first[:10]} 00:00:00', f'{last[:10]} 23:59:59'),
+                )
+            for timeframe, bars in pyramid.items():
+                conn.executemany(
+                    '''
+                    INSERT OR REPLACE INTO etf_min_bars (symbol, timeframe, timestamp, open, high, low, close, volume, amount)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                    zip(
+                        repeat(symbol), repeat(timeframe), int_to_timestamp(bars['ts']).tolist(),
+                        *(bars[col].tolist() for col in ('open', 'high', 'low', 'close', 'volume', 'amount'))
+                    ),
+                )
+                written += len(bars['ts'])
+            conn.execute(
+                'INSERT OR REPLACE INTO etf_min_bars_state (symbol, data_version, updated_at) VALUES (?, ?, ?)',
+                (symbol, version, datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return written
+
+    def _refresh_pyramid_bars(self, symbol: str, start_date: str, end_date: str, prev_version: str | None) -> int:
+        """
+        分钟数据写入后重算 [start_date, end_date] 内各交易日的多周期 K 线。
+        prev_version 为写入前的数据版本；多周期 K 线并非基于该版本（缺失或已落后）时整体重建。
+        """
+        version = self.get_data_version(symbol)
+        if self._pyramid_version(symbol) != prev_version:
+            return self._write_pyramid_bars(
+                symbol, self._pyramid_from_arrays(self.load_arrays(symbol)), version, replace_all=True
+            )
+        return self._write_pyramid_bars(
+            symbol, self._pyramid_from_arrays(self.load_arrays(symbol, start_date, end_date)), version
+        )
+
+    def _sync_pyramid_bars(self, symbol: str):
+        """多周期 K 线落后于分钟数据版本（旧库、绕过写入接口的脚本）时整体重建"""
+        version = self.get_data_version(symbol)
+        if version and self._pyramid_version(symbol) != version:
+            self._write_pyramid_bars(symbol, self._pyramid_from_arrays(self.load_arrays(symbol)), version, replace_all=True)
+
+    def rebuild_bar_pyramid(self, symbol: str = None) -> int:
+        """全量重建多周期 K 线，symbol 为空时重建目录中的全部标的。"""
+        if symbol:
+            symbols = [symbol]
+        else:
+            conn = sqlite3.connect(self.db_path)
+            symbols = [r[0] for r in conn.execute('SELECT symbol FROM minute_symbol_catalog ORDER BY symbol').fetchall()]
+            conn.close()
+        return sum(
+            self._write_pyramid_bars(
+                s, self._pyramid_from_arrays(self.load_arrays(s)), self.get_data_version(s), replace_all=True
+            )
+            for s in symbols
+        )
+
+    def load_bars(self, symbol: str, timeframe: str = '1m', start_date: str = None, end_date: str = None) -> dict:
+        """
+        加载指定周期的 K 线数组（格式同 load_arrays，ts 为周期结束时刻）。
+        '1m' 即 load_arrays；PYRAMID_TIMEFRAMES 读取 etf_min_bars（落后时先重建）；
+        '1d' 读取日线缓存（不含成交额，amount 为 NaN）；其余周期由分钟数据即时聚合。
+        """
+        minutes = timeframe_minutes(timeframe)
+        if minutes == 1:
+            return self.load_arrays(symbol, start_date, end_date)
 
-        daily_df = df.groupby('date').agg(
-            {
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum',
+        if minutes is None:
+            daily_df = self.load_daily_data(symbol)
+            if daily_df.empty:
+                return self._empty_arrays()
+            if start_date:
+                daily_df = daily_df[daily_df['date'] >= pd.Timestamp(start_date)]
+            if end_date:
+                daily_df = daily_df[daily_df['date'] <= pd.Timestamp(end_date)]
+            days = daily_df['date'].dt.strftime('%Y%m%d').astype('int64').to_numpy()
+            return {
+                'ts': days * 10000 + SESSION_CLOSE,
+                **{col: daily_df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close')},
+                'volume': daily_df['volume'].to_numpy(dtype=np.int64),
+                'amount': np.full(len(days), np.nan),
             }
-        ).reset_index()
 
-        daily_df['date'] = pd.to_datetime(daily_df['date'])
-        return daily_df
+        if timeframe not in PYRAMID_TIMEFRAMES:
+            return resample_arrays(self.load_arrays(symbol, start_date, end_date), timeframe)
+
+        self._sync_pyramid_bars(symbol)
+        query = '''
+            SELECT timestamp, open, high, low, close, volume, amount FROM etf_min_bars
+            WHERE symbol = ? AND timeframe = ?
+        '''
+        params = [symbol, timeframe]
+        if start_date:
+            query += ' AND timestamp >= ?'
+            params.append(f'{start_date} 09:30:00')
+        if end_date:
+            query += ' AND timestamp <= ?'
+            params.append(f'{end_date} 15:00:00')
+        query += ' ORDER BY timestamp ASC'
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+
+        if not rows:
+            return self._empty_arrays()
+        timestamps, opens, highs, lows, closes, volumes, amounts = zip(*rows)
+        return {
+            'ts': timestamp_to_int(timestamps),
+            'open': np.array(opens, dtype=np.float64),
+            'high': np.array(highs, dtype=np.float64),
+            'low': np.array(lows, dtype=np.float64),
+            'close': np.array(closes, dtype=np.float64),
+            'volume': np.array(volumes, dtype=np.int64),
+            'amount': np.array(amounts, dtype=np.float64),
+        }
+
+    def scan_quality(self, symbols: list = None, force: bool = False, break_jump: float = BREAK_JUMP_PCT) -> dict:
+        """
+        对目录中的标的（默认全部）执行分钟数据完整性检查，逐日结果写入 minute_data_quality。
+        数据版本与上次检查一致的标的跳过（force 时重新检查），全部写入在一个事务中完成。
+
+        Returns:
+            dict: {symbol: summarize_report 汇总}，只包含本次实际检查的标的
+        """
+        conn = sqlite3.connect(self.db_path)
+        versions = dict(conn.execute('SELECT symbol, data_version FROM minute_symbol_catalog').fetchall())
+        scanned = dict(conn.execute('SELECT symbol, data_version FROM minute_quality_state').fetchall())
+        if symbols is None:
+            symbols = sorted(versions)
+
+        result = {}
+        columns = ('symbol', 'date') + QUALITY_FIELDS
+        try:
+            for symbol in symbols:
+                version = versions.get(symbol)
+                if version is None or (not force and scanned.get(symbol) == version):
+                    continue
+                report = scan_minute_arrays(self.load_arrays(symbol), break_jump)
+                dates = pd.to_datetime(report['date'].astype(str), format='%Y%m%d').strftime('%Y-%m-%d')
+                conn.execute('DELETE FROM minute_data_quality WHERE symbol = ?', (symbol,))
+                conn.executemany(
+                    f"INSERT INTO minute_data_quality ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    zip(repeat(symbol), dates.tolist(), *(report[f].tolist() for f in QUALITY_FIELDS)),
+                )
+                conn.execute(
+                    'INSERT OR REPLACE INTO minute_quality_state (symbol, data_version, scanned_at) VALUES (?, ?, ?)',
+                    (symbol, version, datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                )
+                result[symbol] = summarize_report(report)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return result
+
+    def get_quality_summary(self) -> list:
+        """各标的最近一次完整性检查的汇总，stale 表示检查后分钟数据已更新（数据版本不一致）"""
+        issue_expr = ' OR '.join(f'q.{f} > 0' for f in ISSUE_FIELDS)
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            f'''
+            SELECT q.symbol, COUNT(*), SUM(CASE WHEN {issue_expr} THEN 1 ELSE 0 END),
+                   SUM(q.bar_count), SUM(q.missing_bars), SUM(q.duplicate_bars), SUM(q.bad_ohlc),
+                   SUM(q.zero_price), SUM(q.duplicate_session), SUM(q.suspect_break), MAX(q.max_gap),
+                   s.scanned_at, s.data_version = c.data_version
+            FROM minute_data_quality q
+            JOIN minute_quality_state s ON s.symbol = q.symbol
+            LEFT JOIN minute_symbol_catalog c ON c.symbol = q.symbol
+            GROUP BY q.symbol
+            ORDER BY q.symbol
+            '''
+        ).fetchall()
+        conn.close()
+        keys = ('symbol', 'days', 'issue_days', 'bars', 'missing_bars', 'duplicate_bars', 'bad_ohlc',
+                'zero_price', 'duplicate_sessions', 'suspect_breaks', 'max_gap', 'scanned_at', 'stale')
+        return [dict(zip(keys, r[:-1] + (not r[-1],))) for r in rows]
+
+    def get_quality_days(self, symbol: str, issues_only: bool = True) -> list:
+        """标的逐日检查结果，issues_only 时只返回有问题的交易日"""
+        query = f"SELECT date, {', '.join(QUALITY_FIELDS)} FROM minute_data_quality WHERE symbol = ?"
+        if issues_only:
+            query += ' AND (' + ' OR '.join(f'{f} > 0' for f in ISSUE_FIELDS) + ')'
+        query += ' ORDER BY date'
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(query, (symbol,)).fetchall()
+        conn.close()
+        return [dict(zip(('date',) + QUALITY_FIELDS, r)) for r in rows]
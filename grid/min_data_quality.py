@@ -0,0 +1,139 @@
+import numpy as np
+
+from grid.shannon_engine import day_start_index
+
+# A 股 ETF 每个交易日应有的分钟线根数（09:31~11:30、13:01~15:00），仅作为完整性检查的参照
+EXPECTED_BARS_PER_DAY = 240
+
+# 相邻 K 线（隔夜或日内）涨跌幅超过该比例视为疑似除权 / 复权断点（超出 10% 涨跌停限制）
+BREAK_JUMP_PCT = 0.11
+
+# 逐日检查结果的列（与 minute_data_quality 表一致）
+QUALITY_FIELDS = (
+    'bar_count', 'missing_bars', 'off_session_bars', 'max_gap', 'duplicate_bars',
+    'bad_ohlc', 'zero_price', 'gap_pct', 'max_jump_pct', 'duplicate_session', 'suspect_break',
+)
+
+# 出现即视为有问题的交易日
+ISSUE_FIELDS = ('missing_bars', 'off_session_bars', 'duplicate_bars', 'bad_ohlc', 'zero_price',
+                'duplicate_session', 'suspect_break')
+
+
+def scan_minute_arrays(arrays: dict, break_jump: float = BREAK_JUMP_PCT) -> dict:
+    """
+    按交易日向量化检查分钟数组 (MinDataLoader.load_arrays 格式，按时间升序)：
+        bar_count          当日 K 线根数
+        missing_bars       交易时段内缺失的分钟数（参照 EXPECTED_BARS_PER_DAY）
+        off_session_bars   交易时段外的 K 线（09:30 / 13:00 开盘分钟除外）
+        max_gap            同一时段内相邻 K 线之间最长的缺口（分钟）
+        duplicate_bars     时间戳重复或倒序的 K 线
+        bad_ohlc           high / low 与 open / close 矛盾的 K 线
+        zero_price         价格为 0、负数或 NaN 的 K 线
+        gap_pct            开盘价相对前一交易日收盘价的跳空幅度
+        max_jump_pct       日内相邻收盘价的最大变动幅度
+        duplicate_session  与前一交易日的 K 线完全相同（重复写入的整日数据）
+        suspect_break      跳空或日内变动超过 break_jump，疑似除权 / 复权断点
+
+    Returns:
+        dict: date (int YYYYMMDD) 及 QUALITY_FIELDS 各列，均为长度 = 交易日数的数组
+    """
+    ts = np.asarray(arrays['ts'], dtype=np.int64)
+    if len(ts) == 0:
+        return {'date': np.zeros(0, dtype=np.int64), **{f: np.zeros(0) for f in QUALITY_FIELDS}}
+
+    opens = np.asarray(arrays['open'], dtype=np.float64)
+    highs = np.asarray(arrays['high'], dtype=np.float64)
+    lows = np.asarray(arrays['low'], dtype=np.float64)
+    closes = np.asarray(arrays['close'], dtype=np.float64)
+    volumes = np.asarray(arrays['volume'], dtype=np.float64) if 'volume' in arrays else np.zeros(len(ts))
+
+    day_starts = day_start_index(ts)
+    starts = day_starts[:-1]
+    ends = day_starts[1:] - 1
+    bar_count = np.diff(day_starts)
+
+    hhmm = ts % 10000
+    day_minute = hhmm // 100 * 60 + hhmm % 100
+    on_grid = ((hhmm >= 931) & (hhmm <= 1130)) | ((hhmm >= 1301) & (hhmm <= 1500))
+    in_session = on_grid | (hhmm == 930) | (hhmm == 1300)
+    duplicate = np.r_[False, ts[1:] <= ts[:-1]]
+
+    grid_bars = np.add.reduceat((on_grid & ~duplicate).astype(np.int64), starts)
+    missing_bars = np.maximum(EXPECTED_BARS_PER_DAY - grid_bars, 0)
+    off_session_bars = np.add.reduceat((~in_session).astype(np.int64), starts)
+    duplicate_bars = np.add.reduceat(duplicate.astype(np.int64), starts)
+
+    # 同一交易日、同一时段（上午 / 下午）内相邻 K 线的分钟间隔
+    days = ts // 10000
+    same_day = np.r_[False, days[1:] == days[:-1]]
+    afternoon = day_minute >= 13 * 60
+    same_session = same_day & np.r_[False, afternoon[1:] == afternoon[:-1]]
+    step = np.r_[1, np.diff(day_minute)]
+    max_gap = np.maximum.reduceat(np.where(same_session, np.maximum(step - 1, 0), 0), starts)
+
+    tol = 1e-9
+    bad = (highs < np.maximum(opens, closes) - tol) | (lows > np.minimum(opens, closes) + tol) | (highs < lows - tol)
+    bad_ohlc = np.add.reduceat(bad.astype(np.int64), starts)
+    # NaN 比较结果为 False，一并计入
+    positive = (opens > 0) & (highs > 0) & (lows > 0) & (closes > 0)
+    zero_price = np.add.reduceat((~positive).astype(np.int64), starts)
+
+    # 跳变只在相邻两根价格都有效时计算，无效价格已计入 zero_price
+    prev_close = np.r_[np.nan, closes[:-1]]
+    valid_step = same_day & positive & np.r_[False, positive[:-1]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step_ret = np.where(valid_step, np.abs(closes / prev_close - 1), 0.0)
+        gap_pct = np.r_[0.0, opens[starts[1:]] / closes[ends[:-1]] - 1]
+    step_ret = np.nan_to_num(step_ret, nan=0.0, posinf=0.0)
+    gap_pct = np.nan_to_num(gap_pct, nan=0.0, posinf=0.0, neginf=0.0)
+    max_jump_pct = np.maximum.reduceat(step_ret, starts)
+
+    # 当日 K 线根数、首末价格、收盘价和成交量之和与前一交易日完全相同，视为重复的整日数据
+    signature = np.column_stack([
+        bar_count, opens[starts], closes[ends], np.add.reduceat(closes, starts), np.add.reduceat(volumes, starts)
+    ])
+    duplicate_session = np.r_[False, np.all(signature[1:] == signature[:-1], axis=1)]
+
+    suspect_break = (np.abs(gap_pct) > break_jump) | (max_jump_pct > break_jump)
+
+    return {
+        'date': days[starts],
+        'bar_count': bar_count,
+        'missing_bars': missing_bars,
+        'off_session_bars': off_session_bars,
+        'max_gap': max_gap,
+        'duplicate_bars': duplicate_bars,
+        'bad_ohlc': bad_ohlc,
+        'zero_price': zero_price,
+        'gap_pct': gap_pct,
+        'max_jump_pct': max_jump_pct,
+        'duplicate_session': duplicate_session.astype(np.int64),
+        'suspect_break': suspect_break.astype(np.int64),
+    }
+
+
+def issue_mask(report: dict) -> np.ndarray:
+    """scan_minute_arrays 结果中有任一问题的交易日"""
+    mask = np.zeros(len(report['date']), dtype=bool)
+    for field in ISSUE_FIELDS:
+        mask |= np.asarray(report[field]) > 0
+    return mask
+
+
+def summarize_report(report: dict) -> dict:
+    """逐日检查结果汇总为标的级别的统计"""
+    issues = issue_mask(report)
+    return {
+        'days': int(len(report['date'])),
+        'issue_days': int(issues.sum()),
+        'bars': int(np.sum(report['bar_count'])),
+        'missing_bars': int(np.sum(report['missing_bars'])),
+        'incomplete_days': int(np.count_nonzero(report['missing_bars'])),
+        'off_session_bars': int(np.sum(report['off_session_bars'])),
+        'duplicate_bars': int(np.sum(report['duplicate_bars'])),
+        'bad_ohlc': int(np.sum(report['bad_ohlc'])),
+        'zero_price': int(np.sum(report['zero_price'])),
+        'duplicate_sessions': int(np.sum(report['duplicate_session'])),
+        'suspect_breaks': int(np.sum(report['suspect_break'])),
+        'max_gap': int(np.max(report['max_gap'])) if len(report['date']) else 0,
+    }
@@ -0,0 +1,177 @@
+import numpy as np
+
+from grid.shannon_engine import ShannonEngine
+from grid.walk_forward import OBJECTIVES, PARAM_NAMES
+
+
+class ShannonParamSearch:
+    """
+    香农网格参数自适应搜索，替代固定分辨率的热力图穷举。支持两种方式：
+
+    1. coarse_to_fine：先在搜索空间上做粗网格，再围绕得分最高的若干格逐层加密（步长减半），
+       已评估过的参数点不重复回测
+    2. successive_halving：随机抽取大量候选，先在最近一段较短的数据上评估，
+       每轮保留前 1/eta 并把数据窗口扩大 eta 倍，直到全量数据
+
+    bounds 中的参数参与搜索，其余 run() 参数取 fixed 中的固定值；每一批候选都交给 run_batch 并行回测。
+    """
+
+    def __init__(self, engine: ShannonEngine, initial_capital=100000, lower_limit=0.0, upper_limit=999.0):
+        self.engine = engine
+        self.initial_capital = initial_capital
+        self.lower_limit = lower_limit
+        self.upper_limit = upper_limit
+        self.day_starts = engine.day_starts
+        self.n_days = len(self.day_starts) - 1
+        # 累计回测的 K 线根数（候选数 x 数据长度），用于对比搜索成本
+        self.evaluations = 0
+        self.bar_evaluations = 0
+
+    def _evaluate(self, param_matrix: np.ndarray, objective: str, last_days: int = None):
+        """在最近 last_days 个交易日（默认全量）上批量回测，返回目标得分和全部指标"""
+        start_day = self.n_days - last_days if last_days else 0
+        lo = self.day_starts[start_day]
+        engine = self.engine
+        if lo > 0:
+            engine = ShannonEngine.from_arrays(
+                engine.timestamps[lo:], engine.opens[lo:], engine.highs[lo:], engine.lows[lo:], engine.closes[lo:]
+            )
+        stats = engine.run_batch(
+            param_matrix, self.initial_capital, self.lower_limit, self.upper_limit,
+            day_end_idx=self.day_starts[start_day + 1:] - 1 - lo, n_days=self.n_days - start_day
+        )
+        self.evaluations += len(param_matrix)
+        self.bar_evaluations += len(param_matrix) * (len(self.engine.timestamps) - lo)
+        return np.nan_to_num(stats[objective], nan=-np.inf), stats
+
+    @staticmethod
+    def _search_names(bounds: dict) -> list:
+        """bounds 中的搜索参数（按 PARAM_NAMES 顺序），不认识的参数直接报错而不是忽略"""
+        unknown = [name for name in bounds if name not in PARAM_NAMES]
+        if unknown:
+            raise ValueError(f'不支持的搜索参数: {unknown}')
+        names = [name for name in PARAM_NAMES if name in bounds]
+        if not names:
+            raise ValueError('至少需要一个搜索参数')
+        return names
+
+    @staticmethod
+    def _to_matrix(points: np.ndarray, names: list, fixed: dict) -> np.ndarray:
+        """搜索维度的取值与固定参数组合成 run_batch 参数矩阵"""
+        matrix = np.empty((len(points), len(PARAM_NAMES)))
+        for col, name in enumerate(PARAM_NAMES):
+            if name in names:
+                matrix[:, col] = points[:, names.index(name)]
+            elif name in fixed:
+                matrix[:, col] = fixed[name]
+            else:
+                raise ValueError(f'缺少参数 {name}')
+        return matrix
+
+    def _result(self, method: str, objective: str, names: list, fixed: dict, best_point, best_stats: dict,
+                history: list):
+        params = {**fixed, **{name: float(v) for name, v in zip(names, best_point)}}
+        return {
+            'method': method,
+            'objective': objective,
+            'params': {name: params[name] for name in PARAM_NAMES},
+            'stats': best_stats,
+            'evaluations': self.evaluations,
+            'bar_evaluations': self.bar_evaluations,
+            'history': history
+        }
+
+    def coarse_to_fine(self, bounds: dict, fixed: dict, objective: str = 'sharpe',
+                       coarse_steps: int = 5, levels: int = 3, top_k: int = 2):
+        """
+        粗网格 + 逐层加密。
+        每层围绕当前得分前 top_k 的点，在每个维度上取 (x - step, x, x + step)，step 每层减半。
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f'不支持的优化目标: {objective}')
+        names = self._search_names(bounds)
+        low = np.array([bounds[name][0] for name in names], dtype=np.float64)
+        high = np.array([bounds[name][1] for name in names], dtype=np.float64)
+
+        axes = [np.linspace(lo, hi, coarse_steps) for lo, hi in zip(low, high)]
+        points = np.column_stack([m.ravel() for m in np.meshgrid(*axes, indexing='ij')])
+        step = (high - low) / max(coarse_steps - 1, 1)
+
+        # 已评估点 -> (得分, 指标)，键按步长精度取整，避免浮点误差造成重复回测
+        scored = {}
+        history = []
+        for level in range(levels + 1):
+            fresh = {}
+            for point in points:
+                key = tuple(np.round(point, 10))
+                if key not in scored and key not in fresh:
+                    fresh[key] = point
+            if fresh:
+                scores, stats = self._evaluate(self._to_matrix(np.array(list(fresh.values())), names, fixed), objective)
+                for n, key in enumerate(fresh):
+                    scored[key] = (float(scores[n]), {k: float(v[n]) for k, v in stats.items()})
+
+            ranked = sorted(scored.items(), key=lambda item: item[1][0], reverse=True)
+            history.append({
+                'level': level,
+                'evaluated': len(fresh),
+                'best_score': ranked[0][1][0],
+                'best_point': dict(zip(names, ranked[0][0]))
+            })
+            if level == levels:
+                break
+
+            # 下一层：围绕前 top_k 个点加密
+            step = step / 2
+            offsets = np.column_stack([
+                m.ravel() for m in np.meshgrid(*[np.array([-1.0, 0.0, 1.0])] * len(names), indexing='ij')
+            ])
+            centers = np.array([key for key, _ in ranked[:top_k]])
+            points = (centers[:, None, :] + offsets[None, :, :] * step).reshape(-1, len(names))
+            points = np.clip(points, low, high)
+
+        best_key, (_, best_stats) = ranked[0]
+        return self._result('coarse_to_fine', objective, names, fixed, best_key, best_stats, history)
+
+    def successive_halving(self, bounds: dict, fixed: dict, objective: str = 'sharpe',
+                           n_candidates: int = 81, eta: int = 3, min_days: int = 60, seed=None):
+        """
+        逐轮减半：在最近 min_days 个交易日上评估全部随机候选，每轮保留前 1/eta，
+        数据窗口扩大 eta 倍，最后一轮使用全量数据。
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f'不支持的优化目标: {objective}')
+        names = self._search_names(bounds)
+        low = np.array([bounds[name][0] for name in names], dtype=np.float64)
+        high = np.array([bounds[name][1] for name in names], dtype=np.float64)
+
+        rng = np.random.default_rng(seed)
+        points = low + rng.random((n_candidates, len(names))) * (high - low)
+
+        history = []
+        days = min(min_days, self.n_days)
+        while True:
+            full = days >= self.n_days
+            scores, stats = self._evaluate(
+                self._to_matrix(points, names, fixed), objective, last_days=None if full else days
+            )
+            order = np.argsort(-scores, kind='stable')
+            history.append({
+                'days': self.n_days if full else days,
+                'evaluated': len(points),
+                'best_score': float(scores[order[0]]),
+                'best_point': dict(zip(names, points[order[0]].tolist()))
+            })
+            if full or len(points) == 1:
+                best = order[0]
+                break
+            keep = max(1, len(points) // eta)
+            points = points[order[:keep]]
+            days = min(days * eta, self.n_days)
+
+        if not full:
+            # 候选只剩一个但尚未在全量数据上评估
+            scores, stats = self._evaluate(self._to_matrix(points[:1], names, fixed), objective)
+            best = 0
+        best_stats = {k: float(v[best]) for k, v in stats.items()}
+        return self._result('successive_halving', objective, names, fixed, points[best], best_stats, history)
@@ -0,0 +1,378 @@
+import numpy as np
+from numba import njit
+
+from grid.shannon_engine import _grow_2d, day_start_index
+
+# 买入资金竞争时的优先规则
+PRIORITY_RULES = {
+    'order': 0,        # 按标的传入顺序
+    'discount': 1,     # 本根 K 线相对参考价跌得最深的先买
+    'underweight': 2,  # 持仓市值占分配资金比例最低的先买
+}
+
+# 交易记录列: 时间戳, 标的序号, 类型(1.1 信仰底仓 / 1.2 网格底仓 / 1 买 / -1 卖), 价格, 数量, 费用, 账户现金, 该标的总持股
+TRADE_COLUMNS = 8
+
+
+@njit(cache=True)
+def _push_stack(stack_price, stack_vol, stack_len, i, price, vol):
+    """标的 i 的 LIFO 栈压入一格，容量不足时按列扩容"""
+    n = stack_len[i]
+    if n >= stack_price.shape[1]:
+        cap = stack_price.shape[1] * 2
+        new_price = np.zeros((stack_price.shape[0], cap))
+        new_vol = np.zeros((stack_vol.shape[0], cap))
+        new_price[:, :stack_price.shape[1]] = stack_price
+        new_vol[:, :stack_vol.shape[1]] = stack_vol
+        stack_price = new_price
+        stack_vol = new_vol
+    stack_price[i, n] = price
+    stack_vol[i, n] = vol
+    stack_len[i] = n + 1
+    return stack_price, stack_vol
+
+
+@njit(cache=True)
+def _record(trades, n_trades, ts, i, kind, price, vol, fee, cash, shares):
+    trades = _grow_2d(trades, n_trades + 1)
+    trades[n_trades, 0] = ts
+    trades[n_trades, 1] = i
+    trades[n_trades, 2] = kind
+    trades[n_trades, 3] = price
+    trades[n_trades, 4] = vol
+    trades[n_trades, 5] = fee
+    trades[n_trades, 6] = cash
+    trades[n_trades, 7] = shares
+    return trades
+
+
+@njit(cache=True)
+def _portfolio_backtest(
+    timestamps, opens, highs, lows, closes, valid,
+    initial_capital, allocations, grid_density, sell_gap, pos_per_grid,
+    faith_ratio, grid_ratio, lower_limit, upper_limit, priority_rule, priority_rank,
+    fee_rate, day_end_idx
+):
+    """
+    多标的共享资金池的网格回测。
+    单标的逻辑（底仓初始化、T+1、下限暂停、LIFO 止盈、回补买入）与 _core_backtest 完全一致，
+    区别在于所有标的从同一个现金账户买卖：每根 K 线先处理全部标的的结算和卖出，
+    再把触发买入的标的按优先规则排序依次成交，现金不足的跳过。
+
+    行情为按时间戳对齐的 [T, N] 矩阵，valid 标记该标的在该时刻是否有真实 K 线。
+    单标的从第一根有效 K 线开始建仓，建仓资金 = initial_capital * allocations[i]。
+
+    返回:
+        equity [T], cash [T], 日终各标的持仓市值 [D, N],
+        各标的汇总 [N, 6] -> (净现金流, 手续费, 买入次数, 卖出次数, 期末持股, 期末市值),
+        交易记录 [M, 8]
+    """
+    n_steps, n_symbols = closes.shape
+    cash = float(initial_capital)
+
+    free_shares = np.zeros(n_symbols)
+    frozen_shares = np.zeros(n_symbols)
+    locked_shares = np.zeros(n_symbols)
+    ref_price = np.zeros(n_symbols)
+    current_date = np.zeros(n_symbols, dtype=np.int64)
+    started = np.zeros(n_symbols, dtype=np.bool_)
+    last_close = np.zeros(n_symbols)
+    paused = np.zeros(n_symbols, dtype=np.bool_)
+    pause_day = np.zeros(n_symbols, dtype=np.int64)
+    lower_recovery_ratio = 1.02
+
+    stack_price = np.zeros((n_symbols, 64))
+    stack_vol = np.zeros((n_symbols, 64))
+    stack_len = np.zeros(n_symbols, dtype=np.int64)
+
+    # 归因: 净现金流, 手续费, 买入次数, 卖出次数
+    cash_flow = np.zeros(n_symbols)
+    fees = np.zeros(n_symbols)
+    buy_count = np.zeros(n_symbols)
+    sell_count = np.zeros(n_symbols)
+
+    trades = np.zeros((256, 8))
+    n_trades = 0
+
+    equity_curve = np.zeros(n_steps)
+    cash_history = np.zeros(n_steps)
+    daily_values = np.zeros((len(day_end_idx), n_symbols))
+    next_day_end = 0
+
+    candidates = np.empty(n_symbols, dtype=np.int64)
+    candidate_price = np.empty(n_symbols)
+    candidate_key = np.empty(n_symbols)
+
+    for t in range(n_steps):
+        ts = timestamps[t]
+        today = ts // 10000
+
+        # --- 各标的：首根 K 线建仓、T+1、下限暂停、卖出 ---
+        for i in range(n_symbols):
+            if not valid[t, i]:
+                continue
+            o, h, l, c = opens[t, i], highs[t, i], lows[t, i], closes[t, i]
+
+            if not started[i]:
+                started[i] = True
+                ref_price[i] = o
+                current_date[i] = today
+                capital = initial_capital * allocations[i]
+
+                if faith_ratio[i] > 0:
+                    faith_shares = np.floor(capital * faith_ratio[i] / o / 100.0) * 100.0
+                    if faith_shares > 0:
+                        faith_cost = o * faith_shares
+                        faith_fee = faith_cost * fee_rate
+                        if cash >= (faith_cost + faith_fee):
+                            cash -= (faith_cost + faith_fee)
+                            locked_shares[i] = faith_shares
+                            cash_flow[i] -= faith_cost + faith_fee
+                            fees[i] += faith_fee
+                            trades = _record(trades, n_trades, ts, i, 1.1, o, faith_shares, faith_fee, cash,
+                                             locked_shares[i])
+                            n_trades += 1
+
+                if grid_ratio[i] > 0:
+                    grid_shares = np.floor(capital * grid_ratio[i] / o / 100.0) * 100.0
+                    if grid_shares > 0:
+                        grid_cost = o * grid_shares
+                        grid_fee = grid_cost * fee_rate
+                        if cash >= (grid_cost + grid_fee):
+                            cash -= (grid_cost + grid_fee)
+                            cash_flow[i] -= grid_cost + grid_fee
+                            fees[i] += grid_fee
+
+                            std_buy_vol = np.floor(pos_per_grid[i] / 100.0) * 100.0
+                            if std_buy_vol <= 0:
+                                std_buy_vol = 100.0
+                            num_steps = 0
+                            temp_rem = grid_shares
+                            while temp_rem > 0:
+                                temp_rem -= min(temp_rem, std_buy_vol)
+                                num_steps += 1
+                            # 从高到低压栈，最后压入的是参考价一格
+                            for k in range(num_steps - 1, -1, -1):
+                                virtual_cost = o * ((1.0 + sell_gap[i]) ** k)
+                                if k == num_steps - 1:
+                                    vol = grid_shares - (num_steps - 1) * std_buy_vol
+                                else:
+                                    vol = std_buy_vol
+                                stack_price, stack_vol = _push_stack(stack_price, stack_vol, stack_len, i,
+                                                                     virtual_cost, vol)
+
+                            trades = _record(trades, n_trades, ts, i, 1.2, o, grid_shares, grid_fee, cash,
+                                             locked_shares[i] + grid_shares)
+                            n_trades += 1
+                            frozen_shares[i] += grid_shares
+
+            # T+1 结算
+            if today > current_date[i]:
+                free_shares[i] += frozen_shares[i]
+                frozen_shares[i] = 0.0
+                current_date[i] = today
+
+            # 下限暂停新增
+            if lower_limit[i] > 0.0:
+                if paused[i]:
+                    if today > pause_day[i] and c >= lower_limit[i] * lower_recovery_ratio:
+                        paused[i] = False
+                        pause_day[i] = 0
+                elif l <= lower_limit[i] or c <= lower_limit[i]:
+                    paused[i] = True
+                    pause_day[i] = today
+
+            # 卖出 (LIFO)
+            while stack_len[i] > 0:
+                top = stack_len[i] - 1
+                cost = stack_price[i, top]
+                vol = stack_vol[i, top]
+                target_sell_price = cost * (1.0 + sell_gap[i])
+                if h >= target_sell_price and free_shares[i] >= vol:
+                    actual_sell_price = max(target_sell_price, o)
+                    revenue = actual_sell_price * vol
+                    sell_fee = revenue * fee_rate
+                    cash += (revenue - sell_fee)
+                    free_shares[i] -= vol
+                    stack_len[i] = top
+                    ref_price[i] = stack_price[i, top - 1] if top > 0 else actual_sell_price
+                    cash_flow[i] += revenue - sell_fee
+                    fees[i] += sell_fee
+                    sell_count[i] += 1
+                    trades = _record(trades, n_trades, ts, i, -1.0, actual_sell_price, vol, sell_fee, cash,
+                                     locked_shares[i] + free_shares[i] + frozen_shares[i])
+                    n_trades += 1
+                else:
+                    break
+
+            last_close[i] = c
+
+        # --- 买入：收集触发的标的，按优先规则从共享现金中依次成交 ---
+        n_candidates = 0
+        for i in range(n_symbols):
+            if not valid[t, i] or paused[i] or closes[t, i] >= upper_limit[i]:
+                continue
+            next_buy_price = ref_price[i] * (1.0 - grid_density[i])
+            if lower_limit[i] > 0.0 and next_buy_price <= lower_limit[i]:
+                continue
+            if next_buy_price > 0.0 and lows[t, i] <= next_buy_price:
+                candidates[n_candidates] = i
+                candidate_price[n_candidates] = min(next_buy_price, opens[t, i])
+                if priority_rule == 1:
+                    candidate_key[n_candidates] = (lows[t, i] - ref_price[i]) / ref_price[i]
+                elif priority_rule == 2:
+                    allocated = initial_capital * allocations[i]
+                    held = (locked_shares[i] + free_shares[i] + frozen_shares[i]) * closes[t, i]
+                    candidate_key[n_candidates] = held / allocated if allocated > 0 else 0.0
+                else:
+                    candidate_key[n_candidates] = priority_rank[i]
+                n_candidates += 1
+
+        if n_candidates > 0:
+            order = np.argsort(candidate_key[:n_candidates], kind='mergesort')
+            for j in order:
+                i = candidates[j]
+                actual_buy_price = candidate_price[j]
+                buy_vol = np.floor(pos_per_grid[i] / 100.0) * 100.0
+                if buy_vol <= 0:
+                    continue
+                total_pay = (actual_buy_price * buy_vol) * (1.0 + fee_rate)
+                if cash >= total_pay:
+                    cash -= total_pay
+                    frozen_shares[i] += buy_vol
+                    stack_price, stack_vol = _push_stack(stack_price, stack_vol, stack_len, i,
+                                                         actual_buy_price, buy_vol)
+                    ref_price[i] = actual_buy_price
+                    buy_fee = total_pay - (actual_buy_price * buy_vol)
+                    cash_flow[i] -= total_pay
+                    fees[i] += buy_fee
+                    buy_count[i] += 1
+                    trades = _record(trades, n_trades, ts, i, 1.0, actual_buy_price, buy_vol, buy_fee, cash,
+                                     locked_shares[i] + free_shares[i] + frozen_shares[i])
+                    n_trades += 1
+
+        # --- 净值 ---
+        equity = cash
+        for i in range(n_symbols):
+            equity += (locked_shares[i] + free_shares[i] + frozen_shares[i]) * last_close[i]
+        equity_curve[t] = equity
+        cash_history[t] = cash
+
+        while next_day_end < len(day_end_idx) and day_end_idx[next_day_end] == t:
+            for i in range(n_symbols):
+                daily_values[next_day_end, i] = (locked_shares[i] + free_shares[i] + frozen_shares[i]) * last_close[i]
+            next_day_end += 1
+
+    summary = np.zeros((n_symbols, 6))
+    for i in range(n_symbols):
+        shares = locked_shares[i] + free_shares[i] + frozen_shares[i]
+        summary[i, 0] = cash_flow[i]
+        summary[i, 1] = fees[i]
+        summary[i, 2] = buy_count[i]
+        summary[i, 3] = sell_count[i]
+        summary[i, 4] = shares
+        summary[i, 5] = shares * last_close[i]
+
+    return equity_curve, cash_history, daily_values, summary, trades[:n_trades]
+
+
+class ShannonPortfolioEngine:
+    """
+    多标的香农网格组合回测（共享现金池）。
+    各标的分钟数据按时间戳并集对齐成 [T, N] 矩阵，缺失的 K 线不交易、估值沿用最近收盘价。
+    """
+
+    def __init__(self, symbols: list, arrays_list: list):
+        if not symbols or len(symbols) != len(arrays_list):
+            raise ValueError('标的列表与数据不匹配')
+        self.symbols = list(symbols)
+
+        self.timestamps = np.unique(np.concatenate([np.asarray(a['ts'], dtype=np.int64) for a in arrays_list]))
+        n_steps, n_symbols = len(self.timestamps), len(self.symbols)
+        self.valid = np.zeros((n_steps, n_symbols), dtype=np.bool_)
+        self.opens = np.full((n_steps, n_symbols), np.nan)
+        self.highs = np.full((n_steps, n_symbols), np.nan)
+        self.lows = np.full((n_steps, n_symbols), np.nan)
+        self.closes = np.full((n_steps, n_symbols), np.nan)
+        for i, arrays in enumerate(arrays_list):
+            rows = np.searchsorted(self.timestamps, np.asarray(arrays['ts'], dtype=np.int64))
+            self.valid[rows, i] = True
+            self.opens[rows, i] = arrays['open']
+            self.highs[rows, i] = arrays['high']
+            self.lows[rows, i] = arrays['low']
+            self.closes[rows, i] = arrays['close']
+
+        self.day_starts = day_start_index(self.timestamps)
+
+    @classmethod
+    def from_loader(cls, loader, symbols: list, start_date: str = None, end_date: str = None):
+        """从 MinDataLoader 读取各标的分钟数组创建"""
+        arrays_list = []
+        for symbol in symbols:
+            arrays = loader.load_arrays(symbol, start_date, end_date)
+            if len(arrays['ts']) == 0:
+                raise ValueError(f"本地未找到 {symbol} 的分钟数据。请确保已下载数据或导入数据到数据库。")
+            arrays_list.append(arrays)
+        return cls(symbols, arrays_list)
+
+    def _per_symbol(self, value, name: str) -> np.ndarray:
+        """参数可以是单值（所有标的相同）、列表或 {标的: 值}"""
+        if isinstance(value, dict):
+            value = [value[symbol] for symbol in self.symbols]
+        arr = np.broadcast_to(np.asarray(value, dtype=np.float64), (len(self.symbols),))
+        if np.isnan(arr).any():
+            raise ValueError(f'参数 {name} 含有无效值')
+        return np.ascontiguousarray(arr)
+
+    def run(self, initial_capital=100000, allocations=None, grid_density=0.015, sell_gap=0.02, pos_per_grid=5000,
+            faith_ratio=0.2, grid_ratio=0.3, lower_limit=0.0, upper_limit=999.0, priority='order'):
+        """
+        Args:
+            allocations: 各标的建仓资金占比，默认等分
+            其余网格参数同 ShannonEngine.run，可为单值、列表或 {标的: 值}
+            priority: 资金不足时的买入优先规则，见 PRIORITY_RULES
+
+        Returns:
+            dict: 组合净值 / 现金曲线，按标的归因，交易记录
+        """
+        if priority not in PRIORITY_RULES:
+            raise ValueError(f'不支持的优先规则: {priority}')
+        fee_rate = 0.00006
+        n_symbols = len(self.symbols)
+        if allocations is None:
+            allocations = np.full(n_symbols, 1.0 / n_symbols)
+
+        day_end_idx = self.day_starts[1:] - 1
+        equity_curve, cash_history, daily_values, summary, trades = _portfolio_backtest(
+            self.timestamps, self.opens, self.highs, self.lows, self.closes, self.valid,
+            float(initial_capital), self._per_symbol(allocations, 'allocations'),
+            self._per_symbol(grid_density, 'grid_density'), self._per_symbol(sell_gap, 'sell_gap'),
+            self._per_symbol(pos_per_grid, 'pos_per_grid'), self._per_symbol(faith_ratio, 'faith_ratio'),
+            self._per_symbol(grid_ratio, 'grid_ratio'), self._per_symbol(lower_limit, 'lower_limit'),
+            self._per_symbol(upper_limit, 'upper_limit'), PRIORITY_RULES[priority],
+            np.arange(n_symbols, dtype=np.float64), fee_rate, day_end_idx
+        )
+
+        attribution = []
+        for i, symbol in enumerate(self.symbols):
+            net_cash_flow, fees, buys, sells, shares, market_value = summary[i]
+            attribution.append({
+                'symbol': symbol,
+                'pnl': float(net_cash_flow + market_value),
+                'fees': float(fees),
+                'buy_count': int(buys),
+                'sell_count': int(sells),
+                'final_shares': int(shares),
+                'market_value': float(market_value),
+            })
+
+        return {
+            'timestamps': self.timestamps,
+            'equity_curve': equity_curve,
+            'cash_history': cash_history,
+            'dates': self.timestamps[self.day_starts[:-1]] // 10000,
+            'daily_values': daily_values,
+            'attribution': attribution,
+            'trades': trades,
+            'final_equity': equity_curve[-1] if len(equity_curve) > 0 else initial_capital
+        }
@@ -1,136 +1,156 @@
 import numpy as np
 import pandas as pd
-from numba import jit
-from numba.typed import List
+from numba import njit, prange
 from dataclasses import dataclass
 from typing import Dict, Any
 
-@jit(nopython=True)
-def _core_backtest(
-    timestamps, opens, highs, lows, closes, 
-    initial_capital, grid_density, sell_gap, pos_per_grid, 
-    faith_ratio, grid_ratio, lower_limit, upper_limit, fee_rate, min_fee
+from grid.bar_resampler import resample_arrays
+
+# 交易记录列（_core_backtest 输出的二维数组按此顺序）
+TRADE_FIELDS = ('timestamp', 'type', 'price', 'volume', 'fee', 'cash', 'total_shares')
+
+# 交易类型编码 -> 标签
+TRADE_TYPE_LABELS = {1.1: 'BUY(信仰底仓)', 1.2: 'BUY(网格底仓)', 1.0: 'BUY', -1.0: 'SELL'}
+
+
+@njit(cache=True)
+def _grow_2d(arr, rows):
+    """二维数组按行扩容到至少 rows 行（容量翻倍）"""
+    if rows <= arr.shape[0]:
+        return arr
+    new_arr = np.zeros((max(rows, arr.shape[0] * 2), arr.shape[1]))
+    new_arr[:arr.shape[0]] = arr
+    return new_arr
+
+
+@njit(cache=True)
+def _write_trade(trades, n_trades, ts, kind, price, vol, fee, cash, total_shares):
+    """写入第 n_trades 条交易记录（逐元素赋值，不为每笔交易分配临时数组）"""
+    trades = _grow_2d(trades, n_trades + 1)
+    trades[n_trades, 0] = ts
+    trades[n_trades, 1] = kind
+    trades[n_trades, 2] = price
+    trades[n_trades, 3] = vol
+    trades[n_trades, 4] = fee
+    trades[n_trades, 5] = cash
+    trades[n_trades, 6] = total_shares
+    return trades
+
+
+# 网格状态向量下标（_advance_backtest 的输入 / 输出，ShannonStreamEngine 据此持久化）
+S_CASH, S_FREE, S_FROZEN, S_LOCKED, S_REF, S_DATE, S_PAUSED, S_PAUSE_DAY, S_STARTED, S_LAST_TS, S_LAST_CLOSE = range(11)
+STATE_SIZE = 11
+
+
+@njit(cache=True)
+def _grow_stack(stack_price, stack_vol, stack_len):
+    """LIFO 栈已满时容量翻倍"""
+    if stack_len < len(stack_price):
+        return stack_price, stack_vol
+    cap = max(64, len(stack_price) * 2)
+    new_price = np.zeros(cap)
+    new_vol = np.zeros(cap)
+    new_price[:stack_len] = stack_price[:stack_len]
+    new_vol[:stack_len] = stack_vol[:stack_len]
+    return new_price, new_vol
+
+
+@njit(cache=True)
+def _advance_backtest(
+    state, stack_price, stack_vol, stack_len,
+    timestamps, opens, highs, lows, closes,
+    initial_capital, grid_density, sell_gap, pos_per_grid,
+    faith_ratio, grid_ratio, lower_limit, upper_limit, fee_rate
 ):
-    # --- 状态初始化 ---
-    cash = float(initial_capital)
-    free_shares = 0.0
-    frozen_shares = 0.0
-    
-    # 交易记录
-    trades_log = List()
-    
-    # LIFO 栈
-    pos_stack_price = List()
-    pos_stack_vol = List()
-    
-    # 参考价格
-    ref_price = opens[0]
-    
-    # 日期追踪
-    current_date = timestamps[0] // 10000
-    
-    # --- 1. 顶层资产配置初始化 (T=0) ---
-    locked_shares = 0.0
-    
-    # A. 信仰底仓 (Core Holding)
-    if faith_ratio > 0:
-        target_faith_amt = initial_capital * faith_ratio
-        faith_shares = np.floor(target_faith_amt / ref_price / 100.0) * 100.0
-        
-        if faith_shares > 0:
-            faith_cost = ref_price * faith_shares
-            faith_fee = faith_cost * fee_rate
-            if cash >= (faith_cost + faith_fee):
-                cash -= (faith_cost + faith_fee)
-                locked_shares = faith_shares
-                trades_log.append(np.array([float(timestamps[0]), 1.1, ref_price, faith_shares, faith_fee, cash, locked_shares]))
-
-    # B. 网格底仓 (Grid Inventory)
-    if grid_ratio > 0:
-        target_grid_amt = initial_capital * grid_ratio
-        grid_shares = np.floor(target_grid_amt / ref_price / 100.0) * 100.0
-        
-        if grid_shares > 0:
-            grid_cost = ref_price * grid_shares
-            grid_fee = grid_cost * fee_rate
-            if cash >= (grid_cost + grid_fee):
-                cash -= (grid_cost + grid_fee)
-                
-                # 切碎并入栈
-                std_buy_vol = np.floor(pos_per_grid / 100.0) * 100.0
-                if std_buy_vol <= 0: std_buy_vol = 100.0
-                
-                # 1. 先计算总共能切多少格
-                # (不做实际 push，只算 count)
-                num_steps = 0
-                temp_rem = grid_shares
-                while temp_rem > 0:
-                    vol = min(temp_rem, std_buy_vol)
-                    temp_rem -= vol
-                    num_steps += 1
-                
-                # 2. 倒序生成并压栈 (从 High 到 Low)
-                # 这样最后压入的是 Low (Ref Price)，位于栈顶
-                # step 范围: num_steps-1 -> 0
-                
-                # 我们需要重新计算每一格的 volume。
-                # 注意：如果是均分或者最后余数在最后，倒序时要小心。
-                # 正序时：[Std, Std, ..., Remainder] (Price Low -> High)
-                # 倒序时：我们要先压 Remainder (High Price)，最后压 Std (Low Price)?
-                # 不，Price 是固定的阶梯。
-                # 第 k 格 (k=0...N-1) 的 Price 是 Ref * (1+g)^k
-                # 第 k 格的 Volume 是 Std (除了最后一格 k=N-1 是 Remainder)
-                
-                # 所以我们循环 k 从 N-1 到 0
-                for k in range(num_steps - 1, -1, -1):
-                    virtual_cost = ref_price * ((1.0 + sell_gap) ** k)
-                    
-                    # 计算这一格的 volume
-                    # 如果是最后一格 (k=num_steps-1)，它可能是余数
-                    # 实际上：总 grid_shares = (N-1)*Std + Remainder
-                    # 所以 k=N-1 时，vol = grid_shares - (N-1)*Std
-                    # k < N-1 时，vol = Std
-                    
-                    if k == num_steps - 1:
-                        # 最高价的一格，承担余数
-                        # 防止精度误差，直接减
-                        vol = grid_shares - (num_steps - 1) * std_buy_vol
-                    else:
-                        vol = std_buy_vol
-                        
-                    pos_stack_price.append(virtual_cost)
-                    pos_stack_vol.append(vol)
-                
-                # 记录交易
-                # 注意：此时 total_shares = locked + grid
-                current_total = locked_shares + grid_shares
-                trades_log.append(np.array([float(timestamps[0]), 1.2, ref_price, grid_shares, grid_fee, cash, current_total]))
-                
-                # 关键修复：将初始网格底仓加入冻结池，等待 T+1 解冻后变为可用
-                frozen_shares += grid_shares
+    """
+    香农网格逐根 K 线撮合，从给定状态继续推进一批 K 线（全量回测即从初始状态推进全部 K 线）。
+    state / 栈为上一次推进结束时的状态；尚未建仓 (state[S_STARTED] == 0) 时用本批第一根 K 线建仓。
+
+    返回: 新状态, 栈价格, 栈数量, 栈深度, 交易记录 [M, 7]（列见 TRADE_FIELDS）, 逐根净值, 逐根现金
+    """
+    state = state.copy()
+    cash = state[S_CASH]
+    free_shares = state[S_FREE]
+    frozen_shares = state[S_FROZEN]
+    locked_shares = state[S_LOCKED]
+    ref_price = state[S_REF]
+    current_date = np.int64(state[S_DATE])
+    lower_limit_paused = state[S_PAUSED] > 0
+    lower_pause_day = np.int64(state[S_PAUSE_DAY])
+    lower_recovery_ratio = 1.02
 
-    # --- 2. 循环遍历 K 线 ---
     n_steps = len(timestamps)
+    # 交易记录：预分配二维数组 [M, 7]，不足时容量翻倍
+    trades = np.zeros((64, 7))
+    n_trades = 0
     equity_curve = np.zeros(n_steps)
     cash_history = np.zeros(n_steps)
-    lower_limit_paused = False
-    lower_pause_day = 0
-    lower_recovery_ratio = 1.02
-    
+
+    if n_steps > 0 and state[S_STARTED] == 0:
+        # --- 1. 顶层资产配置初始化 (T=0) ---
+        ref_price = opens[0]
+        current_date = timestamps[0] // 10000
+
+        # A. 信仰底仓 (Core Holding)
+        if faith_ratio > 0:
+            faith_shares = np.floor(initial_capital * faith_ratio / ref_price / 100.0) * 100.0
+            if faith_shares > 0:
+                faith_cost = ref_price * faith_shares
+                faith_fee = faith_cost * fee_rate
+                if cash >= (faith_cost + faith_fee):
+                    cash -= (faith_cost + faith_fee)
+                    locked_shares = faith_shares
+                    trades = _write_trade(trades, n_trades, float(timestamps[0]), 1.1, ref_price, faith_shares, faith_fee, cash, locked_shares)
+                    n_trades += 1
+
+        # B. 网格底仓 (Grid Inventory)
+        if grid_ratio > 0:
+            grid_shares = np.floor(initial_capital * grid_ratio / ref_price / 100.0) * 100.0
+            if grid_shares > 0:
+                grid_cost = ref_price * grid_shares
+                grid_fee = grid_cost * fee_rate
+                if cash >= (grid_cost + grid_fee):
+                    cash -= (grid_cost + grid_fee)
+
+                    # 切碎并入栈：先算总格数，第 k 格成本为 Ref * (1+g)^k，最高一格承担余数
+                    std_buy_vol = np.floor(pos_per_grid / 100.0) * 100.0
+                    if std_buy_vol <= 0:
+                        std_buy_vol = 100.0
+                    num_steps = 0
+                    temp_rem = grid_shares
+                    while temp_rem > 0:
+                        temp_rem -= min(temp_rem, std_buy_vol)
+                        num_steps += 1
+                    # 倒序压栈 (从 High 到 Low)，最后压入的 Ref Price 位于栈顶
+                    for k in range(num_steps - 1, -1, -1):
+                        virtual_cost = ref_price * ((1.0 + sell_gap) ** k)
+                        if k == num_steps - 1:
+                            vol = grid_shares - (num_steps - 1) * std_buy_vol
+                        else:
+                            vol = std_buy_vol
+                        stack_price, stack_vol = _grow_stack(stack_price, stack_vol, stack_len)
+                        stack_price[stack_len] = virtual_cost
+                        stack_vol[stack_len] = vol
+                        stack_len += 1
+                    trades = _write_trade(trades, n_trades, float(timestamps[0]), 1.2, ref_price, grid_shares, grid_fee, cash, locked_shares + grid_shares)
+                    n_trades += 1
+                    # 初始网格底仓进入冻结池，T+1 解冻后变为可用
+                    frozen_shares += grid_shares
+        state[S_STARTED] = 1.0
+
+    # --- 2. 循环遍历 K 线 ---
     for i in range(n_steps):
         ts = timestamps[i]
         today = ts // 10000
-        
         o, h, l, c = opens[i], highs[i], lows[i], closes[i]
-        
+
         # --- T+1 结算 ---
         if today > current_date:
             free_shares += frozen_shares
             frozen_shares = 0.0
             current_date = today
-            
-        # [Adjusted] 移除突破上限清仓逻辑，改为仅停止买入(断电)
-        # 上限之上，持仓仍可正常止盈，但不补回。
+
+        # 上限之上仅停止买入(断电)，持仓仍可正常止盈，但不补回。
 
         # --- 下限暂停新增逻辑 ---
         # 只要分钟内触碰下限，就立即暂停新增；恢复必须等到后续交易日重新站回下限上方缓冲区。
@@ -144,32 +164,26 @@ def _core_backtest(
                 lower_pause_day = today
 
         # --- 卖出逻辑 (LIFO) ---
-        while len(pos_stack_price) > 0:
-            cost = pos_stack_price[-1]
-            vol = pos_stack_vol[-1]
+        while stack_len > 0:
+            cost = stack_price[stack_len - 1]
+            vol = stack_vol[stack_len - 1]
             target_sell_price = cost * (1.0 + sell_gap)
-            
-            if h >= target_sell_price:
-                if free_shares >= vol:
-                    # 撮合逻辑：如果开盘价就高过止盈价，按开盘价成交（高卖）
-                    actual_sell_price = max(target_sell_price, o)
-                    
-                    revenue = actual_sell_price * vol
-                    sell_fee = revenue * fee_rate
-                    cash += (revenue - sell_fee)
-                    free_shares -= vol
-                    pos_stack_price.pop()
-                    pos_stack_vol.pop()
-                    # 空仓后应以最后一次真实卖出价为新锚点，避免回补价错误地锚定旧成本。
-                    ref_price = pos_stack_price[-1] if len(pos_stack_price) > 0 else actual_sell_price
-                    
-                    current_total_shares = locked_shares + free_shares + frozen_shares
-                    trades_log.append(np.array([float(ts), -1.0, actual_sell_price, float(vol), sell_fee, cash, current_total_shares]))
-                else:
-                    break
+            if h >= target_sell_price and free_shares >= vol:
+                # 撮合逻辑：如果开盘价就高过止盈价，按开盘价成交（高卖）
+                actual_sell_price = max(target_sell_price, o)
+                revenue = actual_sell_price * vol
+                sell_fee = revenue * fee_rate
+                cash += (revenue - sell_fee)
+                free_shares -= vol
+                stack_len -= 1
+                # 空仓后应以最后一次真实卖出价为新锚点，避免回补价错误地锚定旧成本。
+                ref_price = stack_price[stack_len - 1] if stack_len > 0 else actual_sell_price
+                current_total_shares = locked_shares + free_shares + frozen_shares
+                trades = _write_trade(trades, n_trades, float(ts), -1.0, actual_sell_price, float(vol), sell_fee, cash, current_total_shares)
+                n_trades += 1
             else:
                 break
-        
+
         # --- 买入逻辑 ---
         can_buy = (not lower_limit_paused) and (c < upper_limit)
         if can_buy:
@@ -179,44 +193,270 @@ def _core_backtest(
             if next_buy_price > 0.0 and l <= next_buy_price:
                 # 撮合逻辑：如果开盘价就低于买入价，按开盘价成交（低买）
                 actual_buy_price = min(next_buy_price, o)
-                
                 buy_vol = np.floor(pos_per_grid / 100.0) * 100.0
                 if buy_vol > 0:
                     total_pay = (actual_buy_price * buy_vol) * (1.0 + fee_rate)
                     if cash >= total_pay:
                         cash -= total_pay
                         frozen_shares += buy_vol
-                        pos_stack_price.append(actual_buy_price)
-                        pos_stack_vol.append(buy_vol)
+                        stack_price, stack_vol = _grow_stack(stack_price, stack_vol, stack_len)
+                        stack_price[stack_len] = actual_buy_price
+                        stack_vol[stack_len] = buy_vol
+                        stack_len += 1
                         ref_price = actual_buy_price
-                        
                         current_total_shares = locked_shares + free_shares + frozen_shares
-                        trades_log.append(np.array([float(ts), 1.0, actual_buy_price, float(buy_vol), total_pay - (actual_buy_price * buy_vol), cash, current_total_shares]))
-        
+                        trades = _write_trade(trades, n_trades, float(ts), 1.0, actual_buy_price, float(buy_vol), total_pay - (actual_buy_price * buy_vol), cash, current_total_shares)
+                        n_trades += 1
+
         # --- 记录净值 ---
-        total_shares = locked_shares + free_shares + frozen_shares
-        equity = cash + total_shares * c
-        equity_curve[i] = equity
+        equity_curve[i] = cash + (locked_shares + free_shares + frozen_shares) * c
         cash_history[i] = cash
 
-    return equity_curve, trades_log, cash_history
+    state[S_CASH] = cash
+    state[S_FREE] = free_shares
+    state[S_FROZEN] = frozen_shares
+    state[S_LOCKED] = locked_shares
+    state[S_REF] = ref_price
+    state[S_DATE] = current_date
+    state[S_PAUSED] = 1.0 if lower_limit_paused else 0.0
+    state[S_PAUSE_DAY] = lower_pause_day
+    if n_steps > 0:
+        state[S_LAST_TS] = timestamps[n_steps - 1]
+        state[S_LAST_CLOSE] = closes[n_steps - 1]
+    return state, stack_price, stack_vol, stack_len, trades[:n_trades], equity_curve, cash_history
+
+
+@njit(cache=True)
+def _core_backtest(
+    timestamps, opens, highs, lows, closes,
+    initial_capital, grid_density, sell_gap, pos_per_grid,
+    faith_ratio, grid_ratio, lower_limit, upper_limit, fee_rate, min_fee
+):
+    """全量回测：从初始状态（全部为现金、尚未建仓）推进全部 K 线，返回 逐根净值, 交易记录 [M, 7], 逐根现金"""
+    state = np.zeros(STATE_SIZE)
+    state[S_CASH] = float(initial_capital)
+    _, _, _, _, trades, equity_curve, cash_history = _advance_backtest(
+        state, np.zeros(64), np.zeros(64), 0,
+        timestamps, opens, highs, lows, closes,
+        float(initial_capital), grid_density, sell_gap, pos_per_grid,
+        faith_ratio, grid_ratio, lower_limit, upper_limit, fee_rate
+    )
+    return equity_curve, trades, cash_history
+
+@njit(parallel=True, cache=True)
+def _batch_grid_stats(
+    timestamps, opens, highs, lows, closes,
+    initial_capital, param_matrix, lower_limit, upper_limit, fee_rate, min_fee,
+    day_end_idx, n_days
+):
+    """
+    多参数并行回测，只返回每组参数的汇总指标，不保留完整净值曲线。
+    param_matrix: [N, 5] -> (grid_density, sell_gap, pos_per_grid, faith_ratio, grid_ratio)
+    day_end_idx: 每个交易日最后一根K线的下标，用于日线夏普
+    n_days: 交易日数，用于年化
+    返回: [N, 4] -> (sharpe, calmar, total_ret_pct, max_dd_pct)
+    """
+    n_params = param_matrix.shape[0]
+    stats = np.zeros((n_params, 4))
+    n_daily = len(day_end_idx)
+
+    for p in prange(n_params):
+        equity_curve, _, _ = _core_backtest(
+            timestamps, opens, highs, lows, closes,
+            initial_capital, param_matrix[p, 0], param_matrix[p, 1], param_matrix[p, 2],
+            param_matrix[p, 3], param_matrix[p, 4], lower_limit, upper_limit, fee_rate, min_fee
+        )
+        n_steps = len(equity_curve)
+
+        # 日线夏普
+        sharpe = 0.0
+        if n_daily > 1:
+            rets = np.empty(n_daily - 1)
+            for k in range(1, n_daily):
+                prev = equity_curve[day_end_idx[k - 1]]
+                rets[k - 1] = (equity_curve[day_end_idx[k]] - prev) / prev
+            std = np.std(rets)
+            if std > 0:
+                sharpe = np.mean(rets) / std * np.sqrt(252.0)
+
+        # 最大回撤
+        max_dd = 0.0
+        if n_steps > 0:
+            peak = equity_curve[0]
+            for k in range(n_steps):
+                eq = equity_curve[k]
+                if eq > peak:
+                    peak = eq
+                dd = (peak - eq) / peak
+                if dd > max_dd:
+                    max_dd = dd
+        max_dd *= 100.0
+
+        final_eq = equity_curve[n_steps - 1] if n_steps > 0 else initial_capital
+        total_ret_pct = (final_eq - initial_capital) / initial_capital * 100.0
+
+        # Calmar = 年化收益 / 最大回撤
+        annual_ret = total_ret_pct / (n_days / 252.0) if n_days > 0 else 0.0
+        calmar = annual_ret / max_dd if max_dd > 0.1 else 10.0
+
+        stats[p, 0] = sharpe
+        stats[p, 1] = calmar
+        stats[p, 2] = total_ret_pct
+        stats[p, 3] = max_dd
+
+    return stats
+
+def day_start_index(timestamps) -> np.ndarray:
+    """
+    每个交易日第一根 K 线的下标，末尾追加总长度（长度 = 交易日数 + 1）。
+    按时间戳的日期部分切分，不假设每天固定 240 根。
+    """
+    days = np.asarray(timestamps, dtype=np.int64) // 10000
+    return np.append(np.flatnonzero(np.r_[True, days[1:] != days[:-1]]), len(days)).astype(np.int64)
+
+class TradeTable:
+    """
+    列式交易记录表，包装 _core_backtest 输出的 [M, 7] 数组（列见 TRADE_FIELDS）。
+    len() / 按列读取不做任何转换；迭代、下标访问或 to_dicts() 时才按需生成接口使用的 dict，
+    to_frame() 一次性向量化转换为 DataFrame。
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = np.asarray(data, dtype=np.float64).reshape(-1, len(TRADE_FIELDS))
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.data[:, TRADE_FIELDS.index(name)]
+
+    @staticmethod
+    def _type_label(type_val: float) -> str:
+        if type_val == 1.1:
+            return TRADE_TYPE_LABELS[1.1]
+        if type_val == 1.2:
+            return TRADE_TYPE_LABELS[1.2]
+        return 'BUY' if type_val > 0 else 'SELL'
+
+    def _row_dict(self, t) -> Dict[str, Any]:
+        price = t[2]
+        cash = t[5]
+        total_shares = t[6]
+        return {
+            'timestamp': str(int(t[0])),
+            'type': self._type_label(t[1]),
+            'price': float(price),
+            'volume': int(t[3]),
+            'fee': float(t[4]),
+            'cash': float(cash),
+            'total_shares': int(total_shares),
+            'total_equity': float(cash + total_shares * price)
+        }
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return TradeTable(self.data[idx])
+        return self._row_dict(self.data[idx])
+
+    def __iter__(self):
+        for t in self.data:
+            yield self._row_dict(t)
+
+    def to_dicts(self) -> list:
+        """转换为 dict 列表（接口 JSON 输出格式）"""
+        return [self._row_dict(t) for t in self.data]
+
+    def to_frame(self) -> pd.DataFrame:
+        """转换为 DataFrame，类型列为标签，并附带 total_equity"""
+        df = pd.DataFrame(self.data, columns=list(TRADE_FIELDS))
+        df['timestamp'] = df['timestamp'].astype('int64')
+        df['type'] = np.where(df['type'] == 1.1, TRADE_TYPE_LABELS[1.1],
+                              np.where(df['type'] == 1.2, TRADE_TYPE_LABELS[1.2],
+                                       np.where(df['type'] > 0, 'BUY', 'SELL')))
+        df['volume'] = df['volume'].astype('int64')
+        df['total_shares'] = df['total_shares'].astype('int64')
+        df['total_equity'] = df['cash'] + df['total_shares'] * df['price']
+        return df
+
 
 class ShannonEngine:
-    def __init__(self, df_min: pd.DataFrame):
-        self.df = df_min.copy()
-        if 'timestamp' not in self.df.columns:
-            self.df['timestamp'] = self.df['date']
+    def __init__(self, df_min: pd.DataFrame, timeframe: str = '1m'):
+        self._df = df_min.copy()
+        if 'timestamp' not in self._df.columns:
+            self._df['timestamp'] = self._df['date']
         
-        if self.df['timestamp'].dtype == 'object':
-            self.df['ts_int'] = self.df['timestamp'].astype(str).str.replace(r'[-: ]', '', regex=True).str[:12].astype('int64')
+        if self._df['timestamp'].dtype == 'object':
+            self._df['ts_int'] = self._df['timestamp'].astype(str).str.replace(r'[-: ]', '', regex=True).str[:12].astype('int64')
         else:
-            self.df['ts_int'] = self.df['timestamp'].astype('int64')
+            self._df['ts_int'] = self._df['timestamp'].astype('int64')
 
-        self.timestamps = self.df['ts_int'].values
-        self.opens = self.df['open'].values.astype('float64')
-        self.highs = self.df['high'].values.astype('float64')
-        self.lows = self.df['low'].values.astype('float64')
-        self.closes = self.df['close'].values.astype('float64')
+        self.timestamps = self._df['ts_int'].values
+        self.opens = self._df['open'].values.astype('float64')
+        self.highs = self._df['high'].values.astype('float64')
+        self.lows = self._df['low'].values.astype('float64')
+        self.closes = self._df['close'].values.astype('float64')
+        self.timeframe = '1m'
+        if timeframe != '1m':
+            self._set_timeframe(timeframe)
+
+    @classmethod
+    def from_arrays(cls, ts, opens, highs, lows, closes, timeframe: str = '1m'):
+        """
+        直接从数组创建引擎（MinDataLoader.load_arrays / load_bars / 列式存储），跳过 DataFrame 与时间戳字符串解析。
+        ts: int64 YYYYMMDDHHMM；OHLC: float64。已是对应 dtype 时不复制（可为 mmap 视图）。
+        timeframe: 回测周期（见 grid.bar_resampler.TIMEFRAME_MINUTES），输入为更细周期时先聚合，
+            如 '15m' 计算量约为分钟线的 1/15，适合参数粗筛后再用 '1m' 确认。
+        """
+        instance = cls.__new__(cls)
+        instance._df = None
+        instance.timestamps = np.asarray(ts, dtype=np.int64)
+        instance.opens = np.asarray(opens, dtype=np.float64)
+        instance.highs = np.asarray(highs, dtype=np.float64)
+        instance.lows = np.asarray(lows, dtype=np.float64)
+        instance.closes = np.asarray(closes, dtype=np.float64)
+        instance.timeframe = '1m'
+        if timeframe != '1m':
+            instance._set_timeframe(timeframe)
+        return instance
+
+    def _set_timeframe(self, timeframe: str):
+        bars = resample_arrays({
+            'ts': self.timestamps, 'open': self.opens, 'high': self.highs, 'low': self.lows, 'close': self.closes
+        }, timeframe)
+        self._df = None
+        self._day_starts = None
+        self.timestamps = bars['ts']
+        self.opens = bars['open']
+        self.highs = bars['high']
+        self.lows = bars['low']
+        self.closes = bars['close']
+        self.timeframe = timeframe
+
+    def resample(self, timeframe: str) -> 'ShannonEngine':
+        """聚合到更粗周期的新引擎（原引擎不变）"""
+        return ShannonEngine.from_arrays(
+            self.timestamps, self.opens, self.highs, self.lows, self.closes, timeframe=timeframe
+        )
+
+    @property
+    def day_starts(self) -> np.ndarray:
+        """交易日边界下标（见 day_start_index），按时间戳日期切分，不假设每天固定根数；首次访问时计算并缓存"""
+        if getattr(self, '_day_starts', None) is None:
+            self._day_starts = day_start_index(self.timestamps)
+        return self._day_starts
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """分钟数据 DataFrame (ts_int/open/high/low/close)，数组创建的引擎按需构建。"""
+        if self._df is None:
+            self._df = pd.DataFrame({
+                'ts_int': self.timestamps,
+                'open': self.opens,
+                'high': self.highs,
+                'low': self.lows,
+                'close': self.closes,
+            })
+        return self._df
 
     @classmethod
     def from_simulated_stream(cls, price_stream, dates_int):
@@ -225,27 +465,23 @@ class ShannonEngine:
         price_stream: numpy array [N_days * 240]
         dates_int: numpy array [N_days] (YYYYMMDD)
         """
-        n_days = len(dates_int)
         n_min = 240
-        total_len = n_days * n_min
         
         # 构造伪 timestamps (用于 T+1 判定)
         # 每天 240 分钟，格式: YYYYMMDD0000 -> YYYYMMDD0239
-        timestamps = np.zeros(total_len, dtype='int64')
-        for i in range(n_days):
-            base_ts = dates_int[i] * 10000
-            for m in range(n_min):
-                timestamps[i * n_min + m] = base_ts + m
-                
+        timestamps = (np.asarray(dates_int, dtype='int64')[:, None] * 10000 + np.arange(n_min, dtype='int64')).ravel()
+
         # 在模拟流中，OHLC 都是同一个 Price (因为是 Tick 流)
         # 或者我们可以直接修改 _core_backtest 接受 raw stream
         # 为了兼容性，我们将 stream 视为 OHLC
         instance = cls.__new__(cls)
+        instance._df = None
         instance.timestamps = timestamps
         instance.opens = price_stream
         instance.highs = price_stream
         instance.lows = price_stream
         instance.closes = price_stream
+        instance.timeframe = '1m'
         # 记录用于降采样的 meta
         instance.sim_dates = dates_int
         return instance
@@ -261,34 +497,40 @@ class ShannonEngine:
             initial_capital, grid_density, sell_gap, pos_per_grid,
             faith_ratio, grid_ratio, lower_limit, upper_limit, fee_rate, min_fee
         )
-        
-        trades = []
-        for t in trades_raw:
-            price = t[2]
-            cash = t[5]
-            total_shares = t[6]
-            type_val = t[1]
-            
-            # 转换方向标签
-            if type_val == 1.1: type_label = 'BUY(信仰底仓)'
-            elif type_val == 1.2: type_label = 'BUY(网格底仓)'
-            elif type_val > 0: type_label = 'BUY'
-            else: type_label = 'SELL'
-            
-            trades.append({
-                'timestamp': str(int(t[0])),
-                'type': type_label,
-                'price': price,
-                'volume': int(t[3]),
-                'fee': t[4],
-                'cash': cash,
-                'total_shares': int(total_shares),
-                'total_equity': cash + total_shares * price
-            })
-            
+
+        # trades 为列式 TradeTable，接口需要 dict 列表时再调用 to_dicts()
         return {
             'equity_curve': equity_curve,
             'cash_history': cash_history,
-            'trades': trades,
+            'trades': TradeTable(trades_raw),
             'final_equity': equity_curve[-1] if len(equity_curve) > 0 else initial_capital
         }
+
+    def run_batch(self, param_matrix, initial_capital=100000, lower_limit=0.0, upper_limit=999.0,
+                  day_end_idx=None, n_days=None):
+        """
+        多组参数并行回测（numba prange），只返回汇总指标。
+        param_matrix: [N, 5] -> (grid_density, sell_gap, pos_per_grid, faith_ratio, grid_ratio)
+        返回: dict of arrays -> sharpe / calmar / ret / max_dd，均为长度 N
+        """
+        fee_rate = 0.00006
+        min_fee = 0.0
+
+        # 默认按实际交易日边界计算日线指标，分钟线和聚合后的周期 K 线通用
+        if day_end_idx is None:
+            day_end_idx = self.day_starts[1:] - 1
+        if n_days is None:
+            n_days = len(self.day_starts) - 1
+
+        stats = _batch_grid_stats(
+            self.timestamps, self.opens, self.highs, self.lows, self.closes,
+            float(initial_capital), np.ascontiguousarray(param_matrix, dtype=np.float64),
+            float(lower_limit), float(upper_limit), fee_rate, min_fee,
+            np.asarray(day_end_idx, dtype=np.int64), float(n_days)
+        )
+        return {
+            'sharpe': stats[:, 0],
+            'calmar': stats[:, 1],
+            'ret': stats[:, 2],
+            'max_dd': stats[:, 3]
+        }
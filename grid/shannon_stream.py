@@ -0,0 +1,245 @@
+import json
+import sqlite3
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from grid.shannon_engine import (
+    S_CASH, S_DATE, S_FREE, S_FROZEN, S_LAST_CLOSE, S_LAST_TS, S_LOCKED, S_PAUSE_DAY, S_PAUSED, S_REF, S_STARTED,
+    STATE_SIZE, TradeTable, _advance_backtest,
+)
+
+
+@dataclass
+class GridPlanState:
+    """单个标的 / 规划的可序列化网格状态"""
+    symbol: str
+    plan_id: str
+    params: Dict
+    cash: float
+    start_date: str = None
+    free_shares: float = 0.0
+    frozen_shares: float = 0.0
+    locked_shares: float = 0.0
+    ref_price: float = 0.0
+    current_date: int = 0
+    lower_limit_paused: bool = False
+    lower_pause_day: int = 0
+    started: bool = False
+    last_ts: int = 0
+    last_close: float = 0.0
+    stack_price: List[float] = field(default_factory=list)
+    stack_vol: List[float] = field(default_factory=list)
+
+    @property
+    def total_shares(self) -> float:
+        return self.locked_shares + self.free_shares + self.frozen_shares
+
+    @property
+    def equity(self) -> float:
+        return self.cash + self.total_shares * self.last_close
+
+    def to_vector(self) -> np.ndarray:
+        state = np.zeros(STATE_SIZE)
+        state[S_CASH] = self.cash
+        state[S_FREE] = self.free_shares
+        state[S_FROZEN] = self.frozen_shares
+        state[S_LOCKED] = self.locked_shares
+        state[S_REF] = self.ref_price
+        state[S_DATE] = self.current_date
+        state[S_PAUSED] = 1.0 if self.lower_limit_paused else 0.0
+        state[S_PAUSE_DAY] = self.lower_pause_day
+        state[S_STARTED] = 1.0 if self.started else 0.0
+        state[S_LAST_TS] = self.last_ts
+        state[S_LAST_CLOSE] = self.last_close
+        return state
+
+    def update_from_vector(self, state: np.ndarray, stack_price: np.ndarray, stack_vol: np.ndarray, stack_len: int):
+        self.cash = float(state[S_CASH])
+        self.free_shares = float(state[S_FREE])
+        self.frozen_shares = float(state[S_FROZEN])
+        self.locked_shares = float(state[S_LOCKED])
+        self.ref_price = float(state[S_REF])
+        self.current_date = int(state[S_DATE])
+        self.lower_limit_paused = bool(state[S_PAUSED] > 0)
+        self.lower_pause_day = int(state[S_PAUSE_DAY])
+        self.started = bool(state[S_STARTED] > 0)
+        self.last_ts = int(state[S_LAST_TS])
+        self.last_close = float(state[S_LAST_CLOSE])
+        self.stack_price = stack_price[:stack_len].tolist()
+        self.stack_vol = stack_vol[:stack_len].tolist()
+
+
+class ShannonStreamEngine:
+    """
+    香农网格增量（实盘监控）引擎。
+    状态（LIFO 栈、冻结 / 可用份额、参考价、下限暂停状态等）按 标的 + 规划 持久化在 SQLite，
+    每次只推进新到达的 K 线，复杂度 O(新 K 线数)，结果与 ShannonEngine.run 全量回放一致。
+    """
+
+    # 与 ShannonEngine.run 的默认参数一致
+    DEFAULT_PARAMS = {
+        'initial_capital': 100000, 'grid_density': 0.015, 'sell_gap': 0.02, 'pos_per_grid': 5000,
+        'faith_ratio': 0.2, 'grid_ratio': 0.3, 'lower_limit': 0.0, 'upper_limit': 999.0
+    }
+
+    def __init__(self, db_path='db/market_data_min.db'):
+        self.db_path = db_path
+        self._init_db()
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS shannon_stream_state (
+                symbol TEXT,
+                plan_id TEXT,
+                state_json TEXT,
+                last_ts INTEGER,
+                updated_at TEXT,
+                PRIMARY KEY (symbol, plan_id)
+            )
+            '''
+        )
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS shannon_stream_trades (
+                symbol TEXT,
+                plan_id TEXT,
+                ts INTEGER,
+                type REAL,
+                price REAL,
+                volume REAL,
+                fee REAL,
+                cash REAL,
+                total_shares REAL
+            )
+            '''
+        )
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_stream_trades ON shannon_stream_trades (symbol, plan_id, ts)')
+        conn.commit()
+        conn.close()
+
+    def create_plan(self, symbol: str, plan_id: str = 'default', start_date: str = None, **params) -> GridPlanState:
+        """新建（或重置）规划，清空其状态和信号记录。start_date 为建仓日（默认从本地最早数据开始）"""
+        unknown = set(params) - set(self.DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f'不支持的参数: {", ".join(sorted(unknown))}')
+        merged = {**self.DEFAULT_PARAMS, **{k: float(v) for k, v in params.items() if v is not None}}
+        state = GridPlanState(symbol=symbol, plan_id=plan_id, params=merged, cash=float(merged['initial_capital']),
+                              start_date=start_date)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('DELETE FROM shannon_stream_trades WHERE symbol = ? AND plan_id = ?', (symbol, plan_id))
+            conn.commit()
+        finally:
+            conn.close()
+        self.checkpoint(state)
+        return state
+
+    def load(self, symbol: str, plan_id: str = 'default') -> GridPlanState | None:
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute(
+            'SELECT state_json FROM shannon_stream_state WHERE symbol = ? AND plan_id = ?', (symbol, plan_id)
+        ).fetchone()
+        conn.close()
+        return GridPlanState(**json.loads(row[0])) if row else None
+
+    def list_plans(self, symbol: str) -> List[str]:
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('SELECT plan_id FROM shannon_stream_state WHERE symbol = ?', (symbol,)).fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def checkpoint(self, state: GridPlanState, trades: np.ndarray = None, expected_last_ts: int = None) -> bool:
+        """
+        保存状态（与本次产生的信号在同一事务中写入）。
+        指定 expected_last_ts 时只在库中状态仍停留在该时刻时写入（乐观锁）：
+        状态已被其他调用推进则不写状态也不写信号，返回 False。
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            params = (json.dumps(asdict(state)), state.last_ts, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            if expected_last_ts is None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO shannon_stream_state VALUES (?, ?, ?, ?, ?)',
+                    (state.symbol, state.plan_id, *params)
+                )
+            elif conn.execute(
+                '''
+                UPDATE shannon_stream_state SET state_json = ?, last_ts = ?, updated_at = ?
+                WHERE symbol = ? AND plan_id = ? AND last_ts = ?
+                ''',
+                (*params, state.symbol, state.plan_id, expected_last_ts)
+            ).rowcount == 0:
+                conn.rollback()
+                return False
+            if trades is not None and len(trades):
+                conn.executemany(
+                    'INSERT INTO shannon_stream_trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(state.symbol, state.plan_id, int(t[0]), *map(float, t[1:])) for t in trades]
+                )
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    @staticmethod
+    def advance_state(state: GridPlanState, ts, opens, highs, lows, closes) -> np.ndarray:
+        """
+        在内存中推进状态（不落库）。早于或等于 state.last_ts 的 K 线会被跳过，重复推送同一批数据是安全的。
+
+        Returns:
+            np.ndarray: 新产生的交易记录 [M, 7]
+        """
+        ts = np.asarray(ts, dtype=np.int64)
+        start = int(np.searchsorted(ts, state.last_ts, side='right')) if state.last_ts else 0
+        params = state.params
+        stack_len = len(state.stack_price)
+        new_state, stack_price, stack_vol, stack_len, trades, _, _ = _advance_backtest(
+            state.to_vector(),
+            np.array(state.stack_price + [0.0] * max(64 - stack_len, 0), dtype=np.float64),
+            np.array(state.stack_vol + [0.0] * max(64 - stack_len, 0), dtype=np.float64),
+            stack_len,
+            ts[start:],
+            np.asarray(opens, dtype=np.float64)[start:],
+            np.asarray(highs, dtype=np.float64)[start:],
+            np.asarray(lows, dtype=np.float64)[start:],
+            np.asarray(closes, dtype=np.float64)[start:],
+            float(params['initial_capital']), float(params['grid_density']), float(params['sell_gap']),
+            float(params['pos_per_grid']), float(params['faith_ratio']), float(params['grid_ratio']),
+            float(params['lower_limit']), float(params['upper_limit']), 0.00006
+        )
+        state.update_from_vector(new_state, stack_price, stack_vol, stack_len)
+        return trades
+
+    def advance(self, symbol: str, plan_id: str, ts, opens, highs, lows, closes, max_retries: int = 3):
+        """
+        推进新 K 线并持久化，返回新产生的交易信号。
+        保存时状态已被并发的推进更新过，则重新加载并从新状态推进（已推进过的 K 线自动跳过），信号不会重复写入。
+        """
+        for _ in range(max_retries):
+            state = self.load(symbol, plan_id)
+            if state is None:
+                raise ValueError(f'规划不存在: {symbol}/{plan_id}')
+            loaded_ts = state.last_ts
+            trades = self.advance_state(state, ts, opens, highs, lows, closes)
+            if self.checkpoint(state, trades, expected_last_ts=loaded_ts):
+                return state, TradeTable(trades).to_dicts()
+        raise RuntimeError(f'规划状态被并发修改，推进失败: {symbol}/{plan_id}')
+
+    def advance_from_loader(self, loader, symbol: str, plan_id: str = 'default'):
+        """从 MinDataLoader 读取上次推进之后的新 K 线并推进（供每日同步任务调用）"""
+        state = self.load(symbol, plan_id)
+        if state is None:
+            raise ValueError(f'规划不存在: {symbol}/{plan_id}')
+        start_date = state.start_date
+        if state.last_ts:
+            day = str(state.last_ts // 10000)
+            start_date = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        arrays = loader.load_arrays(symbol, start_date)
+        return self.advance(symbol, plan_id, arrays['ts'], arrays['open'], arrays['high'], arrays['low'], arrays['close'])
@@ -0,0 +1,209 @@
+import numpy as np
+from numba import njit, prange
+
+from grid.shannon_engine import ShannonEngine, _core_backtest, day_start_index
+
+# 分布统计输出的分位点
+STRESS_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+@njit(cache=True)
+def _build_path(rel_o, rel_h, rel_l, rel_c, day_starts, path_days, path_dates, start_price):
+    """
+    按抽中的历史交易日顺序拼接一条模拟分钟路径。
+    每根 K 线的 OHLC 以相对前一根收盘价的比例存储，拼接时从 start_price 逐根复原，
+    因此隔夜跳空（当日第一根相对前一日最后一根）也随交易日一起被抽样。
+    """
+    total = 0
+    for j in range(len(path_days)):
+        d = path_days[j]
+        total += day_starts[d + 1] - day_starts[d]
+
+    ts = np.empty(total, dtype=np.int64)
+    opens = np.empty(total)
+    highs = np.empty(total)
+    lows = np.empty(total)
+    closes = np.empty(total)
+
+    last_close = start_price
+    pos = 0
+    for j in range(len(path_days)):
+        d = path_days[j]
+        base_ts = path_dates[j] * 10000
+        for i in range(day_starts[d], day_starts[d + 1]):
+            ts[pos] = base_ts + (i - day_starts[d])
+            opens[pos] = last_close * rel_o[i]
+            highs[pos] = last_close * rel_h[i]
+            lows[pos] = last_close * rel_l[i]
+            closes[pos] = last_close * rel_c[i]
+            last_close = closes[pos]
+            pos += 1
+    return ts, opens, highs, lows, closes
+
+
+@njit(parallel=True, cache=True)
+def _stress_kernel(
+    rel_o, rel_h, rel_l, rel_c, day_starts, path_day_matrix, path_dates, start_price,
+    initial_capital, grid_density, sell_gap, pos_per_grid, faith_ratio, grid_ratio,
+    lower_limit, upper_limit, fee_rate, min_fee
+):
+    """
+    多条模拟路径并行回测，只返回每条路径的汇总指标。
+    path_day_matrix: [路径数, 天数] 每条路径依次使用的历史交易日序号
+    返回: [路径数, 4] -> (期末权益, 最大回撤%, 最高资金占用%, 平均资金占用%)
+    """
+    n_paths = path_day_matrix.shape[0]
+    stats = np.zeros((n_paths, 4))
+
+    for p in prange(n_paths):
+        ts, opens, highs, lows, closes = _build_path(
+            rel_o, rel_h, rel_l, rel_c, day_starts, path_day_matrix[p], path_dates, start_price
+        )
+        equity_curve, _, cash_history = _core_backtest(
+            ts, opens, highs, lows, closes,
+            initial_capital, grid_density, sell_gap, pos_per_grid,
+            faith_ratio, grid_ratio, lower_limit, upper_limit, fee_rate, min_fee
+        )
+        n_steps = len(equity_curve)
+        if n_steps == 0:
+            stats[p, 0] = initial_capital
+            continue
+
+        peak = equity_curve[0]
+        max_dd = 0.0
+        max_util = 0.0
+        sum_util = 0.0
+        for k in range(n_steps):
+            eq = equity_curve[k]
+            if eq > peak:
+                peak = eq
+            dd = (peak - eq) / peak
+            if dd > max_dd:
+                max_dd = dd
+            # 资金占用：持仓市值占总权益的比例
+            util = 1.0 - cash_history[k] / eq if eq > 0 else 1.0
+            if util > max_util:
+                max_util = util
+            sum_util += util
+
+        stats[p, 0] = equity_curve[n_steps - 1]
+        stats[p, 1] = max_dd * 100.0
+        stats[p, 2] = max_util * 100.0
+        stats[p, 3] = sum_util / n_steps * 100.0
+
+    return stats
+
+
+class ShannonStressTester:
+    """
+    香农网格压力测试：按交易日分块自助抽样 (block bootstrap) 历史分钟数据，
+    生成大量模拟路径并行回测，输出期末权益、最大回撤、资金占用的分布。
+
+    以连续 block_days 个交易日为一块整体抽样，保留日内走势和短期的波动聚集；
+    路径从 start_price（默认最新收盘价）起步，便于直接使用当前规划的绝对上下限。
+    """
+
+    def __init__(self, ts, opens, highs, lows, closes):
+        ts = np.asarray(ts, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(ts) < 2:
+            raise ValueError('分钟数据不足，无法进行压力测试')
+
+        # 每个交易日的起始下标，末尾追加总长度
+        self.day_starts = day_start_index(ts)
+        self.dates = ts[self.day_starts[:-1]] // 10000
+        self.n_days = len(self.dates)
+        self.last_close = float(closes[-1])
+
+        prev_close = np.r_[np.nan, closes[:-1]]
+        self.rel_o = np.asarray(opens, dtype=np.float64) / prev_close
+        self.rel_h = np.asarray(highs, dtype=np.float64) / prev_close
+        self.rel_l = np.asarray(lows, dtype=np.float64) / prev_close
+        self.rel_c = closes / prev_close
+
+    @classmethod
+    def from_loader(cls, loader, symbol: str, start_date: str = None, end_date: str = None):
+        """从 MinDataLoader 读取分钟数组创建"""
+        arrays = loader.load_arrays(symbol, start_date, end_date)
+        if len(arrays['ts']) == 0:
+            raise ValueError(f"本地未找到 {symbol} 的分钟数据。请确保已下载数据或导入数据到数据库。")
+        return cls(arrays['ts'], arrays['open'], arrays['high'], arrays['low'], arrays['close'])
+
+    def sample_path_days(self, n_paths: int, n_days: int, block_days: int = 5, seed=None) -> np.ndarray:
+        """
+        抽样每条路径使用的历史交易日序号。
+        第一天没有前收盘价，不参与抽样；块起点在 [1, 总天数 - block_days] 内均匀抽取。
+
+        Returns:
+            np.ndarray: [n_paths, n_days]
+        """
+        block_days = max(1, min(int(block_days), self.n_days - 1))
+        n_starts = self.n_days - block_days
+        if n_starts < 1:
+            raise ValueError('历史交易日不足，无法进行分块抽样')
+
+        rng = np.random.default_rng(seed)
+        n_blocks = -(-n_days // block_days)
+        starts = rng.integers(1, n_starts + 1, size=(n_paths, n_blocks))
+        path_days = (starts[:, :, None] + np.arange(block_days)).reshape(n_paths, -1)
+        return np.ascontiguousarray(path_days[:, :n_days], dtype=np.int64)
+
+    def _path_dates(self, n_days: int) -> np.ndarray:
+        """模拟路径的日期：沿用最近 n_days 个历史交易日的日期，不足时按序号向前补齐"""
+        if n_days <= self.n_days:
+            return self.dates[-n_days:].astype(np.int64)
+        return np.arange(n_days, dtype=np.int64) + 10000101
+
+    def sample_engine(self, n_days: int = 250, block_days: int = 5, seed=None,
+                      start_price: float = None) -> ShannonEngine:
+        """生成一条模拟路径的 ShannonEngine，可直接 run() 查看完整交易明细"""
+        path_days = self.sample_path_days(1, n_days, block_days, seed)[0]
+        ts, opens, highs, lows, closes = _build_path(
+            self.rel_o, self.rel_h, self.rel_l, self.rel_c, self.day_starts,
+            path_days, self._path_dates(n_days), float(start_price or self.last_close)
+        )
+        return ShannonEngine.from_arrays(ts, opens, highs, lows, closes)
+
+    def run(self, initial_capital=100000, grid_density=0.015, sell_gap=0.02, pos_per_grid=5000,
+            faith_ratio=0.2, grid_ratio=0.3, lower_limit=0.0, upper_limit=999.0,
+            n_paths: int = 1000, n_days: int = 250, block_days: int = 5, seed=None,
+            start_price: float = None):
+        """
+        对一组网格参数运行压力测试。
+
+        Returns:
+            dict: 每个指标的分位数 / 均值，亏损概率，以及逐路径原始数组（raw）
+        """
+        fee_rate = 0.00006
+        min_fee = 0.0
+
+        path_days = self.sample_path_days(n_paths, n_days, block_days, seed)
+        stats = _stress_kernel(
+            self.rel_o, self.rel_h, self.rel_l, self.rel_c, self.day_starts,
+            path_days, self._path_dates(n_days), float(start_price or self.last_close),
+            float(initial_capital), float(grid_density), float(sell_gap), float(pos_per_grid),
+            float(faith_ratio), float(grid_ratio), float(lower_limit), float(upper_limit), fee_rate, min_fee
+        )
+
+        raw = {
+            'final_equity': stats[:, 0],
+            'max_drawdown': stats[:, 1],
+            'max_cash_utilization': stats[:, 2],
+            'avg_cash_utilization': stats[:, 3],
+        }
+        summary = {}
+        for name, values in raw.items():
+            summary[name] = {
+                'mean': float(np.mean(values)),
+                **{f'p{q}': float(v) for q, v in zip(STRESS_PERCENTILES, np.percentile(values, STRESS_PERCENTILES))}
+            }
+
+        return {
+            'n_paths': int(n_paths),
+            'n_days': int(n_days),
+            'block_days': int(block_days),
+            'start_price': float(start_price or self.last_close),
+            'loss_probability': float(np.mean(stats[:, 0] < initial_capital) * 100),
+            'summary': summary,
+            'raw': raw
+        }
@@ -4,6 +4,39 @@ from datetime import datetime, timedelta
 import pandas as pd
 import logging
 import numpy as np
+from numba import jit
+
+# 估值分位窗口：5 年时间窗口，至少 250 个有效值
+RANK_WINDOW_DAYS = 1825
+RANK_MIN_PERIODS = 250
+
+
+@jit(nopython=True)
+def _rolling_time_rank(days, values, window_days, min_periods, start_pos):
+    """
+    时间窗口滚动分位 (0-100)，与 rolling('1825D', min_periods).apply(lambda x: (x < x.iloc[-1]).mean() * 100) 口径一致：
+    窗口为 (t - window_days, t]，分母包含窗口内的 NaN，有效值不足 min_periods 时为 NaN。
+    只计算 start_pos 及之后的行，之前的行返回 NaN。
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    left = 0
+    for i in range(start_pos, n):
+        while days[left] <= days[i] - window_days:
+            left += 1
+        v = values[i]
+        valid = 0
+        below = 0
+        for j in range(left, i + 1):
+            x = values[j]
+            if not np.isnan(x):
+                valid += 1
+                if x < v:
+                    below += 1
+        if valid >= min_periods:
+            out[i] = below / (i - left + 1) * 100.0
+    return out
+
 
 class ValuationManager:
     def __init__(self):
@@ -80,47 +113,59 @@ class ValuationManager:
     def ensure_valuation_ranks(self, index_code: str):
         """
         计算并缓存 PE/PB 的历史 5 年分位数
+        只计算尚未有分位的日期（通常是 _update_valuation_from_api 新追加的日期），批量写回
         """
-        latest_row = self.db.db.fetch_one(
-            "SELECT date, pe_rank, pb_rank FROM index_valuation_history WHERE index_code = ? ORDER BY date DESC LIMIT 1",
-            (index_code,)
-        )
-        if latest_row and (latest_row[1] is not None or latest_row[2] is not None):
-            return
-
-        logging.info(f"Calculating rolling ranks for {index_code}...")
-
-        # 2. 加载全量数据 (仅读取本地 DB，避免分析流程触发联网更新)
+        # 1. 加载全量数据 (仅读取本地 DB，避免分析流程触发联网更新)
         df = self.get_valuation_history(index_code, allow_api_update=False)
         if df.empty:
             return
-        
-        # 确保索引是 DatetimeIndex 以支持时间窗口 rolling
+
+        # 确保索引是 DatetimeIndex 以支持时间窗口
         if not isinstance(df.index, pd.DatetimeIndex):
             df.index = pd.to_datetime(df.index)
 
+        days = (df.index.values.astype('datetime64[D]').astype(np.int64))
+        left_idx = np.searchsorted(days, days - RANK_WINDOW_DAYS, side='right')
+
+        # 2. 定位需要计算的起点：有效值足够 (可得出分位) 但库中分位为空的最早日期
+        values = {}
+        start_pos = len(df)
+        for col in ['pe', 'pb']:
+            series = df[col].where(df[col] > 0).astype(float).values
+            values[col] = series
+            valid_cum = np.concatenate(([0], np.cumsum(~np.isnan(series))))
+            valid_in_window = valid_cum[1:] - valid_cum[left_idx]
+            pending = np.flatnonzero((valid_in_window >= RANK_MIN_PERIODS) & df[f'{col}_rank'].isna().values)
+            if len(pending) > 0:
+                start_pos = min(start_pos, int(pending[0]))
+
+        if start_pos >= len(df):
+            return
+
+        logging.info(f"Calculating rolling ranks for {index_code} from {df.index[start_pos].strftime('%Y-%m-%d')}...")
+
         # 3. 计算 Rolling Rank (时间窗口)
         # 使用 5 年 (1825天) 时间窗口，而非固定行数
         # 这确保了与 boundary_calc 中的日期切片逻辑一致
-        for col in ['pe', 'pb']:
-            series = df[col].where(df[col] > 0)
-            # 计算 Rank (0-100)
-            df[f'{col}_rank'] = series.rolling(window='1825D', min_periods=250).apply(
-                lambda x: (x < x.iloc[-1]).mean() * 100 if len(x) > 0 else np.nan,
-                raw=False
-            )
-            
-        # 4. 更新回数据库
+        ranks = {
+            col: _rolling_time_rank(days, values[col], RANK_WINDOW_DAYS, RANK_MIN_PERIODS, start_pos)
+            for col in ['pe', 'pb']
+        }
+
+        # 4. 批量更新回数据库
+        date_strs = df.index.strftime('%Y-%m-%d')
         to_update = []
-        for date, row in df.iterrows():
-            if pd.notna(row['pe_rank']) or pd.notna(row['pb_rank']):
+        for pos in range(start_pos, len(df)):
+            pe_rank = ranks['pe'][pos]
+            pb_rank = ranks['pb'][pos]
+            if not np.isnan(pe_rank) or not np.isnan(pb_rank):
                 to_update.append((
-                    row['pe_rank'] if pd.notna(row['pe_rank']) else None,
-                    row['pb_rank'] if pd.notna(row['pb_rank']) else None,
+                    float(pe_rank) if not np.isnan(pe_rank) else None,
+                    float(pb_rank) if not np.isnan(pb_rank) else None,
                     index_code,
-                    date.strftime('%Y-%m-%d')
+                    date_strs[pos]
                 ))
-        
+
         if to_update:
             logging.info(f"Updating {len(to_update)} ranks to DB...")
             self.db.db.execute_many(
@@ -177,8 +222,17 @@ class ValuationManager:
                 vals.get('pb')
             ))
             
+        # 已有日期只在估值变化时清空分位（触发重算），未变化的保留已算好的分位
         self.db.db.execute_many(
-            "INSERT OR REPLACE INTO index_valuation_history (index_code, date, pe, pb) VALUES (?, ?, ?, ?)",
+            """
+            INSERT INTO index_valuation_history (index_code, date, pe, pb) VALUES (?, ?, ?, ?)
+            ON CONFLICT(index_code, date) DO UPDATE SET
+                pe_rank = CASE WHEN pe IS excluded.pe THEN pe_rank ELSE NULL END,
+                pb_rank = CASE WHEN pb IS excluded.pb THEN pb_rank ELSE NULL END,
+                pe = excluded.pe,
+                pb = excluded.pb,
+                update_time = CURRENT_TIMESTAMP
+            """,
             to_insert
         )
         self.db.db.commit()
@@ -0,0 +1,137 @@
+import numpy as np
+
+from grid.shannon_engine import ShannonEngine
+
+# 参数矩阵列顺序，与 ShannonEngine.run_batch 一致
+PARAM_NAMES = ('grid_density', 'sell_gap', 'pos_per_grid', 'faith_ratio', 'grid_ratio')
+OBJECTIVES = ('sharpe', 'calmar', 'ret')
+
+
+def build_param_matrix(param_grid: dict, defaults: dict = None) -> np.ndarray:
+    """
+    由各参数的候选列表生成笛卡尔积参数矩阵 [N, 5]。
+    param_grid 中缺少的参数取 defaults 中的单值。
+    """
+    defaults = defaults or {}
+    axes = []
+    for name in PARAM_NAMES:
+        values = param_grid.get(name)
+        if values is None:
+            if name not in defaults:
+                raise ValueError(f'缺少参数 {name}')
+            values = [defaults[name]]
+        axes.append(np.asarray(values, dtype=np.float64))
+    mesh = np.meshgrid(*axes, indexing='ij')
+    return np.column_stack([m.ravel() for m in mesh])
+
+
+class ShannonWalkForward:
+    """
+    香农网格参数滚动前推 (walk-forward) 优化：
+    1. 按交易日把分钟数据切成滚动的 训练 / 测试 窗口
+    2. 每个训练窗口用 run_batch（numba prange）并行评估全部候选参数，按目标指标选出最优
+    3. 最优参数在紧随其后的测试窗口上样本外回测，测试窗口依次衔接，期初资金为上一窗口期末权益
+
+    各窗口的分钟数组都是原始数组的切片视图，不复制，同一窗口的全部候选参数共用。
+    """
+
+    def __init__(self, engine: ShannonEngine):
+        self.engine = engine
+        self.day_starts = engine.day_starts
+        self.dates = engine.timestamps[self.day_starts[:-1]] // 10000
+        self.n_days = len(self.dates)
+
+    def _slice(self, start_day: int, end_day: int):
+        """按交易日序号 [start_day, end_day) 切出零拷贝的引擎和日终下标"""
+        lo, hi = self.day_starts[start_day], self.day_starts[end_day]
+        engine = ShannonEngine.from_arrays(
+            self.engine.timestamps[lo:hi], self.engine.opens[lo:hi], self.engine.highs[lo:hi],
+            self.engine.lows[lo:hi], self.engine.closes[lo:hi]
+        )
+        day_end_idx = self.day_starts[start_day + 1:end_day + 1] - 1 - lo
+        return engine, day_end_idx
+
+    def windows(self, train_days: int, test_days: int, step_days: int = None):
+        """
+        生成 (训练起, 训练止, 测试止) 交易日序号，测试窗口默认首尾相接。
+        step_days 不得小于 test_days：测试窗口重叠时衔接的权益和拼接的净值会重复计算重叠的交易日。
+        """
+        step_days = test_days if step_days is None else step_days
+        if train_days < 1 or test_days < 1:
+            raise ValueError('训练窗口和测试窗口至少为 1 个交易日')
+        if step_days < test_days:
+            raise ValueError(f'滚动步长 ({step_days}) 不能小于测试窗口 ({test_days})，否则测试窗口重叠')
+        result = []
+        start = 0
+        while start + train_days + test_days <= self.n_days:
+            result.append((start, start + train_days, start + train_days + test_days))
+            start += step_days
+        return result
+
+    def run(self, param_matrix: np.ndarray, train_days: int = 250, test_days: int = 60, step_days: int = None,
+            objective: str = 'sharpe', initial_capital=100000, lower_limit=0.0, upper_limit=999.0):
+        """
+        Returns:
+            dict: windows（每个窗口的最优参数、样本内 / 样本外指标）、
+                  拼接后的样本外净值曲线 oos_equity / oos_timestamps 与汇总 summary
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f'不支持的优化目标: {objective}')
+        param_matrix = np.ascontiguousarray(param_matrix, dtype=np.float64)
+        windows = self.windows(train_days, test_days, step_days)
+        if not windows:
+            raise ValueError(f'交易日不足：共 {self.n_days} 天，至少需要 {train_days + test_days} 天')
+
+        results = []
+        equity_parts = []
+        ts_parts = []
+        capital = float(initial_capital)
+        for train_start, train_end, test_end in windows:
+            train_engine, train_day_end = self._slice(train_start, train_end)
+            stats = train_engine.run_batch(
+                param_matrix, initial_capital, lower_limit, upper_limit,
+                day_end_idx=train_day_end, n_days=train_end - train_start
+            )
+            scores = np.nan_to_num(stats[objective], nan=-np.inf)
+            best = int(np.argmax(scores))
+            params = dict(zip(PARAM_NAMES, (float(v) for v in param_matrix[best])))
+
+            # 测试窗口衔接上一窗口的期末权益
+            test_engine, test_day_end = self._slice(train_end, test_end)
+            oos = test_engine.run(initial_capital=capital, lower_limit=lower_limit, upper_limit=upper_limit, **params)
+            oos_stats = test_engine.run_batch(
+                param_matrix[best:best + 1], capital, lower_limit, upper_limit,
+                day_end_idx=test_day_end, n_days=test_end - train_end
+            )
+            equity_parts.append(oos['equity_curve'])
+            ts_parts.append(test_engine.timestamps)
+
+            results.append({
+                'train_start': str(self.dates[train_start]),
+                'train_end': str(self.dates[train_end - 1]),
+                'test_start': str(self.dates[train_end]),
+                'test_end': str(self.dates[test_end - 1]),
+                'params': params,
+                'in_sample': {name: float(stats[name][best]) for name in ('sharpe', 'calmar', 'ret', 'max_dd')},
+                'out_of_sample': {name: float(oos_stats[name][0]) for name in ('sharpe', 'calmar', 'ret', 'max_dd')},
+                'start_capital': capital,
+                'end_capital': float(oos['final_equity'])
+            })
+            capital = float(oos['final_equity'])
+
+        oos_equity = np.concatenate(equity_parts)
+        peak = np.maximum.accumulate(oos_equity)
+        max_dd = float(np.max((peak - oos_equity) / peak) * 100) if len(oos_equity) else 0.0
+        return {
+            'objective': objective,
+            'n_candidates': len(param_matrix),
+            'windows': results,
+            'oos_equity': oos_equity,
+            'oos_timestamps': np.concatenate(ts_parts),
+            'summary': {
+                'total_ret': (capital - initial_capital) / initial_capital * 100,
+                'max_dd': max_dd,
+                'final_equity': capital,
+                'n_windows': len(results)
+            }
+        }
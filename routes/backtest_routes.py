@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, render_template
 from backtest_engine import BacktestEngine
+from backtest_cache import BacktestResultCache, run_backtest_cached
+from backtest_sweep import ParameterSweep
 from strategies import StrategyContextFactory, BacktestConfig
 from strategies.types import TradeRecord, PortfolioValue, BacktestResult
 from visualization import format_backtest_result
@@ -8,6 +10,7 @@ from logger import TradeLogger
 from db.scheme_db import SchemeDatabase
 from db.config import DB_CONFIG
 import json
+import os
 import plotly
 from typing import Dict, Any, List
 from datetime import datetime
@@ -21,6 +24,7 @@ backtest_bp = Blueprint('backtest', __name__)
 # 创建数据库实例
 scheme_db = SchemeDatabase(DB_CONFIG['backtest_schemes']['path'])
 market_db = MarketDatabase(DB_CONFIG['market_data']['path'])
+result_cache = BacktestResultCache()
 
 @backtest_bp.route('/api/backtest', methods=['POST'])
 @api_error_handler
@@ -37,19 +41,13 @@ def run_backtest():
     # 可以传递backtest_config参数，以便自定义回测配置
     context = StrategyContextFactory.create_context(data)  # 这里会自动验证参数
 
-    # 创建回测引擎
-    engine = BacktestEngine(BacktestConfig())
-    
-    # 执行回测
-    result = engine.run_backtest(context)
+    # 执行回测（相同参数、配置和数据版本直接返回缓存结果）
+    formatted_result = run_backtest_cached(context, BacktestConfig(), result_cache)
 
-    if not result:
+    if not formatted_result:
         error_msg = "回测执行失败，未返回结果"
         # 注解: 回测执行失败，返回错误信息
         return jsonify({'error': error_msg}), 400
-
-    # 格式化结果
-    formatted_result = format_backtest_result(result)
     
     # 如果需要保存方案
     if save_scheme:
@@ -60,6 +58,42 @@ def run_backtest():
         
     return jsonify(formatted_result)
 
+# 单次扫描允许的最大参数组合数
+MAX_SWEEP_COMBINATIONS = 400
+
+@backtest_bp.route('/api/backtest/sweep', methods=['POST'])
+@api_error_handler
+def run_backtest_sweep():
+    """批量参数扫描：数据只加载一次，进程池并行执行各参数组合
+
+    请求体:
+        etf_code, start_date, end_date: 同 /api/backtest
+        param_grid: 策略参数 -> 候选值列表，如 {"put_sell_delta": [-0.3, -0.4], "put_buy_delta": [-0.1, -0.2]}
+        sort_by: 可选，按该指标降序排列，如 "sharpe_ratio"
+        max_workers: 可选，进程数
+    """
+    data = request.get_json() or {}
+    param_grid = data.get('param_grid')
+    if not param_grid or not isinstance(param_grid, dict):
+        return jsonify({'error': '缺少参数网格 param_grid'}), 400
+    for name, values in param_grid.items():
+        if not isinstance(values, list) or not values:
+            return jsonify({'error': f'参数 {name} 的候选值必须是非空列表'}), 400
+
+    try:
+        max_workers = int(data.get('max_workers') or os.cpu_count() or 1)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_workers 必须是整数'}), 400
+    max_workers = min(max(max_workers, 1), os.cpu_count() or 1)
+
+    combos = ParameterSweep.expand_grid(param_grid)
+    if len(combos) > MAX_SWEEP_COMBINATIONS:
+        return jsonify({'error': f'参数组合过多({len(combos)})，最多支持{MAX_SWEEP_COMBINATIONS}组'}), 400
+
+    sweep = ParameterSweep(BacktestConfig(), max_workers=max_workers)
+    result = sweep.run(data, param_grid, sort_by=data.get('sort_by'))
+    return jsonify(result)
+
 def update_scheme(scheme_id, params, results):
     """更新方案时的数据处理"""
     # 确保参数格式统一
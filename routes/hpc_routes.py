@@ -218,10 +218,7 @@ def calculate_rebalance():
         # For simplicity, we query DB directly here or assume memory loaded.
         # Let's optimize DB later.
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        base = cursor.execute("SELECT base_shares, latest_nav FROM hpc_virtual_holdings WHERE strategy_id=? AND target_code=?", (sid, code)).fetchone()
-        conn.close()
+        base = db.db.fetch_one("SELECT base_shares, latest_nav FROM hpc_virtual_holdings WHERE strategy_id=? AND target_code=?", (sid, code))
         
         if not base:
             results.append({'code': code, 'error': 'New Position Detected', 'is_new': True})
@@ -284,42 +281,39 @@ def execute_rebalance():
     sid = data.get('strategy_id')
     instructions = data.get('instructions', [])
     
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
     updated_count = 0
     
-    for instr in instructions:
-        code = instr['code']
-        action = instr['action']
-        value = float(instr['value'])
-        unit = instr['unit']
-        
-        # Calculate Delta Shares
-        delta_shares = 0
-        
-        # Query current nav/shares
-        row = cursor.execute("SELECT base_shares, latest_nav FROM hpc_virtual_holdings WHERE strategy_id=? AND target_code=?", (sid, code)).fetchone()
-        
-        if not row: continue # Should handle new position separately
-        
-        base_shares, nav = row
-        
-        if unit == 'SHARE':
-            delta_shares = value
-        elif unit == 'AMOUNT':
-            delta_shares = value / nav if nav else 0
-            
-        if action == 'SELL':
-            delta_shares = -delta_shares
-            
-        # Update DB
-        new_shares = base_shares + delta_shares
-        cursor.execute("UPDATE hpc_virtual_holdings SET base_shares = ? WHERE strategy_id=? AND target_code=?", 
-                       (new_shares, sid, code))
-        updated_count += 1
-        
-    conn.commit()
-    conn.close()
-    
+    # 全部指令在同一事务中更新
+    with db.db.transaction() as conn:
+        cursor = conn.cursor()
+        for instr in instructions:
+            code = instr['code']
+            action = instr['action']
+            value = float(instr['value'])
+            unit = instr['unit']
+
+            # Calculate Delta Shares
+            delta_shares = 0
+
+            # Query current nav/shares
+            row = cursor.execute("SELECT base_shares, latest_nav FROM hpc_virtual_holdings WHERE strategy_id=? AND target_code=?", (sid, code)).fetchone()
+
+            if not row: continue # Should handle new position separately
+
+            base_shares, nav = row
+
+            if unit == 'SHARE':
+                delta_shares = value
+            elif unit == 'AMOUNT':
+                delta_shares = value / nav if nav else 0
+
+            if action == 'SELL':
+                delta_shares = -delta_shares
+
+            # Update DB
+            new_shares = base_shares + delta_shares
+            cursor.execute("UPDATE hpc_virtual_holdings SET base_shares = ? WHERE strategy_id=? AND target_code=?", 
+                           (new_shares, sid, code))
+            updated_count += 1
+
     return jsonify({'message': f'Updated {updated_count} virtual positions'})
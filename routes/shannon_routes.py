@@ -1,11 +1,20 @@
 from flask import Blueprint, jsonify, request, render_template
 import pandas as pd
 import numpy as np
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from grid.min_data_loader import MinDataLoader
 from grid.shannon_engine import ShannonEngine
+from grid.backtest_metrics import compute_backtest_metrics
+from grid.shannon_stream import ShannonStreamEngine
+from grid.stress_test import ShannonStressTester
+from grid.param_search import ShannonParamSearch
+from grid.portfolio_engine import ShannonPortfolioEngine
+from grid.walk_forward import PARAM_NAMES, ShannonWalkForward, build_param_matrix
 from services.shannon_scorer import ShannonGridScorer
 from services.similarity_searcher import SimilaritySearcher
+from services.scenario_index import ScenarioIndex
 from grid.boundary_calc import DynamicGridBoundary
 import logging
 
@@ -13,6 +22,8 @@ shannon_bp = Blueprint('shannon', __name__)
 min_loader = MinDataLoader()
 boundary_calc = DynamicGridBoundary()
 similarity_searcher = SimilaritySearcher()
+scenario_index = ScenarioIndex(searcher=similarity_searcher)
+stream_engine = ShannonStreamEngine()
 
 def safe_float(value, default):
     try:
@@ -47,6 +58,40 @@ def get_etf_list():
     etf_list = loader.get_etf_list()
     return jsonify(etf_list)
 
+@shannon_bp.route('/api/shannon/data_quality', methods=['GET'])
+def get_data_quality():
+    """
+    分钟数据完整性检查结果（只读，不触发检查）：各标的汇总，指定 symbol 时附带有问题的交易日明细。
+    stale 为 true 表示数据在上次检查后已更新，需调用 POST /api/shannon/data_quality/scan 重新检查。
+    """
+    try:
+        symbol = request.args.get('symbol')
+        result = {'summary': min_loader.get_quality_summary()}
+        if symbol:
+            result['summary'] = [s for s in result['summary'] if s['symbol'] == symbol]
+            result['days'] = min_loader.get_quality_days(symbol, issues_only=request.args.get('all') != '1')
+        return jsonify(result)
+    except Exception as e:
+        logging.error(f"Data Quality Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@shannon_bp.route('/api/shannon/data_quality/scan', methods=['POST'])
+def scan_data_quality():
+    """
+    重新执行分钟数据完整性检查
+    symbols: 可选，默认目录中的全部标的；force: 为 true 时忽略数据版本全部重查
+    """
+    try:
+        data = request.json or {}
+        symbols = data.get('symbols')
+        if symbols is not None and (not isinstance(symbols, list) or not symbols):
+            return jsonify({'error': 'symbols 必须是非空列表'}), 400
+        scanned = min_loader.scan_quality(symbols, force=bool(data.get('force')))
+        return jsonify({'scanned': scanned, 'summary': min_loader.get_quality_summary()})
+    except Exception as e:
+        logging.error(f"Data Quality Scan Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @shannon_bp.route('/api/shannon/score', methods=['GET'])
 def get_shannon_score():
     """获取香农网格适格性评分"""
@@ -70,18 +115,40 @@ def get_shannon_score():
         logging.error(f"Shannon Score Error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
-def _get_engine(symbol, start_date, end_date):
+# 最近使用的分钟数据引擎缓存，键包含标的数据版本，数据写入后自动失效
+ENGINE_CACHE_SIZE = 8
+_engine_cache = OrderedDict()
+_engine_cache_lock = threading.Lock()
+
+def _get_engine(symbol, start_date, end_date, timeframe='1m'):
     """
     Helper to load data and init engine.
     Strictly local REAL minute data only.
+    timeframe 不为 '1m' 时读取多周期 K 线 (MinDataLoader.load_bars)，用于参数粗筛。
     """
-    # 尝试从本地加载
-    df = min_loader.load_data(symbol, start_date, end_date)
+    version = min_loader.get_data_version(symbol)
+    key = (symbol, start_date, end_date, timeframe, version)
+    if version:
+        with _engine_cache_lock:
+            if key in _engine_cache:
+                _engine_cache.move_to_end(key)
+                return _engine_cache[key]
+
+    # 尝试从本地加载（列式存储下为零拷贝数组）
+    arrays = min_loader.load_bars(symbol, timeframe, start_date, end_date)
     
-    if df.empty:
+    if len(arrays['ts']) == 0:
         raise ValueError(f"本地未找到 {symbol} 的分钟数据。请确保已下载数据或导入数据到数据库。")
         
-    return ShannonEngine(df)
+    engine = ShannonEngine.from_arrays(
+        arrays['ts'], arrays['open'], arrays['high'], arrays['low'], arrays['close'], timeframe=timeframe
+    )
+    if version:
+        with _engine_cache_lock:
+            _engine_cache[key] = engine
+            while len(_engine_cache) > ENGINE_CACHE_SIZE:
+                _engine_cache.popitem(last=False)
+    return engine
 
 def _build_atr_snapshot(symbol, current_date, window_start_date=None):
     """计算指定日期的 ATR20 及其历史分位。"""
@@ -144,6 +211,16 @@ def download_data():
         sync_result = min_loader.update_data(symbol)
 
         if sync_result.get('success'):
+            try:
+                scenario_index.update(symbol)
+            except Exception as e:
+                logging.error(f"Scenario index update failed for {symbol}: {e}")
+            # 已登记的实盘网格规划只推进新增的 K 线
+            for plan_id in stream_engine.list_plans(symbol):
+                try:
+                    stream_engine.advance_from_loader(min_loader, symbol, plan_id)
+                except Exception as e:
+                    logging.error(f"Stream plan advance failed for {symbol}/{plan_id}: {e}")
             return jsonify({
                 'success': True,
                 'info': sync_result.get('info'),
@@ -166,9 +243,17 @@ def get_similar_scenarios():
     try:
         symbol = request.args.get('symbol')
         metric = request.args.get('metric', 'auto')
+        scope = request.args.get('scope', 'self')
         if not symbol:
             return jsonify({'error': 'Missing symbol'}), 400
-            
+
+        if scope == 'universe':
+            # 全市场多特征近邻检索
+            top_n = int(request.args.get('top_n', 10))
+            result = scenario_index.find_universe_analogues(symbol, top_n=top_n, metric_preference=metric)
+            status = 400 if result.get('error') else 200
+            return jsonify(clean_nan(result)), status
+
         result = similarity_searcher.find_similar_moments(symbol, metric_preference=metric)
         return jsonify(clean_nan(result))
     except Exception as e:
@@ -320,6 +405,83 @@ def get_planner_edge():
         return jsonify({'error': str(e)}), 500
 
 
+# 边界网格单轴最大档数
+MAX_EDGE_GRID_STEPS = 40
+
+@shannon_bp.route('/api/shannon/planner_edge_grid', methods=['POST'])
+def get_planner_edge_grid():
+    """一次性评估多组候选上下边界的经验胜率。"""
+    try:
+        data = request.json or {}
+        symbol = data.get('symbol')
+        metric = data.get('metric', 'auto')
+        current_price = safe_float(data.get('current_price'), 0)
+        as_of_date = data.get('as_of_date') or None
+        if not symbol:
+            return jsonify({'error': 'Missing symbol'}), 400
+
+        # 候选边界：直接给出列表，或按 min/max/steps 均匀生成
+        lowers = data.get('lowers')
+        uppers = data.get('uppers')
+        if lowers is None:
+            lower_steps = min(max(int(data.get('lower_steps', 10)), 1), MAX_EDGE_GRID_STEPS)
+            lowers = np.linspace(
+                safe_float(data.get('lower_min'), current_price * 0.8),
+                safe_float(data.get('lower_max'), current_price * 0.98),
+                lower_steps
+            )
+        if uppers is None:
+            upper_steps = min(max(int(data.get('upper_steps', 10)), 1), MAX_EDGE_GRID_STEPS)
+            uppers = np.linspace(
+                safe_float(data.get('upper_min'), current_price * 1.02),
+                safe_float(data.get('upper_max'), current_price * 1.2),
+                upper_steps
+            )
+        lowers = [safe_float(v, 0) for v in lowers][:MAX_EDGE_GRID_STEPS]
+        uppers = [safe_float(v, 0) for v in uppers][:MAX_EDGE_GRID_STEPS]
+
+        result = similarity_searcher.estimate_planner_edge_grid(
+            symbol,
+            current_price=current_price,
+            lowers=lowers,
+            uppers=uppers,
+            metric_preference=metric,
+            horizon=int(data.get('horizon', 120)),
+            max_matches=int(data.get('max_matches', 10)),
+            as_of_date=as_of_date,
+        )
+        status = 400 if result.get('error') else 200
+        return jsonify(clean_nan(result)), status
+    except Exception as e:
+        logging.error(f"Planner Edge Grid Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@shannon_bp.route('/api/shannon/planner_edge_calibration', methods=['GET'])
+def get_planner_edge_calibration():
+    """规划胜率历史校准表（预测胜率 vs 实际先到结果）。"""
+    try:
+        symbol = request.args.get('symbol')
+        if not symbol:
+            return jsonify({'error': 'Missing symbol'}), 400
+
+        result = similarity_searcher.calibrate_planner_edge(
+            symbol,
+            lower_ratio=safe_float(request.args.get('lower_ratio'), 0.9),
+            upper_ratio=safe_float(request.args.get('upper_ratio'), 1.1),
+            metric_preference=request.args.get('metric', 'auto'),
+            horizon=int(request.args.get('horizon', 120)),
+            start_date=request.args.get('start_date') or None,
+            end_date=request.args.get('end_date') or None,
+            include_records=request.args.get('records') == '1',
+        )
+        status = 400 if result.get('error') else 200
+        return jsonify(clean_nan(result)), status
+    except Exception as e:
+        logging.error(f"Planner Edge Calibration Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
 @shannon_bp.route('/shannon')
 def index():
     return render_template('shannon_grid.html')
@@ -379,192 +541,58 @@ def run_backtest():
             upper_limit=upper_limit
         )
         
-        # 计算核心指标
-        equity_curve = result['equity_curve']
-        cash_history = result['cash_history']
-        initial = initial_capital
-        final = result['final_equity']
-        
-        total_return = (final - initial) / initial * 100
-        
-        # 最大回撤
-        max_eq = np.maximum.accumulate(equity_curve)
-        dd = (max_eq - equity_curve) / max_eq
-        max_drawdown = np.max(dd) * 100
-        
-        # 套牢时长 (Max Underwater Days)
-        # 统计连续处于 watermark 以下的天数 (近似分钟数 / 240)
-        is_underwater = equity_curve < max_eq
-        max_underwater_days = 0
-        current_run = 0
-        for u in is_underwater:
-            if u:
-                current_run += 1
-            else:
-                if current_run > max_underwater_days:
-                    max_underwater_days = current_run
-                current_run = 0
-        # 补丁：处理一直处于水位下的情况
-        if current_run > max_underwater_days:
-            max_underwater_days = current_run
-            
-        max_underwater_days = round(max_underwater_days / 240, 1) # 换算为天
-        
-        # 资金效率 (Avg Cash Utilization)
-        if len(equity_curve) > 0:
-            utilization_curve = np.where(equity_curve > 0, (equity_curve - cash_history) / equity_curve, 0)
-            avg_utilization = np.mean(utilization_curve) * 100
-            max_utilization = np.max(utilization_curve) * 100
-            min_cash = np.min(cash_history)
-        else:
-            avg_utilization = max_utilization = min_cash = 0.0
-        
-        # 构建 Daily Curve (用于前端图表)
+        # 回测指标（日线聚合按交易日边界下标，均线从日线缓存预热）
         try:
-            df = engine.df.copy()
-            df['equity'] = equity_curve
-            df['dt'] = pd.to_datetime(df['ts_int'].astype(str), format='%Y%m%d%H%M')
-            df['date_str'] = df['dt'].dt.strftime('%Y-%m-%d')
-            
-            daily_df = df.groupby('date_str').agg({
-                'equity': 'last',
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last' 
-            }).reset_index()
-            
-            # --- 优化 MA250 计算 ---
-            # 为了让回测第一天就有 MA250，我们需要加载更早的数据进行预热
-            # 1. 计算预热开始时间 (提前 400 天，确保覆盖 250 个交易日)
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            warmup_start = (start_dt - timedelta(days=600)).strftime('%Y-%m-%d')
-            
-            # 2. 加载预热数据 (只用于算 MA)
-            # 注意：这里会重新查询数据库，耗时稍增但值得
-            df_warmup = min_loader.load_data(symbol, warmup_start, end_date)
-            
-            # 3. 聚合为日线
-            # df_warmup['timestamp'] 通常是 "YYYY-MM-DD HH:MM:SS" 字符串
-            df_warmup['dt'] = pd.to_datetime(df_warmup['timestamp'])
-            df_warmup['date_str'] = df_warmup['dt'].dt.strftime('%Y-%m-%d')
-            daily_warmup = df_warmup.groupby('date_str')['close'].last().reset_index()
-            
-            # 4. 计算全量均线
-            daily_warmup['ma20'] = daily_warmup['close'].rolling(20).mean()
-            daily_warmup['ma250'] = daily_warmup['close'].rolling(250).mean()
-            
-            # 5. 建立映射表
-            ma20_map = daily_warmup.set_index('date_str')['ma20'].to_dict()
-            ma250_map = daily_warmup.set_index('date_str')['ma250'].to_dict()
-            
-            # 3. 构建返回列表
-            daily_curve = []
-            if daily_df.empty:
-                 raise ValueError("Backtest generated no daily data (time range too short?)")
-
-            base_close = daily_df.iloc[0]['close']
-            for _, row in daily_df.iterrows():
-                d_str = row['date_str']
-                daily_curve.append({
-                    'date': d_str,
-                    'equity': row['equity'],
-                    'benchmark': initial * (row['close'] / base_close),
-                    'open': row['open'],
-                    'high': row['high'],
-                    'low': row['low'],
-                    'close': row['close'],
-                    'ma20': ma20_map.get(d_str),
-                    'ma250': ma250_map.get(d_str) # 从全量映射表中取值
-                })
-
-            # Benchmark 指标计算 (Buy & Hold)
-            bench_return = (daily_df.iloc[-1]['close'] - base_close) / base_close * 100
-            bench_prices = daily_df['close'].values
-            bench_max_p = np.maximum.accumulate(bench_prices)
-            bench_dd = (bench_max_p - bench_prices) / bench_max_p
-            bench_max_dd = np.max(bench_dd) * 100
-            
-            # 夏普比率计算 (基于日线)
-            equity_series = pd.Series([d['equity'] for d in daily_curve])
-            returns = equity_series.pct_change().dropna()
-            if returns.std() > 0:
-                sharpe_ratio = (returns.mean() / returns.std()) * np.sqrt(252)
-            else:
-                sharpe_ratio = 0.0
-                
-            # 年化收益率 (CAGR)
-            days_trading = len(equity_curve) / 240
-            if days_trading > 10: # 至少10个交易日才算年化，否则太失真
-                annualized_return = ((final / initial) ** (252 / days_trading) - 1) * 100
-            else:
-                annualized_return = total_return # 短期直接用总收益
-                
-            # 基准夏普
-            bench_series = pd.Series([d['benchmark'] for d in daily_curve])
-            bench_returns = bench_series.pct_change().dropna()
-            if bench_returns.std() > 0:
-                bench_sharpe = (bench_returns.mean() / bench_returns.std()) * np.sqrt(252)
-            else:
-                bench_sharpe = 0.0
-                
-            # 心理按摩指标
-            # 1. 回撤优化率
-            if bench_max_dd > 0.001: 
-                dd_reduction = (bench_max_dd - max_drawdown) / bench_max_dd * 100
-            else:
-                dd_reduction = 0.0
-            
-            # 2. 卡玛比率 (年化收益 / 最大回撤)
-            calmar_ratio = annualized_return / max_drawdown if max_drawdown > 0.1 else annualized_return / 0.1
-            bench_annual = ((initial * (daily_df.iloc[-1]['close'] / base_close) / initial) ** (252 / days_trading) - 1) * 100 if days_trading > 10 else bench_return
-            bench_calmar = bench_annual / bench_max_dd if bench_max_dd > 0.1 else bench_annual / 0.1
-            
-            # 3. 夏普提升率
-            if abs(bench_sharpe) > 0.01:
-                sharpe_imp = (sharpe_ratio - bench_sharpe) / abs(bench_sharpe) * 100
-            else:
-                sharpe_imp = 0.0
-                
-            # 4. 卡玛提升率
-            if abs(bench_calmar) > 0.01:
-                calmar_imp = (calmar_ratio - bench_calmar) / abs(bench_calmar) * 100
-            else:
-                calmar_imp = 0.0
-
-            # 清洗 NaN
-            for v in [dd_reduction, sharpe_imp, calmar_imp, calmar_ratio, bench_calmar]:
-                if np.isnan(v) or np.isinf(v):
-                    v = 0.0
-
+            daily_cache = min_loader.load_daily_data(symbol)
         except Exception as e:
-            logging.error(f"Error constructing daily curve: {e}", exc_info=True)
-            raise e
+            logging.error(f"Error loading daily cache for MA: {e}")
+            daily_cache = None
+        report = compute_backtest_metrics(
+            engine.timestamps, engine.opens, engine.highs, engine.lows, engine.closes,
+            result['equity_curve'], result['cash_history'], initial_capital, daily_cache
+        )
+        m = report['metrics']
+        daily = report['daily']
+        dates = pd.to_datetime(daily['date'].astype(str), format='%Y%m%d').strftime('%Y-%m-%d')
+        daily_curve = [
+            {
+                'date': dates[k],
+                'equity': daily['equity'][k],
+                'benchmark': daily['benchmark'][k],
+                'open': daily['open'][k],
+                'high': daily['high'][k],
+                'low': daily['low'][k],
+                'close': daily['close'][k],
+                'ma20': None if np.isnan(daily['ma20'][k]) else daily['ma20'][k],
+                'ma250': None if np.isnan(daily['ma250'][k]) else daily['ma250'][k]
+            }
+            for k in range(len(dates))
+        ]
 
         response_raw = {
             'metrics': {
-                'total_return': round(total_return, 2),
-                'annualized_return': round(annualized_return, 2),
-                'max_drawdown': round(max_drawdown, 2),
-                'final_equity': round(final, 2),
+                'total_return': round(m['total_return'], 2),
+                'annualized_return': round(m['annualized_return'], 2),
+                'max_drawdown': round(m['max_drawdown'], 2),
+                'final_equity': round(m['final_equity'], 2),
                 'trade_count': len(result['trades']),
-                'max_underwater_days': max_underwater_days,
-                'avg_utilization': round(avg_utilization, 2),
-                'max_utilization': round(max_utilization, 2),
-                'min_cash': round(min_cash, 2),
+                'max_underwater_days': m['max_underwater_days'],
+                'avg_utilization': round(m['avg_utilization'], 2),
+                'max_utilization': round(m['max_utilization'], 2),
+                'min_cash': round(m['min_cash'], 2),
                 'data_mode': 'REAL',
-                'bench_return': round(bench_return, 2),
-                'bench_max_drawdown': round(bench_max_dd, 2),
-                'sharpe_ratio': round(sharpe_ratio, 2),
-                'bench_sharpe': round(bench_sharpe, 2),
-                'sharpe_imp': round(sharpe_imp, 1),
-                'calmar_ratio': round(calmar_ratio, 2),
-                'bench_calmar': round(bench_calmar, 2),
-                'calmar_imp': round(calmar_imp, 1),
-                'dd_reduction': round(dd_reduction, 1)
+                'bench_return': round(m['bench_return'], 2),
+                'bench_max_drawdown': round(m['bench_max_drawdown'], 2),
+                'sharpe_ratio': round(m['sharpe_ratio'], 2),
+                'bench_sharpe': round(m['bench_sharpe'], 2),
+                'sharpe_imp': round(m['sharpe_imp'], 1),
+                'calmar_ratio': round(m['calmar_ratio'], 2),
+                'bench_calmar': round(m['bench_calmar'], 2),
+                'calmar_imp': round(m['calmar_imp'], 1),
+                'dd_reduction': round(m['dd_reduction'], 1)
             },
             'daily_curve': daily_curve,
-            'trades': result['trades'],
+            'trades': result['trades'].to_dicts(),
             'boundaries': {
                 'lower_limit': round(lower_limit, 3),
                 'upper_limit': round(upper_limit, 3),
@@ -578,6 +606,9 @@ def run_backtest():
         logging.error(f"Shannon Backtest Error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+# 热力图单轴最大档数
+MAX_HEATMAP_STEPS = 60
+
 @shannon_bp.route('/api/shannon/heatmap', methods=['POST'])
 def run_heatmap():
     try:
@@ -595,88 +626,428 @@ def run_heatmap():
         lower_limit = float(data.get('lower_limit', 0.0))
         upper_limit = float(data.get('upper_limit', 999.0))
         
-        # 扫描范围
-        density_range = np.arange(0.005, 0.051, 0.005) # 10 steps
-        gap_range = np.arange(0.005, 0.051, 0.005)     # 10 steps
+        # 扫描范围（百分比，可配置分辨率），默认 0.5% ~ 5.0% 各 10 档
+        density_steps = min(max(int(data.get('density_steps', 10)), 1), MAX_HEATMAP_STEPS)
+        gap_steps = min(max(int(data.get('gap_steps', 10)), 1), MAX_HEATMAP_STEPS)
+        density_range = np.linspace(
+            safe_float(data.get('density_min'), 0.5), safe_float(data.get('density_max'), 5.0), density_steps
+        ) / 100.0
+        gap_range = np.linspace(
+            safe_float(data.get('gap_min'), 0.5), safe_float(data.get('gap_max'), 5.0), gap_steps
+        ) / 100.0
         
-        engine = _get_engine(symbol, start_date, end_date)
-        heatmap_data = []
+        # 预览时可用 5m / 15m 等聚合周期粗筛，计算量随 K 线数成比例下降
+        timeframe = data.get('timeframe', '1m')
+        engine = _get_engine(symbol, start_date, end_date, timeframe)
+        
+        # 网格参数矩阵: (density, gap, pos_per_grid, faith_ratio, grid_ratio)，行优先对应 density x gap
+        dd, gg = np.meshgrid(density_range, gap_range, indexing='ij')
+        n_cells = dd.size
+        param_matrix = np.column_stack([
+            dd.ravel(), gg.ravel(),
+            np.full(n_cells, pos_per_grid), np.full(n_cells, faith_ratio), np.full(n_cells, grid_ratio)
+        ])
         
-        # 预热
-        engine.run(initial_capital, 0.01, 0.01, pos_per_grid, faith_ratio, grid_ratio, lower_limit, upper_limit)
+        # numba prange 并行执行所有单元格，只返回汇总指标；日线夏普按引擎缓存的实际交易日边界计算
+        stats = engine.run_batch(param_matrix, initial_capital, lower_limit, upper_limit)
+        sharpe = stats['sharpe'].reshape(dd.shape)
+        calmar = stats['calmar'].reshape(dd.shape)
+        ret = stats['ret'].reshape(dd.shape)
         
-        for d in density_range:
+        heatmap_data = []
+        for i, d in enumerate(density_range):
             row_data = []
-            for g in gap_range:
-                res = engine.run(
-                    initial_capital=initial_capital,
-                    grid_density=d,
-                    sell_gap=g,
-                    pos_per_grid=pos_per_grid,
-                    faith_ratio=faith_ratio,
-                    grid_ratio=grid_ratio,
-                    lower_limit=lower_limit,
-                    upper_limit=upper_limit
-                )
-                
-                # 计算夏普比率 (性能优化版)
-                # 1. 降采样分钟线到日线 (每 240 点取一个)
-                # 假设每天固定 240 分钟，取收盘净值
-                equity_min = res['equity_curve']
-                if len(equity_min) > 240:
-                    # 使用切片 [239::240] 取每天第 240 分钟的值
-                    equity_daily = equity_min[239::240]
-                    # 计算日收益率: (Today - Yesterday) / Yesterday
-                    # numpy diff / shift
-                    if len(equity_daily) > 1:
-                        daily_returns = np.diff(equity_daily) / equity_daily[:-1]
-                        std = np.std(daily_returns)
-                        mean = np.mean(daily_returns)
-                        sharpe = (mean / std) * np.sqrt(252) if std > 0 else 0.0
-                    else:
-                        sharpe = 0.0
-                else:
-                    sharpe = 0.0
-                
-                # 计算总收益和回撤用于 Calmar
-                final_eq = res['final_equity']
-                total_ret_pct = (final_eq - initial_capital) / initial_capital * 100
-                
-                # 最大回撤
-                eq_curve = res['equity_curve']
-                max_eq = np.maximum.accumulate(eq_curve)
-                dd = (max_eq - eq_curve) / max_eq
-                max_dd = np.max(dd) * 100
-                
-                # Calmar = 年化收益 / 最大回撤
-                # 简单估算年化：总收益 / (天数/252)
-                # 分钟数 -> 天数
-                days_approx = len(eq_curve) / 240
-                if days_approx > 0:
-                    annual_ret = total_ret_pct / (days_approx / 252)
-                else:
-                    annual_ret = 0.0
-                    
-                if max_dd > 0.1: # 避免除以0或极小回撤
-                    calmar = annual_ret / max_dd
-                else:
-                    calmar = 10.0 # 极佳 (无回撤)
-                
+            for j, g in enumerate(gap_range):
                 row_data.append({
                     'density': round(d * 100, 1), 
                     'gap': round(g * 100, 1), 
-                    'value': round(sharpe, 2),
-                    'calmar': round(calmar, 2),
-                    'ret': round(total_ret_pct, 2)
+                    'value': round(float(sharpe[i, j]), 2),
+                    'calmar': round(float(calmar[i, j]), 2),
+                    'ret': round(float(ret[i, j]), 2)
                 })
             heatmap_data.append(row_data)
             
         return jsonify(clean_nan({
             'x_axis': [f"{x*100:.1f}%" for x in gap_range],
             'y_axis': [f"{y*100:.1f}%" for y in density_range],
-            'data': heatmap_data
+            'data': heatmap_data,
+            'timeframe': timeframe
         }))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Shannon Heatmap Error: {e}", exc_info=True)
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+# 压力测试最大路径数
+MAX_STRESS_PATHS = 5000
+# 压力测试单条路径最大交易日数（每条路径按 天数 * 240 根分钟 K 线分配数组）
+MAX_STRESS_DAYS = 2500
+
+@shannon_bp.route('/api/shannon/stress_test', methods=['POST'])
+def run_stress_test():
+    """分块自助抽样历史分钟数据生成模拟路径，返回期末权益 / 最大回撤 / 资金占用的分布"""
+    try:
+        data = request.json
+        symbol = data['symbol']
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+
+        initial_capital = safe_float(data.get('initial_capital'), 100000)
+        n_paths = min(max(int(data.get('n_paths', 1000)), 1), MAX_STRESS_PATHS)
+        n_days = max(int(data.get('n_days', 250)), 1)
+        if n_days > MAX_STRESS_DAYS:
+            return jsonify({'error': f'模拟天数过多 ({n_days})，上限 {MAX_STRESS_DAYS}'}), 400
+        block_days = max(int(data.get('block_days', 5)), 1)
+        seed = data.get('seed')
+
+        tester = ShannonStressTester.from_loader(min_loader, symbol, start_date, end_date)
+        result = tester.run(
+            initial_capital=initial_capital,
+            grid_density=safe_float(data.get('grid_density'), 0.015),
+            sell_gap=safe_float(data.get('sell_gap'), 0.02),
+            pos_per_grid=safe_float(data.get('pos_per_grid'), 5000),
+            faith_ratio=safe_float(data.get('faith_ratio'), 0.0) / 100.0,
+            grid_ratio=safe_float(data.get('grid_ratio'), 30.0) / 100.0,
+            lower_limit=safe_float(data.get('lower_limit'), 0.0),
+            upper_limit=safe_float(data.get('upper_limit'), 999.0),
+            n_paths=n_paths,
+            n_days=n_days,
+            block_days=block_days,
+            seed=int(seed) if seed is not None else None,
+            start_price=safe_float(data.get('start_price'), 0) or None,
+        )
+
+        # 期末收益率直方图
+        raw = result.pop('raw')
+        ret_pct = (raw['final_equity'] - initial_capital) / initial_capital * 100
+        counts, edges = np.histogram(ret_pct, bins=30)
+        result['histogram'] = {
+            'bins': [round(float(x), 2) for x in edges],
+            'counts': counts.tolist()
+        }
+        return jsonify(clean_nan(result))
+
+    except Exception as e:
+        logging.error(f"Shannon Stress Test Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+# 滚动前推优化单个训练窗口的最大候选参数组数
+MAX_WALK_FORWARD_CANDIDATES = 2000
+
+@shannon_bp.route('/api/shannon/walk_forward', methods=['POST'])
+def run_walk_forward():
+    """滚动前推优化：训练窗口并行搜索参数，测试窗口样本外回测并拼接净值"""
+    try:
+        data = request.json
+        symbol = data['symbol']
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        initial_capital = safe_float(data.get('initial_capital'), 100000)
+        lower_limit = safe_float(data.get('lower_limit'), 0.0)
+        upper_limit = safe_float(data.get('upper_limit'), 999.0)
+
+        # 搜索空间：密度 / 卖出间距按 min/max/steps（百分比），其余参数为候选列表（比例为百分比）
+        density_steps = min(max(int(data.get('density_steps', 6)), 1), MAX_HEATMAP_STEPS)
+        gap_steps = min(max(int(data.get('gap_steps', 6)), 1), MAX_HEATMAP_STEPS)
+        param_grid = {
+            'grid_density': np.linspace(
+                safe_float(data.get('density_min'), 0.5), safe_float(data.get('density_max'), 3.0), density_steps
+            ) / 100.0,
+            'sell_gap': np.linspace(
+                safe_float(data.get('gap_min'), 0.5), safe_float(data.get('gap_max'), 3.0), gap_steps
+            ) / 100.0,
+            'pos_per_grid': [safe_float(v, 5000) for v in data.get('pos_per_grid_list') or [5000]],
+            'faith_ratio': [safe_float(v, 0.0) / 100.0 for v in data.get('faith_ratio_list') or [0.0]],
+            'grid_ratio': [safe_float(v, 30.0) / 100.0 for v in data.get('grid_ratio_list') or [30.0]],
+        }
+        param_matrix = build_param_matrix(param_grid)
+        if len(param_matrix) > MAX_WALK_FORWARD_CANDIDATES:
+            return jsonify({'error': f'候选参数组合过多 ({len(param_matrix)})，上限 {MAX_WALK_FORWARD_CANDIDATES}'}), 400
+
+        engine = _get_engine(symbol, start_date, end_date)
+        result = ShannonWalkForward(engine).run(
+            param_matrix,
+            train_days=int(data.get('train_days', 250)),
+            test_days=int(data.get('test_days', 60)),
+            step_days=int(data['step_days']) if data.get('step_days') is not None else None,
+            objective=data.get('objective', 'sharpe'),
+            initial_capital=initial_capital,
+            lower_limit=lower_limit,
+            upper_limit=upper_limit,
+        )
+
+        # 样本外净值按日取收盘点
+        oos_ts = result.pop('oos_timestamps')
+        oos_equity = result.pop('oos_equity')
+        days = oos_ts // 10000
+        day_end = np.flatnonzero(np.r_[days[1:] != days[:-1], True])
+        result['oos_curve'] = [
+            {'date': str(days[i]), 'equity': round(float(oos_equity[i]), 2)} for i in day_end
+        ]
+        return jsonify(clean_nan(result))
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Shannon Walk Forward Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+# 自适应搜索：百分比口径的参数（与回测 / 热力图接口一致），其余为绝对值
+OPTIMIZE_PERCENT_PARAMS = ('grid_density', 'sell_gap', 'faith_ratio', 'grid_ratio')
+
+@shannon_bp.route('/api/shannon/optimize', methods=['POST'])
+def run_optimize():
+    """自适应参数搜索：粗网格逐层加密 (coarse_to_fine) 或逐轮减半 (successive_halving)"""
+    try:
+        data = request.json
+        symbol = data['symbol']
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        method = data.get('method', 'coarse_to_fine')
+        objective = data.get('objective', 'sharpe')
+
+        # bounds: {参数: [最小, 最大]}，未列出的参数取固定值
+        bounds = {}
+        for name, (low, high) in (data.get('bounds') or {
+            'grid_density': [0.5, 5.0], 'sell_gap': [0.5, 5.0]
+        }).items():
+            if name not in PARAM_NAMES:
+                return jsonify({'error': f'不支持的搜索参数: {name}'}), 400
+            scale = 100.0 if name in OPTIMIZE_PERCENT_PARAMS else 1.0
+            bounds[name] = (safe_float(low, 0) / scale, safe_float(high, 0) / scale)
+        fixed = {
+            'grid_density': safe_float(data.get('grid_density'), 1.5) / 100.0,
+            'sell_gap': safe_float(data.get('sell_gap'), 2.0) / 100.0,
+            'pos_per_grid': safe_float(data.get('pos_per_grid'), 5000),
+            'faith_ratio': safe_float(data.get('faith_ratio'), 0.0) / 100.0,
+            'grid_ratio': safe_float(data.get('grid_ratio'), 30.0) / 100.0,
+        }
+
+        # 粗网格点数 (coarse_steps ^ 维数) 和每层加密点数 (top_k * 3 ^ 维数) 都受候选数上限约束
+        coarse_steps = min(max(int(data.get('coarse_steps', 5)), 2), MAX_HEATMAP_STEPS)
+        top_k = max(int(data.get('top_k', 2)), 1)
+        if method == 'coarse_to_fine':
+            n_coarse = coarse_steps ** len(bounds)
+            n_refine = top_k * 3 ** len(bounds)
+            if max(n_coarse, n_refine) > MAX_WALK_FORWARD_CANDIDATES:
+                return jsonify({
+                    'error': f'候选参数组合过多 (粗网格 {n_coarse}，每层加密 {n_refine})，上限 {MAX_WALK_FORWARD_CANDIDATES}'
+                }), 400
+
+        timeframe = data.get('timeframe', '1m')
+        engine = _get_engine(symbol, start_date, end_date, timeframe)
+        search = ShannonParamSearch(
+            engine,
+            initial_capital=safe_float(data.get('initial_capital'), 100000),
+            lower_limit=safe_float(data.get('lower_limit'), 0.0),
+            upper_limit=safe_float(data.get('upper_limit'), 999.0),
+        )
+        if method == 'successive_halving':
+            result = search.successive_halving(
+                bounds, fixed, objective,
+                n_candidates=min(max(int(data.get('n_candidates', 81)), 1), MAX_WALK_FORWARD_CANDIDATES),
+                eta=max(int(data.get('eta', 3)), 2),
+                min_days=max(int(data.get('min_days', 60)), 1),
+                seed=data.get('seed'),
+            )
+        elif method == 'coarse_to_fine':
+            result = search.coarse_to_fine(
+                bounds, fixed, objective,
+                coarse_steps=coarse_steps,
+                levels=min(max(int(data.get('levels', 3)), 0), 8),
+                top_k=top_k,
+            )
+        else:
+            return jsonify({'error': f'不支持的搜索方式: {method}'}), 400
+
+        # 参数按接口口径返回
+        result['params'] = {
+            name: round(value * 100, 3) if name in OPTIMIZE_PERCENT_PARAMS else value
+            for name, value in result['params'].items()
+        }
+        result['timeframe'] = timeframe
+        return jsonify(clean_nan(result))
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Shannon Optimize Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@shannon_bp.route('/api/shannon/portfolio_backtest', methods=['POST'])
+def run_portfolio_backtest():
+    """多标的网格组合回测：共享现金池，返回组合日净值与各标的归因"""
+    try:
+        data = request.json
+        symbols = data.get('symbols') or []
+        if not symbols:
+            return jsonify({'error': 'Missing symbols'}), 400
+        start_date = data.get('start_date', '2023-01-01')
+        end_date = data.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+        initial_capital = safe_float(data.get('initial_capital'), 100000)
+
+        # 公共参数（百分比口径同单标的回测），per_symbol 中可按标的覆盖
+        defaults = {
+            'grid_density': safe_float(data.get('grid_density'), 1.5) / 100.0,
+            'sell_gap': safe_float(data.get('sell_gap'), 2.0) / 100.0,
+            'pos_per_grid': safe_float(data.get('pos_per_grid'), 5000),
+            'faith_ratio': safe_float(data.get('faith_ratio'), 0.0) / 100.0,
+            'grid_ratio': safe_float(data.get('grid_ratio'), 30.0) / 100.0,
+            'lower_limit': safe_float(data.get('lower_limit'), 0.0),
+            'upper_limit': safe_float(data.get('upper_limit'), 999.0),
+        }
+        percent_params = ('grid_density', 'sell_gap', 'faith_ratio', 'grid_ratio')
+        per_symbol = data.get('per_symbol') or {}
+        params = {}
+        for name, default in defaults.items():
+            values = []
+            for symbol in symbols:
+                override = (per_symbol.get(symbol) or {}).get(name)
+                if override is None:
+                    values.append(default)
+                else:
+                    values.append(safe_float(override, 0) / (100.0 if name in percent_params else 1.0))
+            params[name] = values
+
+        allocations = data.get('allocations')
+        if allocations:
+            weights = np.array([safe_float(allocations.get(symbol), 0) for symbol in symbols])
+            allocations = weights / weights.sum() if weights.sum() > 0 else None
+
+        engine = ShannonPortfolioEngine.from_loader(min_loader, symbols, start_date, end_date)
+        result = engine.run(
+            initial_capital=initial_capital,
+            allocations=allocations,
+            priority=data.get('priority', 'order'),
+            **params
+        )
+
+        # 日终组合净值与各标的持仓市值
+        day_end_idx = engine.day_starts[1:] - 1
+        daily_curve = []
+        for k, t in enumerate(day_end_idx):
+            daily_curve.append({
+                'date': str(result['dates'][k]),
+                'equity': round(float(result['equity_curve'][t]), 2),
+                'cash': round(float(result['cash_history'][t]), 2),
+                'positions': {symbol: round(float(result['daily_values'][k, i]), 2) for i, symbol in enumerate(symbols)}
+            })
+
+        equity_curve = result['equity_curve']
+        max_eq = np.maximum.accumulate(equity_curve)
+        max_dd = float(np.max((max_eq - equity_curve) / max_eq) * 100) if len(equity_curve) else 0.0
+        final = float(result['final_equity'])
+        return jsonify(clean_nan({
+            'summary': {
+                'initial_capital': initial_capital,
+                'final_equity': round(final, 2),
+                'total_return': round((final - initial_capital) / initial_capital * 100, 2),
+                'max_drawdown': round(max_dd, 2),
+                'trade_count': int(len(result['trades']))
+            },
+            'attribution': result['attribution'],
+            'daily_curve': daily_curve
+        }))
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Shannon Portfolio Backtest Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+def _stream_state_payload(state, signals=None):
+    """增量网格状态的接口输出"""
+    payload = {
+        'symbol': state.symbol,
+        'plan_id': state.plan_id,
+        'params': state.params,
+        'last_ts': str(state.last_ts) if state.last_ts else None,
+        'last_close': state.last_close,
+        'cash': round(state.cash, 2),
+        'total_shares': int(state.total_shares),
+        'free_shares': int(state.free_shares),
+        'frozen_shares': int(state.frozen_shares),
+        'locked_shares': int(state.locked_shares),
+        'equity': round(state.equity, 2),
+        'ref_price': state.ref_price,
+        'next_buy_price': round(state.ref_price * (1 - state.params['grid_density']), 4) if state.started else None,
+        'next_sell_price': round(state.stack_price[-1] * (1 + state.params['sell_gap']), 4) if state.stack_price else None,
+        'grid_depth': len(state.stack_price),
+        'lower_limit_paused': state.lower_limit_paused
+    }
+    if signals is not None:
+        payload['signals'] = signals
+    return clean_nan(payload)
+
+@shannon_bp.route('/api/shannon/stream/plan', methods=['POST'])
+def create_stream_plan():
+    """新建（或重置）增量网格规划，参数口径同单标的回测"""
+    try:
+        data = request.json
+        symbol = data.get('symbol')
+        if not symbol:
+            return jsonify({'error': 'Missing symbol'}), 400
+        state = stream_engine.create_plan(
+            symbol,
+            data.get('plan_id') or 'default',
+            start_date=data.get('start_date'),
+            initial_capital=safe_float(data.get('initial_capital'), 100000),
+            grid_density=safe_float(data.get('grid_density'), 1.5) / 100.0,
+            sell_gap=safe_float(data.get('sell_gap'), 2.0) / 100.0,
+            pos_per_grid=safe_float(data.get('pos_per_grid'), 5000),
+            faith_ratio=safe_float(data.get('faith_ratio'), 0.0) / 100.0,
+            grid_ratio=safe_float(data.get('grid_ratio'), 30.0) / 100.0,
+            lower_limit=safe_float(data.get('lower_limit'), 0.0),
+            upper_limit=safe_float(data.get('upper_limit'), 999.0)
+        )
+        return jsonify(_stream_state_payload(state))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Stream Plan Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@shannon_bp.route('/api/shannon/stream/advance', methods=['POST'])
+def advance_stream_plan():
+    """
+    推进增量网格规划并返回新产生的交易信号。
+    请求中带 bars（[{timestamp: YYYYMMDDHHMM, open, high, low, close}, ...]）时直接推进，否则从本地分钟库读取新数据。
+    """
+    try:
+        data = request.json
+        symbol = data.get('symbol')
+        if not symbol:
+            return jsonify({'error': 'Missing symbol'}), 400
+        plan_id = data.get('plan_id') or 'default'
+        bars = data.get('bars')
+        if bars:
+            bars = sorted(bars, key=lambda bar: int(bar['timestamp']))
+            state, signals = stream_engine.advance(
+                symbol, plan_id,
+                [int(bar['timestamp']) for bar in bars],
+                [float(bar['open']) for bar in bars],
+                [float(bar['high']) for bar in bars],
+                [float(bar['low']) for bar in bars],
+                [float(bar['close']) for bar in bars]
+            )
+        else:
+            state, signals = stream_engine.advance_from_loader(min_loader, symbol, plan_id)
+        return jsonify(_stream_state_payload(state, signals))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Stream Advance Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@shannon_bp.route('/api/shannon/stream/state', methods=['GET'])
+def get_stream_state():
+    """查询增量网格规划的当前状态"""
+    symbol = request.args.get('symbol')
+    if not symbol:
+        return jsonify({'error': 'Missing symbol'}), 400
+    state = stream_engine.load(symbol, request.args.get('plan_id') or 'default')
+    if state is None:
+        return jsonify({'error': '规划不存在'}), 404
+    return jsonify(_stream_state_payload(state))
\ No newline at end of file
@@ -3,14 +3,13 @@ from datetime import datetime
 
 from flask import Blueprint, jsonify, request, render_template
 
-from backtest_engine import BacktestEngine
+from backtest_cache import run_backtest_cached
 from db.config import DB_CONFIG
 from db.database import Database
 from db.scheme_db import SchemeDatabase
-from routes.backtest_routes import update_scheme, create_scheme
+from routes.backtest_routes import update_scheme, create_scheme, result_cache
 from strategies import StrategyContextFactory, BacktestConfig
 from utils.error_handler import api_error_handler, log_error
-from visualization import format_backtest_result
 
 volatility_bp = Blueprint('volatility', __name__)
 db = Database(DB_CONFIG['market_data']['path'])
@@ -101,19 +100,13 @@ def run_volatility_backtest():
             error_msg = log_error(e, "回测参数无效")
             return jsonify({'error': error_msg}), 400
 
-        # 创建回测引擎
+        # 执行回测（命中缓存时直接返回格式化结果）
         config = BacktestConfig()  # 使用默认配置
-        engine = BacktestEngine(config)
-
-        # 执行回测
-        result = engine.run_backtest(context)
-        if result is None:
+        formatted_result = run_backtest_cached(context, config, result_cache)
+        if formatted_result is None:
             error_msg = log_error(None, "回测执行失败，未返回结果")
             return jsonify({'error': error_msg}), 500
 
-        # 格式化响应数据
-        formatted_result = format_backtest_result(result)
-
         # 保存方案
         if save_scheme:
             try:
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify
 from strategies.wyckoff_analyzer import WyckoffAnalyzer
 from routes.data_download_routes import fetch_data, get_symbol_name, find_symbol_by_name
+from grid.min_data_loader import MinDataLoader
 import pandas as pd
 import io
 import os
@@ -11,6 +12,7 @@ from datetime import datetime
 
 wyckoff_bp = Blueprint('wyckoff', __name__)
 analyzer = WyckoffAnalyzer()
+min_loader = MinDataLoader()
 
 # 定义缓存目录
 CACHE_DIR = os.path.join(os.getcwd(), 'data', 'wyckoff_cache')
@@ -210,6 +212,37 @@ def download_and_analyze():
         logging.error(f"Incremental download error: {e}\n{stack_trace}")
         return jsonify({'error': str(e)}), 500
 
+@wyckoff_bp.route('/api/wyckoff/analyze_local', methods=['POST'])
+def analyze_local():
+    """直接分析本地分钟库聚合出的 K 线 (日线 / 60m 等)，无需另外下载 CSV"""
+    try:
+        data = request.json
+        symbol = data.get('symbol', '').strip()
+        timeframe = data.get('timeframe', '1d')
+        if not symbol:
+            return jsonify({'error': '未提供标的代码'}), 400
+
+        bars = min_loader.load_bars(symbol, timeframe, data.get('start_date'), data.get('end_date'))
+        if len(bars['ts']) == 0:
+            return jsonify({'error': f'本地未找到 {symbol} 的分钟数据'}), 404
+
+        df = pd.DataFrame({
+            'date': pd.to_datetime(bars['ts'].astype(str), format='%Y%m%d%H%M'),
+            **{col: bars[col] for col in ('open', 'high', 'low', 'close', 'volume')}
+        })
+        if timeframe == '1d':
+            df['date'] = df['date'].dt.normalize()
+        chart_data, signals = analyzer.analyze(df)
+        chart_data['stock_name'] = f"{symbol} ({timeframe})"
+
+        return jsonify({'status': 'success', 'chart_data': chart_data, 'signals': signals})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.error(f"Local Wyckoff analysis error: {e}\n{stack_trace}")
+        return jsonify({'error': str(e)}), 500
+
 @wyckoff_bp.route('/api/wyckoff/analyze_csv', methods=['POST'])
 def analyze_csv():
     try:
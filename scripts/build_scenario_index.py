@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+from services.scenario_index import ScenarioIndex
+
+
+def build(symbols=None, metric='auto', force=False, db_path='db/market_data_min.db'):
+    print(f"Updating scenario index in {db_path} ...")
+    start = time.time()
+    index = ScenarioIndex(db_path=db_path)
+    if force:
+        symbols = symbols or [item['code'] for item in index.searcher.dl.get_etf_list()]
+        result = {symbol: index.update(symbol, metric, force=True) for symbol in symbols}
+    else:
+        result = index.update_all(symbols, metric)
+    for symbol, count in result.items():
+        print(f"  {symbol}: {count} rows")
+    print(f"Done. {len(result)} symbols, {sum(result.values())} rows, {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='构建 / 增量更新全市场历史情景特征索引')
+    parser.add_argument('symbols', nargs='*', help='标的代码，默认全部有分钟数据的 ETF')
+    parser.add_argument('--metric', default='auto', choices=['auto', 'pe', 'pb'])
+    parser.add_argument('--force', action='store_true', help='忽略数据版本，全量重建')
+    parser.add_argument('--db', default='db/market_data_min.db')
+    args = parser.parse_args()
+    build(args.symbols or None, args.metric, args.force, args.db)
@@ -0,0 +1,54 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+from grid.min_data_loader import MinDataLoader
+from services.similarity_searcher import SimilaritySearcher
+
+
+def calibrate(symbols=None, lower_ratio=0.9, upper_ratio=1.1, metric='auto', horizon=120, bins=10, out=None):
+    searcher = SimilaritySearcher()
+    symbols = symbols or [item['code'] for item in MinDataLoader().get_etf_list()]
+    rows = []
+    for symbol in symbols:
+        start = time.time()
+        result = searcher.calibrate_planner_edge(
+            symbol, lower_ratio=lower_ratio, upper_ratio=upper_ratio,
+            metric_preference=metric, horizon=horizon, bins=bins
+        )
+        if result.get('error'):
+            print(f"{symbol}: {result['error']}")
+            continue
+
+        print(f"{symbol} ({result['metric']}): {result['evaluated_count']} days, "
+              f"{result['scored_count']} scored, brier={result['brier']}, {time.time() - start:.1f}s")
+        print(f"  {'bin':>11} {'count':>6} {'predicted':>9} {'realized':>8}")
+        for item in result['calibration']:
+            if not item['count']:
+                continue
+            print(f"  {item['bin_low']:>5.0f}-{item['bin_high']:<5.0f} {item['count']:>6} "
+                  f"{str(item['mean_predicted']):>9} {str(item['realized_rate']):>8}")
+            rows.append({'symbol': symbol, 'metric': result['metric'], **item})
+
+    if out and rows:
+        with open(out, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved {len(rows)} rows to {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='规划胜率历史校准：预测胜率 vs 实际先到结果')
+    parser.add_argument('symbols', nargs='*', help='标的代码，默认全部有分钟数据的 ETF')
+    parser.add_argument('--lower', type=float, default=0.9, help='下边界相对收盘价的倍数')
+    parser.add_argument('--upper', type=float, default=1.1, help='上边界相对收盘价的倍数')
+    parser.add_argument('--metric', default='auto', choices=['auto', 'pe', 'pb'])
+    parser.add_argument('--horizon', type=int, default=120)
+    parser.add_argument('--bins', type=int, default=10)
+    parser.add_argument('--out', help='校准表 CSV 输出路径')
+    args = parser.parse_args()
+    calibrate(args.symbols or None, args.lower, args.upper, args.metric, args.horizon, args.bins, args.out)
@@ -0,0 +1,27 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+from grid.min_data_loader import MinDataLoader
+
+
+def migrate(symbols=None, db_path='db/market_data_min.db', column_root='db/min_columns'):
+    print(f"Migrating minute bars from {db_path} to {column_root} ...")
+    start = time.time()
+    loader = MinDataLoader(db_path=db_path, backend='auto', column_root=column_root)
+    result = loader.migrate_to_columnar(symbols)
+    total = sum(result.values())
+    for symbol, count in result.items():
+        print(f"  {symbol}: {count} rows")
+    print(f"Done. {len(result)} symbols, {total} rows, {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='迁移 etf_min_1m 分钟数据到列式存储')
+    parser.add_argument('symbols', nargs='*', help='要迁移的标的代码，默认全部')
+    parser.add_argument('--db', default='db/market_data_min.db')
+    parser.add_argument('--out', default='db/min_columns')
+    args = parser.parse_args()
+    migrate(args.symbols or None, args.db, args.out)
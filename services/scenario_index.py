@@ -0,0 +1,291 @@
+import logging
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from services.similarity_searcher import SimilaritySearcher
+
+# 参与近邻检索的特征（按列标准化后计算欧氏距离）
+FEATURE_COLUMNS = ('val_pct', 'trend_factor', 'atr_rank', 'drawdown')
+# 前瞻收益标签：与 find_similar_moments 一致，观察 120 根日线，至少 60 根
+FORWARD_BARS = 120
+FORWARD_MIN_BARS = 60
+# 估值指标：每个标的按指标分别保存特征，近邻检索只在同一指标的特征之间进行
+METRICS = ('pe', 'pb')
+
+
+class ScenarioIndex:
+    """
+    全市场历史情景特征索引。
+
+    每个有分钟数据的 ETF（通过 etf_index_mapping 关联到指数估值）按估值指标 (pe / pb) 逐日保存一行特征：
+    估值分位、均线趋势因子、ATR20 历史分位、距历史高点回撤，以及 120 日前瞻收益标签。
+    特征持久化在 scenario_features 表，行情或估值更新后按版本增量重算受影响的尾部；
+    查询时按指标在内存中构建 cKDTree，做跨标的 k 近邻检索。查询路径只读，不写索引。
+    """
+
+    def __init__(self, db_path='db/market_data_min.db', searcher: SimilaritySearcher | None = None):
+        self.db_path = db_path
+        self.searcher = searcher or SimilaritySearcher()
+        # 估值指标 -> (cKDTree, 行, 标准化尺度)
+        self._trees = {}
+        self._init_db()
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        # 旧版索引未按估值指标区分，特征可由行情和估值数据重建，直接删除
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(scenario_features)')]
+        if columns and 'metric' not in columns:
+            cursor.execute('DROP TABLE scenario_features')
+            cursor.execute('DROP TABLE IF EXISTS scenario_index_meta')
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS scenario_features (
+                symbol TEXT,
+                metric TEXT,
+                date TEXT,
+                close REAL,
+                val_pct REAL,
+                trend_factor REAL,
+                atr_rank REAL,
+                drawdown REAL,
+                future_ret REAL,
+                PRIMARY KEY (symbol, metric, date)
+            )
+            '''
+        )
+        # 每个标的、每个估值指标已入索引的数据版本（最新行情日期 / 最新估值日期）
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS scenario_index_meta (
+                symbol TEXT,
+                metric TEXT,
+                index_code TEXT,
+                price_end TEXT,
+                val_end TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (symbol, metric)
+            )
+            '''
+        )
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def build_features(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        在 _build_feature_frame 的结果上补充 ATR 分位、回撤和前瞻收益。
+        除前瞻收益外均为因果计算，只依赖当日及之前的数据。
+        """
+        out = df[['close', 'val_pct', 'trend_factor']].copy()
+
+        prev_close = df['close'].shift(1)
+        tr = pd.concat([
+            (df['high'] - df['low']).abs(),
+            (df['high'] - prev_close).abs(),
+            (df['low'] - prev_close).abs(),
+        ], axis=1).max(axis=1)
+        atr_pct = tr.rolling(20).mean() / df['close'].where(df['close'] > 0)
+        # 截至当日的历史分位，口径同 _build_atr_snapshot：(历史中低于当前值的占比) * 100
+        valid_atr = atr_pct.dropna()
+        below = valid_atr.expanding().rank(method='min') - 1
+        out['atr_rank'] = (below / np.arange(1, len(valid_atr) + 1) * 100).reindex(df.index)
+
+        out['drawdown'] = df['close'] / df['close'].cummax() - 1
+
+        closes = df['close'].values
+        n = len(closes)
+        end_pos = np.minimum(np.arange(n) + FORWARD_BARS, n - 1)
+        future_ret = (closes[end_pos] - closes) / closes * 100
+        future_ret[np.arange(n) + FORWARD_MIN_BARS > n - 1] = np.nan
+        out['future_ret'] = future_ret
+        return out
+
+    def update(self, symbol: str, metric_preference: str = 'auto', force: bool = False) -> int:
+        """
+        增量更新单个标的的特征，metric_preference 为 auto 时更新全部有估值数据的指标 (METRICS)。
+        行情或估值版本未变化时跳过；否则从旧版本末尾往前 FORWARD_BARS 行开始重写（前瞻标签会随新行情变化）。
+
+        Returns:
+            int: 写入的行数
+        """
+        frames = self.searcher._load_similarity_frames(symbol)
+        if frames.get('error'):
+            logging.info(f"Scenario index skipped {symbol}: {frames['error']}")
+            return 0
+        metrics = METRICS if metric_preference == 'auto' else (metric_preference,)
+        return sum(self._update_metric(symbol, frames, metric, force) for metric in metrics)
+
+    def _update_metric(self, symbol: str, frames: dict, metric: str, force: bool) -> int:
+        """按单个估值指标增量更新特征，该指标没有估值分位数据时跳过"""
+        df, val_col = self.searcher._build_feature_frame(frames['df_price'], frames['df_val'], metric)
+        if df.empty or not df['val_pct'].notnull().any():
+            return 0
+
+        price_end = frames['df_price'].index[-1].strftime('%Y-%m-%d')
+        val_end = frames['df_val'].index[-1].strftime('%Y-%m-%d')
+        conn = sqlite3.connect(self.db_path)
+        try:
+            meta = conn.execute(
+                'SELECT price_end, val_end FROM scenario_index_meta WHERE symbol = ? AND metric = ?',
+                (symbol, val_col)
+            ).fetchone()
+            if not force and meta == (price_end, val_end):
+                return 0
+
+            features = self.build_features(df)
+            start_pos = 0
+            if not force and meta:
+                changed_from = min(pd.Timestamp(meta[0]), pd.Timestamp(meta[1]) + pd.Timedelta(days=1))
+                start_pos = max(int(features.index.searchsorted(changed_from)) - FORWARD_BARS, 0)
+            else:
+                conn.execute('DELETE FROM scenario_features WHERE symbol = ? AND metric = ?', (symbol, val_col))
+
+            tail = features.iloc[start_pos:]
+            rows = [
+                (symbol, val_col, date.strftime('%Y-%m-%d'), *[None if pd.isna(v) else float(v) for v in values])
+                for date, values in zip(tail.index, tail[
+                    ['close', 'val_pct', 'trend_factor', 'atr_rank', 'drawdown', 'future_ret']
+                ].itertuples(index=False, name=None))
+            ]
+            conn.executemany(
+                '''
+                INSERT OR REPLACE INTO scenario_features
+                (symbol, metric, date, close, val_pct, trend_factor, atr_rank, drawdown, future_ret)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''',
+                rows
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO scenario_index_meta VALUES (?, ?, ?, ?, ?, ?)',
+                (symbol, val_col, frames['index_info']['index_code'], price_end, val_end,
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._trees.pop(val_col, None)
+        logging.info(f"Scenario index updated {symbol} ({val_col}): {len(rows)} rows")
+        return len(rows)
+
+    def update_all(self, symbols: list = None, metric_preference: str = 'auto') -> dict:
+        """更新全部有分钟数据的标的，返回 {symbol: 写入行数}"""
+        symbols = symbols or [item['code'] for item in self.searcher.dl.get_etf_list()]
+        return {symbol: self.update(symbol, metric_preference) for symbol in symbols}
+
+    def _load_tree(self, metric: str):
+        """加载该估值指标下带前瞻标签且特征完整的行，构建 KD 树"""
+        if metric in self._trees:
+            return self._trees[metric]
+        conn = sqlite3.connect(self.db_path)
+        rows = pd.read_sql_query(
+            f'''
+            SELECT symbol, date, close, {', '.join(FEATURE_COLUMNS)}, future_ret
+            FROM scenario_features
+            WHERE metric = ? AND future_ret IS NOT NULL AND {' AND '.join(f'{c} IS NOT NULL' for c in FEATURE_COLUMNS)}
+            ORDER BY symbol, date
+            ''',
+            conn,
+            params=(metric,)
+        )
+        conn.close()
+
+        values = rows[list(FEATURE_COLUMNS)].values.astype(float)
+        scale = values.std(axis=0) if len(values) else np.ones(len(FEATURE_COLUMNS))
+        scale = np.where(scale > 0, scale, 1.0)
+        tree = cKDTree(values / scale) if len(values) else None
+        self._trees[metric] = (tree, rows, scale)
+        return self._trees[metric]
+
+    def get_current_features(self, symbol: str, metric_preference: str = 'auto'):
+        """
+        取标的最新一日的特征（可以尚无前瞻标签），只读索引，不触发更新。
+        auto 时优先使用 PE 特征，没有 PE 估值数据的标的使用 PB。
+        """
+        conn = sqlite3.connect(self.db_path)
+        metrics = [r[0] for r in conn.execute(
+            'SELECT metric FROM scenario_index_meta WHERE symbol = ?', (symbol,)
+        ).fetchall()]
+        metric = metric_preference if metric_preference != 'auto' else next((m for m in METRICS if m in metrics), None)
+        row = None
+        if metric in metrics:
+            row = conn.execute(
+                f'''
+                SELECT date, {', '.join(FEATURE_COLUMNS)} FROM scenario_features
+                WHERE symbol = ? AND metric = ? ORDER BY date DESC LIMIT 1
+                ''',
+                (symbol, metric)
+            ).fetchone()
+        conn.close()
+
+        if not metrics:
+            return {'error': '该标的尚未建立情景索引，请先下载数据或运行 scripts/build_scenario_index.py'}
+        if metric not in metrics:
+            return {'error': f'该标的缺少 {metric_preference.upper()} 估值数据，无法按该指标匹配'}
+        if not row:
+            return {'error': '数据不足，无法进行匹配'}
+        if any(v is None for v in row[1:]):
+            return {'error': '当前状态尚未稳定 (数据预热不足或历史分位无法计算)'}
+        return {
+            'date': row[0],
+            'metric': metric.upper(),
+            **dict(zip(FEATURE_COLUMNS, row[1:]))
+        }
+
+    def query(self, features: dict, top_n: int = 10, min_gap_days: int = 90):
+        """
+        全市场 k 近邻检索，只与 features['metric'] 同一估值指标的历史特征比较。
+        同一标的相距不足 min_gap_days 的结果只保留距离最近的一条。
+        """
+        tree, rows, scale = self._load_tree(features['metric'].lower())
+        if tree is None:
+            return []
+
+        point = np.array([features[c] for c in FEATURE_COLUMNS], dtype=float) / scale
+        k = min(len(rows), max(top_n * 50, 100))
+        distances, positions = tree.query(point, k=k)
+        distances = np.atleast_1d(distances)
+        positions = np.atleast_1d(positions)
+
+        picked = {}
+        results = []
+        for distance, pos in zip(distances, positions):
+            symbol = rows['symbol'].iat[pos]
+            date = pd.Timestamp(rows['date'].iat[pos])
+            if any(abs((date - d).days) < min_gap_days for d in picked.get(symbol, [])):
+                continue
+            picked.setdefault(symbol, []).append(date)
+
+            future_ret = float(rows['future_ret'].iat[pos])
+            if future_ret > 10:
+                label = '上涨 (Bull)'
+            elif future_ret < -10:
+                label = '下跌 (Bear)'
+            else:
+                label = '横盘 (Sideways)'
+            results.append({
+                'symbol': symbol,
+                'date': date.strftime('%Y-%m-%d'),
+                'similarity': round(100 / (1 + float(distance)), 1),
+                'val_pct': round(float(rows['val_pct'].iat[pos]), 1),
+                'trend_factor': round(float(rows['trend_factor'].iat[pos]) * 100, 2),
+                'atr_rank': round(float(rows['atr_rank'].iat[pos]), 1),
+                'drawdown': round(float(rows['drawdown'].iat[pos]) * 100, 2),
+                'future_ret': round(future_ret, 2),
+                'future_label': label
+            })
+            if len(results) >= top_n:
+                break
+        return results
+
+    def find_universe_analogues(self, symbol: str, top_n: int = 10, metric_preference: str = 'auto'):
+        """以标的当前状态为查询点，返回全市场最相似的历史情景"""
+        current = self.get_current_features(symbol, metric_preference)
+        if current.get('error'):
+            return current
+        return {'current': current, 'matches': self.query(current, top_n=top_n)}
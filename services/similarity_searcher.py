@@ -1,12 +1,109 @@
+import bisect
 import logging
 from datetime import timedelta
 
 import numpy as np
 import pandas as pd
+from numba import njit
 
 from grid.min_data_loader import MinDataLoader
 from grid.valuation_manager import ValuationManager
 
+# 先到边界结果编码
+OUTCOME_NO_HIT = 0
+OUTCOME_UP = 1
+OUTCOME_DOWN = 2
+OUTCOME_TIE = 3
+OUTCOME_LABELS = ('no_hit', 'up', 'down', 'tie')
+
+
+@njit(cache=True)
+def _first_passage_kernel(highs, lows, start_pos, end_pos, start_prices, upper_mults, lower_mults, horizon):
+    """
+    先到边界核心计算。
+    对每个样本起点，只在其后 horizon 根 K 线（不超过 end_pos）上做一次累计最高价 / 累计最低价，
+    累计最高价单调不减、累计最低价单调不增，因此每组边界的首次触及位置可以直接二分查找。
+    同一根 K 线同时触及上下边界记为 tie。
+
+    Returns:
+        outcomes: [样本数, 边界组数] 结果编码
+        hit_pos: [样本数, 边界组数] 触及的 K 线位置，未触及为 -1
+    """
+    n_samples = len(start_pos)
+    n_barriers = len(upper_mults)
+    outcomes = np.zeros((n_samples, n_barriers), dtype=np.int8)
+    hit_pos = np.full((n_samples, n_barriers), -1, dtype=np.int64)
+    cum_high = np.empty(horizon)
+    neg_cum_low = np.empty(horizon)
+
+    for s in range(n_samples):
+        first = start_pos[s] + 1
+        length = min(horizon, end_pos[s] - first)
+        if length <= 0:
+            continue
+
+        # 缺失值不触发边界
+        running_high = -np.inf
+        running_low = np.inf
+        for k in range(length):
+            h = highs[first + k]
+            l = lows[first + k]
+            if h > running_high:
+                running_high = h
+            if l < running_low:
+                running_low = l
+            cum_high[k] = running_high
+            neg_cum_low[k] = -running_low
+
+        for b in range(n_barriers):
+            up_level = start_prices[s] * upper_mults[b]
+            down_level = start_prices[s] * lower_mults[b]
+            up = np.searchsorted(cum_high[:length], up_level)
+            down = np.searchsorted(neg_cum_low[:length], -down_level)
+            if up >= length and down >= length:
+                continue
+            if up == down:
+                outcomes[s, b] = OUTCOME_TIE
+                hit_pos[s, b] = first + up
+            elif up < down:
+                outcomes[s, b] = OUTCOME_UP
+                hit_pos[s, b] = first + up
+            else:
+                outcomes[s, b] = OUTCOME_DOWN
+                hit_pos[s, b] = first + down
+
+    return outcomes, hit_pos
+
+
+def first_passage_outcomes(highs, lows, start_pos, start_prices, upper_mults, lower_mults, horizon: int,
+                           end_pos=None):
+    """
+    批量计算多个样本起点、多组边界的先到结果。
+
+    Args:
+        highs / lows: 日线最高价 / 最低价数组（按日期升序）
+        start_pos: 样本起点在价格数组中的位置，从下一根 K 线开始观察
+        start_prices: 样本起点价格
+        upper_mults / lower_mults: 上下边界相对起点价格的倍数，一一对应组成边界组
+        horizon: 观察的 K 线数量
+        end_pos: 每个样本可观察的截止位置（不含），默认到数组末尾；用于模拟只能看到某日之前的数据
+
+    Returns:
+        (outcomes, hit_pos): 结果编码矩阵（见 OUTCOME_LABELS）与触及位置矩阵
+    """
+    if end_pos is None:
+        end_pos = np.full(len(start_pos), len(highs), dtype=np.int64)
+    return _first_passage_kernel(
+        np.ascontiguousarray(highs, dtype=np.float64),
+        np.ascontiguousarray(lows, dtype=np.float64),
+        np.ascontiguousarray(start_pos, dtype=np.int64),
+        np.ascontiguousarray(end_pos, dtype=np.int64),
+        np.ascontiguousarray(start_prices, dtype=np.float64),
+        np.ascontiguousarray(upper_mults, dtype=np.float64),
+        np.ascontiguousarray(lower_mults, dtype=np.float64),
+        int(horizon),
+    )
+
 
 class SimilaritySearcher:
     def __init__(self):
@@ -57,7 +154,8 @@ class SimilaritySearcher:
             'actual_date': hist.index[-1].strftime('%Y-%m-%d')
         }
 
-    def _prepare_similarity_context(self, etf_code: str, metric_preference: str = 'auto', sync_price_data: bool = False, as_of_date: str | None = None):
+    def _load_similarity_frames(self, etf_code: str, sync_price_data: bool = False):
+        """加载 ETF 日线价格与对应指数的估值历史（均以日期为索引、升序）。"""
         index_info = self.vm.get_index_for_etf(etf_code, allow_api_update=False)
         if not index_info:
             logging.info(f"ETF mapping for {etf_code} missing in local DB, falling back to API...")
@@ -89,12 +187,11 @@ class SimilaritySearcher:
         df_price = df_price.set_index('date').sort_index()
         df_val = df_val.copy()
         df_val.index = pd.to_datetime(df_val.index)
+        return {'index_info': index_info, 'df_price': df_price, 'df_val': df_val}
 
-        if as_of_date:
-            as_of_dt = pd.to_datetime(as_of_date)
-            df_price = df_price[df_price.index <= as_of_dt]
-            df_val = df_val[df_val.index <= as_of_dt]
-
+    @staticmethod
+    def _build_feature_frame(df_price: pd.DataFrame, df_val: pd.DataFrame, metric_preference: str = 'auto'):
+        """价格与估值对齐，计算估值分位 val_pct 与均线趋势 trend_type。"""
         use_pe = True
         if metric_preference == 'pb':
             use_pe = False
@@ -103,11 +200,12 @@ class SimilaritySearcher:
 
         val_col = 'pe' if use_pe else 'pb'
         rank_col = f'{val_col}_rank'
+        df_val = df_val.copy()
         df_val['val_pct'] = df_val[rank_col]
 
         df = df_price[['open', 'high', 'low', 'close']].join(df_val[['pe', 'pb', 'val_pct']], how='inner')
         if df.empty:
-            return {'error': '价格与估值数据无法对齐'}
+            return df, val_col
 
         df['ma20'] = df['close'].rolling(20).mean()
         df['ma60'] = df['close'].rolling(60).mean()
@@ -123,8 +221,24 @@ class SimilaritySearcher:
             return '横盘 (Sideways)'
 
         df['trend_type'] = df['trend_factor'].apply(get_trend_type)
+        return df, val_col
+
+    def _prepare_similarity_context(self, etf_code: str, metric_preference: str = 'auto', sync_price_data: bool = False, as_of_date: str | None = None):
+        frames = self._load_similarity_frames(etf_code, sync_price_data=sync_price_data)
+        if frames.get('error'):
+            return frames
+        index_info = frames['index_info']
+        df_price = frames['df_price']
+        df_val = frames['df_val']
+
+        if as_of_date:
+            as_of_dt = pd.to_datetime(as_of_date)
+            df_price = df_price[df_price.index <= as_of_dt]
+            df_val = df_val[df_val.index <= as_of_dt]
+
+        df, val_col = self._build_feature_frame(df_price, df_val, metric_preference)
         if df.empty:
-            return {'error': '数据对齐后为空，无法获取当前状态'}
+            return {'error': '价格与估值数据无法对齐'}
 
         current_state = df.iloc[-1]
         c_val_pct = current_state['val_pct']
@@ -228,6 +342,64 @@ class SimilaritySearcher:
             'kline': kline_data
         }
 
+    def _select_edge_samples(self, matches: pd.DataFrame, df_price: pd.DataFrame,
+                             horizon: int, max_matches: int):
+        """挑选先到边界统计用的历史样本：间隔至少 90 天，之后至少有 20 根 K 线。"""
+        samples = []
+        last_added_date = None
+        price_index = df_price.index
+        for date, row in matches.iterrows():
+            if last_added_date and (last_added_date - date).days < 90:
+                continue
+
+            pos = int(price_index.searchsorted(date, side='right'))
+            if min(horizon, len(price_index) - pos) < 20:
+                continue
+
+            samples.append((date, row, pos - 1))
+            last_added_date = date
+            if len(samples) >= max_matches:
+                break
+        return samples
+
+    @staticmethod
+    def _summarize_edge(outcomes: np.ndarray) -> dict:
+        """汇总一组边界在全部样本上的先到结果。"""
+        up_count = int(np.sum(outcomes == OUTCOME_UP))
+        down_count = int(np.sum(outcomes == OUTCOME_DOWN))
+        tie_count = int(np.sum(outcomes == OUTCOME_TIE))
+        no_hit_count = int(np.sum(outcomes == OUTCOME_NO_HIT))
+        resolved_count = up_count + down_count
+        win_rate = (up_count / resolved_count) if resolved_count > 0 else None
+        return {
+            'sample_count': int(len(outcomes)),
+            'resolved_count': resolved_count,
+            'up_count': up_count,
+            'down_count': down_count,
+            'tie_count': tie_count,
+            'no_hit_count': no_hit_count,
+            'win_rate': round(win_rate * 100, 1) if win_rate is not None else None,
+        }
+
+    def _edge_samples_context(self, etf_code: str, metric_preference: str, horizon: int,
+                              max_matches: int, as_of_date: str | None):
+        """准备先到边界统计所需的样本起点数组。"""
+        ctx = self._prepare_similarity_context(
+            etf_code,
+            metric_preference=metric_preference,
+            as_of_date=as_of_date,
+        )
+        if ctx.get('error'):
+            return ctx
+
+        df_price = ctx['df_price']
+        matches = self._find_match_rows(ctx['df'], ctx['current_state'])
+        samples = self._select_edge_samples(matches, df_price, horizon, max_matches) if not matches.empty else []
+        ctx['samples'] = samples
+        ctx['start_pos'] = np.array([pos for _, _, pos in samples], dtype=np.int64)
+        ctx['start_prices'] = np.array([float(row['close']) for _, row, _ in samples], dtype=np.float64)
+        return ctx
+
     def estimate_planner_edge(self, etf_code: str, current_price: float, lower: float, upper: float,
                               metric_preference: str = 'auto', horizon: int = 120, max_matches: int = 10,
                               as_of_date: str | None = None):
@@ -235,93 +407,246 @@ class SimilaritySearcher:
         if current_price <= 0 or lower <= 0 or upper <= current_price or lower >= current_price:
             return {'error': '规划参数无效，需满足 lower < current_price < upper'}
 
-        ctx = self._prepare_similarity_context(
-            etf_code,
-            metric_preference=metric_preference,
-            as_of_date=as_of_date,
-        )
+        ctx = self._edge_samples_context(etf_code, metric_preference, horizon, max_matches, as_of_date)
         if ctx.get('error'):
             return {'error': ctx['error']}
 
-        df = ctx['df']
+        samples = ctx['samples']
+        if not samples:
+            return {**self._summarize_edge(np.zeros(0, dtype=np.int8)), 'samples': []}
+
         df_price = ctx['df_price']
         current_state = ctx['current_state']
-        matches = self._find_match_rows(df, current_state)
-        if matches.empty:
-            return {
-                'sample_count': 0,
-                'resolved_count': 0,
-                'up_count': 0,
-                'down_count': 0,
-                'tie_count': 0,
-                'no_hit_count': 0,
-                'win_rate': None,
-                'samples': []
-            }
-
         upper_mult = upper / current_price
         lower_mult = lower / current_price
-        results = []
-        last_added_date = None
-
-        for date, row in matches.iterrows():
-            if last_added_date and (last_added_date - date).days < 90:
-                continue
-
-            future_data = df_price[df_price.index > date].head(horizon)
-            if len(future_data) < 20:
-                continue
+        outcomes, hit_pos = first_passage_outcomes(
+            df_price['high'].values, df_price['low'].values,
+            ctx['start_pos'], ctx['start_prices'],
+            [upper_mult], [lower_mult], horizon
+        )
 
+        results = []
+        for i, (date, row, _) in enumerate(samples):
             start_price = float(row['close'])
-            hit_upper = start_price * upper_mult
-            hit_lower = start_price * lower_mult
-            outcome = 'no_hit'
-            hit_date = None
-
-            for future_date, future_row in future_data.iterrows():
-                up_hit = float(future_row['high']) >= hit_upper
-                down_hit = float(future_row['low']) <= hit_lower
-                if up_hit and down_hit:
-                    outcome = 'tie'
-                    hit_date = future_date
-                    break
-                if up_hit:
-                    outcome = 'up'
-                    hit_date = future_date
-                    break
-                if down_hit:
-                    outcome = 'down'
-                    hit_date = future_date
-                    break
-
             similarity = 100 - abs(float(row['val_pct']) - float(current_state['val_pct'])) * 2
+            hit_date = df_price.index[hit_pos[i, 0]] if hit_pos[i, 0] >= 0 else None
             results.append({
                 'date': date.strftime('%Y-%m-%d'),
                 'similarity': round(similarity, 1),
                 'start_price': round(start_price, 4),
-                'mapped_upper': round(hit_upper, 4),
-                'mapped_lower': round(hit_lower, 4),
-                'outcome': outcome,
+                'mapped_upper': round(start_price * upper_mult, 4),
+                'mapped_lower': round(start_price * lower_mult, 4),
+                'outcome': OUTCOME_LABELS[outcomes[i, 0]],
                 'hit_date': hit_date.strftime('%Y-%m-%d') if hit_date is not None else None
             })
-            last_added_date = date
-            if len(results) >= max_matches:
-                break
 
-        up_count = sum(1 for item in results if item['outcome'] == 'up')
-        down_count = sum(1 for item in results if item['outcome'] == 'down')
-        tie_count = sum(1 for item in results if item['outcome'] == 'tie')
-        no_hit_count = sum(1 for item in results if item['outcome'] == 'no_hit')
-        resolved_count = up_count + down_count
-        win_rate = (up_count / resolved_count) if resolved_count > 0 else None
+        return {**self._summarize_edge(outcomes[:, 0]), 'samples': results}
+
+    def estimate_planner_edge_grid(self, etf_code: str, current_price: float, lowers, uppers,
+                                   metric_preference: str = 'auto', horizon: int = 120, max_matches: int = 10,
+                                   as_of_date: str | None = None):
+        """
+        一次性评估多组候选边界 (lower, upper) 的先到概率。
+        样本只匹配一次，所有边界组合在同一次核心计算中完成；不满足 lower < current_price < upper 的组合跳过。
+        """
+        if current_price <= 0:
+            return {'error': '当前价格无效'}
+        pairs = [
+            (float(lower), float(upper))
+            for lower in lowers for upper in uppers
+            if 0 < lower < current_price < upper
+        ]
+        if not pairs:
+            return {'error': '没有有效的边界组合，需满足 lower < current_price < upper'}
+
+        ctx = self._edge_samples_context(etf_code, metric_preference, horizon, max_matches, as_of_date)
+        if ctx.get('error'):
+            return {'error': ctx['error']}
+
+        samples = ctx['samples']
+        df_price = ctx['df_price']
+        upper_mults = np.array([upper for _, upper in pairs]) / current_price
+        lower_mults = np.array([lower for lower, _ in pairs]) / current_price
+        outcomes, _ = first_passage_outcomes(
+            df_price['high'].values, df_price['low'].values,
+            ctx['start_pos'], ctx['start_prices'],
+            upper_mults, lower_mults, horizon
+        )
+
+        grid = []
+        for b, (lower, upper) in enumerate(pairs):
+            grid.append({'lower': round(lower, 4), 'upper': round(upper, 4), **self._summarize_edge(outcomes[:, b])})
 
         return {
-            'sample_count': len(results),
-            'resolved_count': resolved_count,
-            'up_count': up_count,
-            'down_count': down_count,
-            'tie_count': tie_count,
-            'no_hit_count': no_hit_count,
-            'win_rate': round(win_rate * 100, 1) if win_rate is not None else None,
-            'samples': results
+            'current_price': current_price,
+            'sample_count': len(samples),
+            'sample_dates': [date.strftime('%Y-%m-%d') for date, _, _ in samples],
+            'grid': grid
+        }
+
+    def calibrate_planner_edge(self, etf_code: str, lower_ratio: float = 0.9, upper_ratio: float = 1.1,
+                               metric_preference: str = 'auto', horizon: int = 120, max_matches: int = 10,
+                               start_date: str | None = None, end_date: str | None = None,
+                               bins: int = 10, include_records: bool = False):
+        """
+        历史校准：对每个历史交易日按 as_of_date 口径估算规划胜率，再与该日之后实际先到结果对比。
+        与逐日调用 estimate_planner_edge(as_of_date=...) 结果一致，但价格/估值只加载一次：
+        1. 特征（均线趋势、估值分位）只计算一次，均为因果计算，截断到某日与全量计算的前缀相同
+        2. 每个趋势类型维护一个按 val_pct 排序的索引，随日期推进逐步加入可匹配的历史行，
+           匹配时二分定位 val_pct 区间
+        3. 全部样本与实际结果一次性交给先到边界核心计算
+
+        Args:
+            lower_ratio / upper_ratio: 下 / 上边界相对当日收盘价的倍数
+            bins: 预测胜率分箱数量
+            include_records: 是否返回逐日明细
+
+        说明：metric_preference='auto' 时估值指标按全量历史选择一次。
+        """
+        if not (0 < lower_ratio < 1 < upper_ratio):
+            return {'error': '边界参数无效，需满足 lower_ratio < 1 < upper_ratio'}
+
+        frames = self._load_similarity_frames(etf_code)
+        if frames.get('error'):
+            return {'error': frames['error']}
+        df_price = frames['df_price']
+        df, val_col = self._build_feature_frame(df_price, frames['df_val'], metric_preference)
+        if df.empty:
+            return {'error': '价格与估值数据无法对齐'}
+
+        dates = df.index
+        val_pct = df['val_pct'].values.astype(float)
+        trend = df['trend_type'].values
+        has_trend = df['trend_type'].notna().values
+        closes = df['close'].values.astype(float)
+        price_pos = df_price.index.searchsorted(dates, side='right') - 1
+        n_price = len(df_price)
+
+        start_dt = pd.to_datetime(start_date) if start_date else None
+        end_dt = pd.to_datetime(end_date) if end_date else None
+
+        # trend_type -> [(val_pct, 行号)]，按 val_pct 排序
+        buckets = {}
+        eval_rows = []
+        sample_rows = []
+        sample_groups = []
+        sample_ends = []
+        for p in range(len(df)):
+            # 可匹配的历史行：截至当日数据中除最后 120 行以外的部分
+            q = p - 120
+            if q >= 0 and not np.isnan(val_pct[q]) and has_trend[q]:
+                bisect.insort(buckets.setdefault(trend[q], []), (val_pct[q], q))
+
+            c_val_pct = val_pct[p]
+            if np.isnan(c_val_pct) or not has_trend[p]:
+                continue
+            if (start_dt is not None and dates[p] < start_dt) or (end_dt is not None and dates[p] > end_dt):
+                continue
+
+            bucket = buckets.get(trend[p], [])
+            lo = bisect.bisect_left(bucket, (c_val_pct - 7.5 - 1e-9,))
+            hi = bisect.bisect_right(bucket, (c_val_pct + 7.5 + 1e-9,))
+            candidates = sorted(
+                (q for v, q in bucket[lo:hi] if abs(v - c_val_pct) < 7.5),
+                reverse=True
+            )
+
+            group = len(eval_rows)
+            eval_rows.append(p)
+            visible_end = price_pos[p] + 1
+            last_added_date = None
+            count = 0
+            for q in candidates:
+                date = dates[q]
+                if last_added_date and (last_added_date - date).days < 90:
+                    continue
+                if min(horizon, visible_end - (price_pos[q] + 1)) < 20:
+                    continue
+                sample_rows.append(q)
+                sample_groups.append(group)
+                sample_ends.append(visible_end)
+                last_added_date = date
+                count += 1
+                if count >= max_matches:
+                    break
+
+        if not eval_rows:
+            return {'error': '没有可评估的历史日期'}
+
+        highs = df_price['high'].values
+        lows = df_price['low'].values
+        sample_rows = np.array(sample_rows, dtype=np.int64)
+        outcomes, _ = first_passage_outcomes(
+            highs, lows, price_pos[sample_rows], closes[sample_rows],
+            [upper_ratio], [lower_ratio], horizon, end_pos=np.array(sample_ends, dtype=np.int64)
+        )
+        groups = np.array(sample_groups, dtype=np.int64)
+        n_eval = len(eval_rows)
+        up_counts = np.bincount(groups, weights=outcomes[:, 0] == OUTCOME_UP, minlength=n_eval)
+        down_counts = np.bincount(groups, weights=outcomes[:, 0] == OUTCOME_DOWN, minlength=n_eval)
+        sample_counts = np.bincount(groups, minlength=n_eval)
+        resolved = up_counts + down_counts
+        predicted = np.full(n_eval, np.nan)
+        np.divide(up_counts * 100, resolved, out=predicted, where=resolved > 0)
+
+        # 实际结果：当日之后完整观察 horizon 根 K 线，未满的记为待定
+        eval_rows = np.array(eval_rows, dtype=np.int64)
+        realized, _ = first_passage_outcomes(
+            highs, lows, price_pos[eval_rows], closes[eval_rows],
+            [upper_ratio], [lower_ratio], horizon
+        )
+        realized = realized[:, 0]
+        complete = n_price - (price_pos[eval_rows] + 1) >= horizon
+        scored = ~np.isnan(predicted) & complete & ((realized == OUTCOME_UP) | (realized == OUTCOME_DOWN))
+
+        calibration = []
+        bin_width = 100.0 / bins
+        bin_index = np.minimum((np.nan_to_num(predicted) // bin_width).astype(np.int64), bins - 1)
+        for b in range(bins):
+            in_bin = ~np.isnan(predicted) & (bin_index == b)
+            bin_realized = realized[in_bin & complete]
+            bin_scored = scored & in_bin
+            realized_up = int(np.sum(bin_realized == OUTCOME_UP))
+            realized_down = int(np.sum(bin_realized == OUTCOME_DOWN))
+            calibration.append({
+                'bin_low': round(b * bin_width, 1),
+                'bin_high': round((b + 1) * bin_width, 1),
+                'count': int(np.sum(in_bin)),
+                'mean_predicted': round(float(predicted[in_bin].mean()), 1) if in_bin.any() else None,
+                'realized_rate': round(realized_up / (realized_up + realized_down) * 100, 1)
+                if (realized_up + realized_down) > 0 else None,
+                'realized_up': realized_up,
+                'realized_down': realized_down,
+                'tie_count': int(np.sum(bin_realized == OUTCOME_TIE)),
+                'no_hit_count': int(np.sum(bin_realized == OUTCOME_NO_HIT)),
+                'pending_count': int(np.sum(in_bin & ~complete)),
+                'scored_count': int(np.sum(bin_scored)),
+            })
+
+        brier = None
+        if scored.any():
+            brier = float(np.mean((predicted[scored] / 100 - (realized[scored] == OUTCOME_UP)) ** 2))
+
+        result = {
+            'etf_code': etf_code,
+            'metric': val_col.upper(),
+            'lower_ratio': lower_ratio,
+            'upper_ratio': upper_ratio,
+            'horizon': horizon,
+            'evaluated_count': n_eval,
+            'predicted_count': int(np.sum(~np.isnan(predicted))),
+            'scored_count': int(np.sum(scored)),
+            'brier': round(brier, 4) if brier is not None else None,
+            'calibration': calibration,
         }
+        if include_records:
+            result['records'] = [
+                {
+                    'date': dates[p].strftime('%Y-%m-%d'),
+                    'sample_count': int(sample_counts[i]),
+                    'win_rate': round(float(predicted[i]), 1) if not np.isnan(predicted[i]) else None,
+                    'realized': OUTCOME_LABELS[realized[i]] if complete[i] else None,
+                }
+                for i, p in enumerate(eval_rows)
+            ]
+        return result
@@ -8,7 +8,8 @@ import pandas as pd
 
 from strategies.strategy_context import StrategyContext
 from strategies.option_selector import OptionSelector
-from utils import get_monthly_expiry, get_next_monthly_expiry
+from utils import ExpiryCalendar
+from strategies.option_chain import OptionChainIndex
 from .types import OptionType, OptionPosition, TradeResult, PortfolioValue, TradeRecord, PriceConditions
 
 
@@ -34,6 +35,8 @@ class OptionStrategy(ABC):
         self.cash: float = 0                           # 现金余额
         self.option_data = option_data                 # 期权数据，将在加载数据时设置
         self.etf_data = etf_data                      # ETF数据，将在加载数据时设置
+        self.option_chain: Optional[OptionChainIndex] = None  # 按日分区的期权链索引
+        self.expiry_calendar: Optional[ExpiryCalendar] = None  # 到期日历，未设置时从期权数据构建
 
         self.option_selector = option_selector
         
@@ -52,10 +55,31 @@ class OptionStrategy(ABC):
     def set_option_data(self, option_data: pd.DataFrame):
         """设置期权数据"""
         self.option_data = option_data
+        self.expiry_calendar = None
         # 如果没有指定结束日期，使用数据集的最后日期
         if self.context.end_date is None:
             self.context.end_date = self.option_data['日期'].max()
             
+    def set_option_chain(self, option_chain: Optional[OptionChainIndex]):
+        """设置按日分区的期权链索引"""
+        self.option_chain = option_chain
+
+    def set_expiry_calendar(self, expiry_calendar: Optional[ExpiryCalendar]):
+        """设置到期日历（同一数据集的多个策略共享）"""
+        self.expiry_calendar = expiry_calendar
+
+    def _get_day_options(self, current_date: datetime,
+                         market_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """获取当日期权链
+
+        引擎传入的 market_data['option'] 已按交易日分区，直接使用；
+        否则回退到按日期过滤
+        """
+        if market_data.get('chain') is not None:
+            return market_data['option']
+        option_data = market_data['option']
+        return option_data[option_data['日期'] == current_date]
+
     def set_etf_data(self, etf_data: pd.DataFrame):
         """设置ETF数据"""
         self.etf_data = etf_data
@@ -75,21 +99,13 @@ class OptionStrategy(ABC):
             - 如果是平仓后再开仓，使用下月到期日
             - 如果到期日超过了回测结束日期，则使用结束日期
         """
-        # 获取当月到期日
-        current_expiry = get_monthly_expiry(current_date, self.option_data)
-        
-        # 如果是首次开仓且当前日期不是到期日，使用当月到期日
-        if not self.trades and current_date < current_expiry:
-            target_expiry = current_expiry
-        else:
-            # 其他情况（当日是到期日或非首次开仓）使用下月到期日
-            target_expiry = get_next_monthly_expiry(current_date, self.option_data)
-            
-        # 如果目标到期日超过了回测结束日期，则使用结束日期 这个日期主要用来找合约用的（所以主要关注YYMM部分，如果结束日期是当月（25号到期，回测结束日期是31号），当月期权又过期了，就会找不到对应期权，会引起一些系列问题）
-        # if not target_expiry or target_expiry > self.context.end_date:
-        #     target_expiry = self.context.end_date
-            
-        return target_expiry
+        if self.expiry_calendar is None:
+            self.expiry_calendar = ExpiryCalendar.from_option_data(self.option_data)
+
+        # 如果是首次开仓且当前日期不是到期日，使用当月到期日；
+        # 其他情况（当日是到期日或非首次开仓）使用下月到期日
+        # 到期日主要用来找合约（关注YYMM部分），不截断到回测结束日期，否则结束日期所在月的期权过期后会找不到合约
+        return self.expiry_calendar.target_expiry(current_date, first_open=not self.trades)
 
     def should_open_position(self, current_date: datetime,
                            market_data: Dict[str, pd.DataFrame]) -> bool:
@@ -166,6 +182,9 @@ class OptionStrategy(ABC):
                                   current_date: datetime,
                                   option_data: pd.DataFrame) -> Optional[float]:
         """获取当前价格"""
+        if self.option_chain is not None:
+            return self.option_chain.get_price(current_date, contract_code)
+
         current_data = option_data[
             (option_data['日期'] == current_date) & 
             (option_data['交易代码'] == contract_code)
@@ -589,11 +608,14 @@ class OptionStrategy(ABC):
         # 获取卖出期权和买入期权的数据
         sell_option = options[options['交易代码'] == sell_code].iloc[0]
         buy_option = options[options['交易代码'] == buy_code].iloc[0]
-        
+        return self._spread_contracts(buy_option['收盘价'], sell_option['行权价'])
+
+    def _spread_contracts(self, buy_premium: float, sell_strike: float) -> int:
+        """价差策略按买入期权价格和卖出期权行权价计算可开仓数量（快速路径共用）"""
         # 每份合约的成本因子
-        buy_cost = buy_option['收盘价'] * self.context.contract_multiplier  # 买入期权成本
+        buy_cost = buy_premium * self.context.contract_multiplier  # 买入期权成本
         transaction_cost = self.context.transaction_cost * 2  # 每组合约的交易成本
-        exercise_cost = sell_option['行权价'] * self.context.contract_multiplier  # 行权资金准备
+        exercise_cost = sell_strike * self.context.contract_multiplier  # 行权资金准备
         
         # 解方程：cash >= x * (buy_cost + transaction_cost + exercise_cost)
         cost_per_contract = buy_cost + transaction_cost + exercise_cost
@@ -619,10 +641,13 @@ class OptionStrategy(ABC):
         
         # 获取期权数据
         option = options[options['交易代码'] == contract_code].iloc[0]
-        
+        return self._single_contracts(option['行权价'])
+
+    def _single_contracts(self, strike: float) -> int:
+        """单腿策略按行权价计算可开仓数量（快速路径共用）"""
         # 每份合约的成本因子
         transaction_cost = self.context.transaction_cost  # 每个合约的交易成本
-        exercise_cost = option['行权价'] * self.context.contract_multiplier  # 行权资金准备
+        exercise_cost = strike * self.context.contract_multiplier  # 行权资金准备
         
         # 解方程：cash >= x * (transaction_cost + exercise_cost)
         cost_per_contract = transaction_cost + exercise_cost
@@ -29,16 +29,21 @@ class BullishPutStrategyBase(OptionStrategy):
     def _select_options(self, current_options: pd.DataFrame, current_price: float, expiry: datetime) -> Tuple[
         Optional[DataFrame], Optional[DataFrame]]:
         """选择合适的期权合约"""
+        option_type, sell_value, buy_value, higher_buy = self._spread_legs()
         return self._select_spread_options(
             current_options=current_options,
             current_etf_price=current_price,
             expiry=expiry,
-            sell_value=self.context.sell_put_value,
-            buy_value=self.context.buy_put_value,
-            option_type=OptionType.PUT,
-            higher_buy=False  # 看跌价差买入更低行权价
+            sell_value=sell_value,
+            buy_value=buy_value,
+            option_type=option_type,
+            higher_buy=higher_buy
         )
 
+    def _spread_legs(self) -> Tuple[OptionType, float, float, bool]:
+        """价差的期权类型、卖出 / 买入目标值、买入期权是否取更高行权价（快速路径共用）"""
+        return OptionType.PUT, self.context.sell_put_value, self.context.buy_put_value, False  # 看跌价差买入更低行权价
+
     def open_position(self, current_date: datetime, 
                      market_data: Dict[str, pd.DataFrame]) -> Optional[TradeResult]:
         """开仓逻辑"""
@@ -47,7 +52,6 @@ class BullishPutStrategyBase(OptionStrategy):
         if expiry is None:
             return None
             
-        option_data = market_data['option']
         etf_data = market_data['etf']
         
         # 获取当前ETF价格
@@ -56,7 +60,7 @@ class BullishPutStrategyBase(OptionStrategy):
             return None
         
         # 获取当日期权数据
-        current_options = option_data[option_data['日期'] == current_date]
+        current_options = self._get_day_options(current_date, market_data)
         
         # 选择合适的期权对
         sell_option, buy_option = self._select_options(current_options, current_etf_price, expiry)
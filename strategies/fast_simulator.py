@@ -0,0 +1,270 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .base import OptionStrategy
+from .bearish_call_base import BearishCallStrategyBase
+from .bullish_put_base import BullishPutStrategyBase
+from .delta_bearish_call import DeltaBearishCallStrategy
+from .delta_bullish_put import DeltaBullishPutStrategy
+from .delta_naked_put import DeltaNakedPutStrategy
+from .naked_put_base import NakedPutStrategyBase
+from .option_chain import OptionChainIndex
+from .types import OptionType, PortfolioValue, TradeResult
+from .volatility_bearish_call import VolatilityBearishCallStrategy
+from .volatility_bullish_put import VolatilityBullishPutStrategy
+from .volatility_naked_put import VolatilityNakedPutStrategy
+
+# 支持快速路径的策略（月度到期滚动的垂直价差和单腿卖出看跌）
+FAST_PATH_STRATEGIES = (
+    DeltaBullishPutStrategy,
+    VolatilityBullishPutStrategy,
+    DeltaBearishCallStrategy,
+    VolatilityBearishCallStrategy,
+    DeltaNakedPutStrategy,
+    VolatilityNakedPutStrategy,
+)
+
+
+class FastOptionSimulator:
+    """数组化的期权策略回测快速路径
+
+    与 BacktestEngine 的逐日循环结果完全一致，区别在于：
+    1. 逐日只做持仓到期 / 是否开仓的轻量判断，开平仓只发生在到期滚动的事件日
+    2. 开仓选约直接在期权链列数组上调用 OptionSelector.rank_options，仓位计算复用策略的 _spread_contracts /
+       _single_contracts，与逐日循环共用同一套规则，不再构造 DataFrame
+    3. 平仓沿用策略自身的 close_position，保证价格条件、现金和交易记录的口径不变
+    4. 每日估值按持仓区间批量取价、向量化计算，浮点运算顺序与 calculate_portfolio_value 相同
+    5. 不逐日写回测日志
+    """
+
+    def __init__(self, option_chain: OptionChainIndex, etf_data: pd.DataFrame):
+        self.chain = option_chain
+        self.arrays = option_chain.get_arrays()
+        self.etf_data = etf_data
+        self.etf_positions = {date: i for i, date in enumerate(etf_data.index)}
+        self.empty_etf = etf_data.iloc[0:0]
+
+    @staticmethod
+    def supports(strategy: OptionStrategy) -> bool:
+        """策略是否可以走快速路径（子类可能重写开平仓逻辑，因此按具体类型判断）"""
+        return type(strategy) in FAST_PATH_STRATEGIES
+
+    def run(self, strategy: OptionStrategy, trading_dates: List[datetime]) -> Dict[datetime, PortfolioValue]:
+        """执行回测，交易记录写入 strategy.trades
+
+        Returns:
+            Dict[datetime, PortfolioValue]: 每日投资组合价值
+        """
+        context = strategy.context
+        end_date = context.end_date.date()
+
+        day_indices = np.array([self.chain.day_index.get(d, -1) for d in trading_dates], dtype=np.int64)
+        cash = []
+        # 持仓区间: [开始位置, 结束位置, 持仓列表]
+        segments = []
+        current_legs: Tuple = ()
+
+        for t, current_date in enumerate(trading_dates):
+            positions = strategy.positions
+            if positions and next(iter(positions.values())).expiry <= current_date:
+                result = strategy.close_position(current_date, self._market_data(current_date, day_indices[t]))
+                strategy.record_trade(current_date, result)
+
+            if not positions and current_date.date() < end_date:
+                result = self._open_position(strategy, current_date, day_indices[t])
+                strategy.record_trade(current_date, result)
+
+            legs = tuple(positions.values())
+            if len(legs) != len(current_legs) or any(a is not b for a, b in zip(legs, current_legs)):
+                if current_legs:
+                    segments[-1][1] = t
+                if legs:
+                    segments.append([t, len(trading_dates), legs])
+                current_legs = legs
+            cash.append(strategy.cash)
+
+        return self._portfolio_values(strategy, trading_dates, day_indices, cash, segments)
+
+    def _market_data(self, current_date: datetime, day: int) -> Dict:
+        """构造与 BacktestEngine 相同的当日市场数据"""
+        etf_pos = self.etf_positions.get(current_date)
+        return {
+            'etf': self.etf_data.iloc[etf_pos:etf_pos + 1] if etf_pos is not None else self.empty_etf,
+            'option': self.chain.get_day(current_date),
+            'chain': self.chain
+        }
+
+    def _portfolio_values(self, strategy: OptionStrategy, trading_dates: List[datetime],
+                          day_indices: np.ndarray, cash: List[float], segments: List) -> Dict[datetime, PortfolioValue]:
+        """按持仓区间向量化计算期权市值，再逐日组装 PortfolioValue"""
+        n = len(trading_dates)
+        multiplier = strategy.context.contract_multiplier
+        option_values = np.zeros(n)
+        has_value = np.zeros(n, dtype=bool)
+
+        for start, end, legs in segments:
+            values = np.zeros(end - start)
+            priced = np.zeros(end - start, dtype=bool)
+            for position in legs:
+                prices, found = self.chain.get_prices(position.contract_code, day_indices[start:end])
+                contract_value = prices * abs(position.quantity) * multiplier
+                if position.quantity < 0:
+                    values = np.where(found, values + (position.premium - contract_value), values)
+                else:
+                    values = np.where(found, values + contract_value, values)
+                priced |= found
+            option_values[start:end] = values
+            has_value[start:end] = priced
+
+        portfolio_values = {}
+        last_total_value = getattr(strategy, 'last_total_value', None)
+        for t, current_date in enumerate(trading_dates):
+            option_value = option_values[t] if has_value[t] else 0
+            total_value = cash[t] + option_value
+            if last_total_value is not None:
+                daily_return = (total_value - last_total_value) / last_total_value * 100
+            else:
+                daily_return = 0.0
+            last_total_value = total_value
+            portfolio_values[current_date] = PortfolioValue(
+                cash=cash[t],
+                option_value=option_value,
+                total_value=total_value,
+                daily_return=daily_return
+            )
+        strategy.last_total_value = last_total_value
+        return portfolio_values
+
+    def _select(self, strategy: OptionStrategy, day: int, option_type: OptionType, expiry: datetime,
+                target_value: float, etf_price: float, extra_mask: Optional[np.ndarray] = None) -> Optional[int]:
+        """在当日期权链中选出最优合约，返回行号
+
+        直接在列数组上调用策略选择器的 rank_options，与 find_best_options(...).iloc[0] 使用同一套筛选和排序规则
+        """
+        if day < 0:
+            return None
+        start, end = self.chain.day_starts[day], self.chain.day_ends[day]
+        columns = {'Delta': self.arrays['delta'][start:end], '行权价': self.arrays['strike'][start:end]}
+        rows, _ = strategy.option_selector.rank_options(
+            self.arrays['codes'][start:end], columns, etf_price, target_value, option_type, expiry, extra_mask
+        )
+        return start + int(rows[0]) if len(rows) else None
+
+    def _get_etf_price(self, strategy: OptionStrategy, current_date: datetime) -> Optional[float]:
+        etf_pos = self.etf_positions.get(current_date)
+        if etf_pos is None:
+            strategy.logger.warning(f"在 {current_date} 没有找到 ETF 数据")
+            return None
+        return self.etf_data.iloc[etf_pos]['收盘价']
+
+    def _open_position(self, strategy: OptionStrategy, current_date: datetime, day: int) -> Optional[TradeResult]:
+        """开仓逻辑，与各策略基类的 open_position 口径一致"""
+        expiry = strategy.get_target_expiry(current_date)
+        if expiry is None:
+            return None
+
+        current_etf_price = self._get_etf_price(strategy, current_date)
+        if current_etf_price is None:
+            return None
+
+        if isinstance(strategy, NakedPutStrategyBase):
+            return self._open_naked_put(strategy, current_date, day, expiry, current_etf_price)
+
+        if not isinstance(strategy, (BullishPutStrategyBase, BearishCallStrategyBase)):
+            raise ValueError(f"快速路径不支持的策略: {strategy.__class__.__name__}")
+        option_type, sell_value, buy_value, higher_buy = strategy._spread_legs()
+
+        sell_row = self._select(strategy, day, option_type, expiry, sell_value, current_etf_price)
+        if sell_row is None:
+            return None
+
+        start, end = self.chain.day_starts[day], self.chain.day_ends[day]
+        sell_strike = self.arrays['strike'][sell_row]
+        day_strikes = self.arrays['strike'][start:end]
+        buy_mask = day_strikes > sell_strike if higher_buy else day_strikes < sell_strike
+        buy_row = self._select(strategy, day, option_type, expiry, buy_value, current_etf_price, buy_mask)
+        if buy_row is None:
+            return None
+
+        sell_option = self.chain.option_data.iloc[sell_row]
+        buy_option = self.chain.option_data.iloc[buy_row]
+
+        # 同 _calculate_spread_position_size
+        quantity = strategy._spread_contracts(buy_option['收盘价'], sell_option['行权价'])
+        if quantity <= 0:
+            return None
+
+        positions = []
+        for option, direction in zip((sell_option, buy_option), (-1, 1)):
+            positions.append(strategy._create_position(
+                current_date=current_date,
+                contract_code=option['交易代码'],
+                quantity=quantity * direction,
+                strike=option['行权价'],
+                option_type=option_type,
+                options=option,
+                expiry=expiry
+            ))
+
+        records = []
+        total_cost = 0
+        for position in positions:
+            strategy.positions[position.contract_code] = position
+        for position in positions:
+            record = strategy._create_open_record(
+                current_date=current_date,
+                position=position,
+                etf_price=current_etf_price
+            )
+            records.append(record)
+            total_cost += record.cost
+
+        return TradeResult(
+            records=records,
+            etf_price=current_etf_price,
+            total_pnl=None,
+            total_cost=total_cost
+        )
+
+    def _open_naked_put(self, strategy: OptionStrategy, current_date: datetime, day: int,
+                        expiry: datetime, current_etf_price: float) -> Optional[TradeResult]:
+        """单腿卖出看跌开仓，与 NakedPutStrategyBase.open_position 口径一致"""
+        context = strategy.context
+        sell_row = self._select(strategy, day, OptionType.PUT, expiry, context.sell_put_value, current_etf_price)
+        if sell_row is None:
+            return None
+        sell_option = self.chain.option_data.iloc[sell_row]
+        contract_code = sell_option['交易代码']
+
+        # 同 _calculate_single_position_size：按当日第一条同代码记录的行权价计算
+        start, end = self.chain.day_starts[day], self.chain.day_ends[day]
+        first_row = start + int(np.flatnonzero(self.arrays['codes'][start:end] == str(contract_code))[0])
+        quantity = strategy._single_contracts(self.chain.option_data.iloc[first_row]['行权价'])
+        if quantity <= 0:
+            return None
+
+        sell_position = strategy._create_position(
+            contract_code=contract_code,
+            strike=sell_option['行权价'],
+            option_type=OptionType.PUT,
+            quantity=-quantity,
+            current_date=current_date,
+            options=sell_option,
+            expiry=expiry
+        )
+        strategy.positions[sell_position.contract_code] = sell_position
+
+        record = strategy._create_open_record(
+            current_date=current_date,
+            position=sell_position,
+            etf_price=current_etf_price
+        )
+        return TradeResult(
+            records=[record],
+            etf_price=current_etf_price,
+            total_pnl=0,
+            total_cost=record.cost,
+        )
@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class OptionChainIndex:
+    """按交易日分区的期权链索引
+
+    在加载数据时构建一次：
+    1. 按日期把期权链切成连续的行块，按日取链时只做一次切片，不再全表扫描
+    2. 建立 (日期, 合约代码) -> 收盘价 的查找表，逐日估值时 O(1) 取价
+    3. 按需构建列数组视图（见 get_arrays），供快速回测路径做向量化选约和估值
+    """
+
+    def __init__(self, option_data: pd.DataFrame):
+        # 稳定排序，保证同一交易日内的行顺序与原始数据一致
+        data = option_data.sort_values('日期', kind='stable')
+        self.option_data = data
+
+        dates = data['日期'].values
+        n_rows = len(dates)
+        if n_rows:
+            boundaries = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [n_rows]))
+        else:
+            starts = ends = np.array([], dtype=np.int64)
+
+        # 交易日列表（升序）
+        self.dates: List[pd.Timestamp] = list(pd.DatetimeIndex(dates[starts]))
+        self.day_starts = starts
+        self.day_ends = ends
+        self.day_index: Dict[pd.Timestamp, int] = {date: i for i, date in enumerate(self.dates)}
+        # 日期 -> 当日期权链
+        self._day_blocks: Dict[pd.Timestamp, pd.DataFrame] = {
+            date: data.iloc[start:end]
+            for date, start, end in zip(self.dates, starts, ends)
+        }
+        # (日期, 合约代码) -> 收盘价，重复记录取第一条（倒序写入，先出现的覆盖后出现的）
+        self._prices: Dict[Tuple[pd.Timestamp, str], float] = dict(zip(
+            zip(pd.DatetimeIndex(dates)[::-1], data['交易代码'].values[::-1]),
+            data['收盘价'].values[::-1]
+        ))
+        self._empty = data.iloc[0:0]
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def get_day(self, date: datetime) -> pd.DataFrame:
+        """获取指定交易日的期权链，非交易日返回空表"""
+        return self._day_blocks.get(pd.Timestamp(date), self._empty)
+
+    def get_price(self, date: datetime, contract_code: str) -> Optional[float]:
+        """获取指定合约在指定交易日的收盘价，找不到返回None"""
+        return self._prices.get((pd.Timestamp(date), contract_code))
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """获取期权链的列数组视图（首次调用时构建并缓存）
+
+        Returns:
+            Dict: 与 option_data 行顺序一致的 codes / strike / close / delta 数组，
+            以及按 (合约序号 * 交易日数 + 交易日序号) 升序排列的价格查找表 price_keys / price_values，
+            code_ids 为合约代码 -> 合约序号
+        """
+        if self._arrays is None:
+            data = self.option_data
+            n_days = len(self.dates)
+            day_of_row = np.repeat(np.arange(n_days, dtype=np.int64), self.day_ends - self.day_starts)
+            code_ids, uniques = pd.factorize(data['交易代码'])
+            keys = code_ids.astype(np.int64) * n_days + day_of_row
+            close = data['收盘价'].to_numpy(dtype=float)
+
+            # 与 get_price 一致：同一 (日期, 合约) 的重复记录取第一条
+            valid = code_ids >= 0
+            price_keys, first = np.unique(keys[valid], return_index=True)
+            self._arrays = {
+                'codes': data['交易代码'].to_numpy(dtype=str),
+                'strike': data['行权价'].to_numpy(dtype=float),
+                'close': close,
+                'delta': data['Delta'].to_numpy(dtype=float),
+                'price_keys': price_keys,
+                'price_values': close[valid][first],
+                'code_ids': {code: i for i, code in enumerate(uniques)},
+            }
+        return self._arrays
+
+    def get_prices(self, contract_code: str, day_indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """批量获取某合约在一组交易日（序号）上的收盘价
+
+        Returns:
+            (prices, found): 找不到或序号越界的交易日 found 为 False
+        """
+        arrays = self.get_arrays()
+        day_indices = np.asarray(day_indices, dtype=np.int64)
+        code_id = arrays['code_ids'].get(contract_code)
+        if code_id is None or len(arrays['price_keys']) == 0:
+            return np.full(len(day_indices), np.nan), np.zeros(len(day_indices), dtype=bool)
+
+        keys = code_id * len(self.dates) + day_indices
+        pos = np.searchsorted(arrays['price_keys'], keys)
+        pos = np.minimum(pos, len(arrays['price_keys']) - 1)
+        # 越界的交易日下标会落到相邻合约的键上，必须排除
+        in_range = (day_indices >= 0) & (day_indices < len(self.dates))
+        found = in_range & (arrays['price_keys'][pos] == keys)
+        return np.where(found, arrays['price_values'][pos], np.nan), found
+
+    def get_trading_dates(self, start_date: datetime, end_date: datetime) -> List[pd.Timestamp]:
+        """获取日期范围内的交易日列表"""
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        return [date for date in self.dates if start <= date <= end]
+
+    def __contains__(self, date: datetime) -> bool:
+        return pd.Timestamp(date) in self._day_blocks
+
+    def __len__(self) -> int:
+        return len(self.dates)
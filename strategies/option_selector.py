@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from .types import OptionType
@@ -9,71 +10,53 @@ import logging
 class OptionSelector(ABC):
     """期权选择器抽象类
     
-    用于根据不同的选择策略（如delta、波动率等）选择合适的期权合约
+    用于根据不同的选择策略（如delta、波动率等）选择合适的期权合约。
+    筛选与排序规则集中在 rank_options，逐日回测（DataFrame）和快速路径（期权链列数组）共用
     """
+    # 参与比较的列、差值列名，由子类指定
+    value_column = None
+    diff_column = None
+
     def __init__(self):
 
         # 初始化logger
         self.logger = logging.getLogger(self.__class__.__name__)
     
     @abstractmethod
-    def find_best_options(self,
-                              options: pd.DataFrame,
-                              current_price: float,
-                              target_value: float,
-                              option_type: OptionType,
-                              expiry: datetime) -> pd.DataFrame:
-        """查找最佳的期权组合
+    def target(self, current_price: float, target_value: float) -> float:
+        """目标值（delta 或行权价），与 value_column 列比较"""
+        pass
+
+    def rank_options(self,
+                     codes: np.ndarray,
+                     columns: Dict[str, np.ndarray],
+                     current_price: float,
+                     target_value: float,
+                     option_type: OptionType,
+                     expiry: datetime,
+                     mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """按与目标值的差值给候选合约排序
         
         Args:
-            options: 当前可用的期权数据
-            sell_value: 卖出期权的目标值（delta或波动率）
-            buy_value: 买入期权的目标值（delta或波动率）
-            option_type: 期权类型（看涨/看跌）
-            expiry: 到期日
+            codes: 交易代码数组
+            columns: 列名 -> 数组（至少包含 value_column），与 codes 等长
+            mask: 可选，额外的筛选条件
             
         Returns:
-            Tuple[pd.DataFrame, pd.DataFrame]: 卖出期权和买入期权
+            Tuple[np.ndarray, np.ndarray]: 排序后的候选行号及对应差值。
+            与 pandas sort_values 相同：非 NaN 部分快速排序，NaN 排在最后
         """
-        pass
-    
-
-
-class DeltaOptionSelector(OptionSelector):
-    """基于Delta的期权选择器"""
-
-
-    def find_best_options(self,
-                              options: pd.DataFrame,
-                              current_price: float,
-                              target_delta: float,
-                              option_type: OptionType,
-                              expiry: datetime) -> pd.DataFrame:
-        """查找最佳的期权组合"""
-        """查找目标Delta的期权"""
-        # 创建数据副本而不是视图
-        # 根据期权类型选择代码前缀
         code_prefix = 'P' if option_type == OptionType.PUT else 'C'
-        expiry_code = expiry.strftime('%y%m')
-
-        # 筛选目标月份的期权
-        target_options = options[
-            (options['交易代码'].str.contains(f"{code_prefix}{expiry_code}")) &
-            (options['Delta'].notna())
-            ].copy()
-
-        if target_options.empty:
-            return target_options
+        values = columns[self.value_column]
+        selected = (np.char.find(codes.astype(str), f"{code_prefix}{expiry.strftime('%y%m')}") >= 0) & ~np.isnan(values)
+        if mask is not None:
+            selected &= mask
 
-        # 使用 loc 赋值
-        target_options.loc[:, 'Delta_Diff'] = abs(target_options['Delta'] - target_delta)
-
-        # 按Delta差值排序并返回最接近的
-        return target_options.sort_values('Delta_Diff')
-    
-
-class VolatilityOptionSelector(OptionSelector):
-    """基于波动率的期权选择器"""
+        candidates = np.flatnonzero(selected)
+        diff = np.abs(values[candidates] - self.target(current_price, target_value))
+        is_nan = np.isnan(diff)
+        order = np.r_[np.flatnonzero(~is_nan)[np.argsort(diff[~is_nan], kind='quicksort')], np.flatnonzero(is_nan)]
+        return candidates[order], diff[order]
 
     def find_best_options(self,
                           options: pd.DataFrame,
@@ -86,31 +69,38 @@ class VolatilityOptionSelector(OptionSelector):
         Args:
             options: 当前可用的期权数据
             current_price: 当前价格
-            target_value: 目标涨跌幅（百分数）
+            target_value: 目标值（delta 或涨跌幅百分数）
             option_type: 期权类型（看涨/看跌）
             expiry: 到期日
             
         Returns:
-            pd.DataFrame: 最佳期权组合
+            pd.DataFrame: 符合条件的期权，按差值升序（最接近的在最前）
         """
-        # 计算目标行权价
-        target_strike = current_price * (1 + target_value * 0.01)
-        
-        # 根据期权类型选择代码前缀
-        code_prefix = 'P' if option_type == OptionType.PUT else 'C'
-        expiry_code = expiry.strftime('%y%m')
-        
-        # 筛选目标月份的期权
-        target_options = options[
-            (options['交易代码'].str.contains(f"{code_prefix}{expiry_code}")) &
-            (options['行权价'].notna())
-        ].copy()
-        
+        rows, diff = self.rank_options(
+            options['交易代码'].to_numpy(),
+            {self.value_column: options[self.value_column].to_numpy(dtype=float)},
+            current_price, target_value, option_type, expiry
+        )
+        target_options = options.iloc[rows].copy()
         if target_options.empty:
             return target_options
-            
-        # 计算行权价与目标价格的差值
-        target_options.loc[:, 'Strike_Diff'] = abs(target_options['行权价'] - target_strike)
-        
-        # 按行权价差值排序并返回最接近的
-        return target_options.sort_values('Strike_Diff')
+        target_options.loc[:, self.diff_column] = diff
+        return target_options
+
+
+class DeltaOptionSelector(OptionSelector):
+    """基于Delta的期权选择器：选择 Delta 最接近目标值的期权"""
+    value_column = 'Delta'
+    diff_column = 'Delta_Diff'
+
+    def target(self, current_price: float, target_value: float) -> float:
+        return target_value
+
+
+class VolatilityOptionSelector(OptionSelector):
+    """基于波动率的期权选择器：选择行权价最接近 当前价格 * (1 + 目标涨跌幅%) 的期权"""
+    value_column = '行权价'
+    diff_column = 'Strike_Diff'
+
+    def target(self, current_price: float, target_value: float) -> float:
+        return current_price * (1 + target_value * 0.01)
@@ -27,6 +27,7 @@ class BacktestConfig:
     transaction_cost: float = 3.6  # 每张合约交易成本
     margin_ratio: float = 0.12  # 保证金比例
     stop_loss_ratio: float = 0.5  # 止损比例
+    fast_path: bool = True  # 价差/单腿卖出策略使用数组化快速回测路径
 
 
 @dataclass
@@ -123,8 +124,8 @@ class StrategyContext(BaseStrategyContext):
         # 返回可序列化的字典
         return {
             'etf_code': self.etf_code,
-            'start_date': self.start_date.strftime('%Y-%m-%d'),  # 格式化为只包含日期
-            'end_date': self.end_date.strftime('%Y-%m-%d'),  # 格式化为只包含日期
+            'start_date': self.start_date.strftime('%Y-%m-%d') if self.start_date else None,  # 格式化为只包含日期
+            'end_date': self.end_date.strftime('%Y-%m-%d') if self.end_date else None,  # 格式化为只包含日期
             'strategy_params': self.strategy_params if strategy_params is None else strategy_params
         }
 
@@ -253,6 +254,16 @@ class StrategyContextFactory:
                                                  end_date=end_date)
 
 
+        elif 'put_sell_delta' in sp and 'put_buy_delta' in sp:
+            from strategies.types import StrategyType
+            strategy_type = StrategyType.BULLISH_PUT
+            return DeltaBullishPutStrategyContext(strategy_type=strategy_type,
+                                                  sell_put_delta=sp['put_sell_delta'],
+                                                  buy_put_delta=sp['put_buy_delta'],
+                                                  etf_code=etf_code,
+                                                  start_date=start_date,
+                                                  end_date=end_date)
+
         elif 'put_sell_delta' in sp and 'put_buy_delta' not in sp:
             from strategies.types import StrategyType
             strategy_type = StrategyType.NAKED_PUT
@@ -95,7 +95,6 @@ class WheelStrategy(OptionStrategy):
         if expiry is None:
             return None
             
-        option_data = market_data['option']
         etf_data = market_data['etf']
         
         # 获取当前ETF价格
@@ -104,7 +103,7 @@ class WheelStrategy(OptionStrategy):
             return None
         
         # 获取当日期权数据
-        current_options = option_data[option_data['日期'] == current_date]
+        current_options = self._get_day_options(current_date, market_data)
         
         # 选择合适的期权
         sell_option, _ = self._select_options(current_options, current_etf_price, expiry)
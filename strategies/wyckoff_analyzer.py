@@ -56,6 +56,11 @@ class WyckoffAnalyzer:
         except Exception as e:
             return None, f"标准化数据失败: {str(e)}"
 
+    @staticmethod
+    def _date_format(df):
+        """日线只显示日期，分钟级周期 K 线（如 60m）附带时分"""
+        return '%Y-%m-%d %H:%M' if (df['date'].dt.hour != 0).any() else '%Y-%m-%d'
+
     def process_csv(self, file_stream):
         """处理上传的CSV文件"""
         try:
@@ -84,6 +89,7 @@ class WyckoffAnalyzer:
         signals = []
         n = len(df)
         window = 30 
+        date_fmt = self._date_format(df)
 
         for i in range(window, n):
             lookback = df.iloc[i-window:i]
@@ -103,7 +109,7 @@ class WyckoffAnalyzer:
             local_res = np.percentile(lookback['high'], 95)
             
             today = df.iloc[i]
-            date_str = today['date'].strftime('%Y-%m-%d')
+            date_str = today['date'].strftime(date_fmt)
 
             # --- 场景探测 ---
             if today['low'] < local_sup * 0.999 and today['close'] > local_sup * 0.998:
@@ -147,6 +153,7 @@ class WyckoffAnalyzer:
         """向左回溯搜索，找回完整的长横盘结构"""
         if not last_signal: return []
         
+        date_fmt = self._date_format(df)
         idx = last_signal['index']
         res = last_signal['trigger_res']
         sup = last_signal['trigger_sup']
@@ -175,8 +182,8 @@ class WyckoffAnalyzer:
             prior_trend = "Up"
 
         return [{
-            'name': '关键结构', 'start': df.iloc[start_idx]['date'].strftime('%Y-%m-%d'),
-            'end': df.iloc[end_idx]['date'].strftime('%Y-%m-%d'),
+            'name': '关键结构', 'start': df.iloc[start_idx]['date'].strftime(date_fmt),
+            'end': df.iloc[end_idx]['date'].strftime(date_fmt),
             'color': zone_color, 'support': float(sup), 'resistance': float(res),
             'type': prior_trend
         }]
@@ -203,7 +210,7 @@ class WyckoffAnalyzer:
             if current_close > last_sig['stop_loss']:
                 # 信号被证伪
                 latest_plan = {
-                    'date': df.iloc[-1]['date'].strftime('%Y-%m-%d'),
+                    'date': df.iloc[-1]['date'].strftime(self._date_format(df)),
                     'display_name': 'UT 信号失效',
                     'type': 'Neutral',
                     'logic': f"之前的 UT 卖点已被最新价格 {current_close:.2f} 突破（高于止损 {last_sig['stop_loss']:.2f}）。当前进入强势突破观察期。",
@@ -274,7 +281,7 @@ class WyckoffAnalyzer:
             }
 
         return {
-            'dates': df['date'].dt.strftime('%Y-%m-%d').tolist(),
+            'dates': df['date'].dt.strftime(self._date_format(df)).tolist(),
             'data': df[['open', 'close', 'low', 'high']].astype(float).values.tolist(),
             'volumes': [int(v) for v in df['volume'].tolist()],
             'trend_line': df['Trend_MA'].fillna('').tolist(),
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期权希腊字母 / 隐含波动率批量回填工具
+
+用途：
+1. 为 option_daily 表增加 implied_volatility 字段（如不存在）
+2. 按 ETF 整批读取缺失 Delta 或隐含波动率的合约，使用向量化 Black-Scholes 一次性求解：
+   - 隐含波动率：由收盘价反推
+   - Delta：使用反推得到的隐含波动率计算
+3. 批量写回数据库
+
+使用方法：
+1. 回填所有ETF缺失的数据：
+   python tools/option_greeks_backfill.py
+
+2. 回填指定ETF，并重算全部历史（覆盖已有值）：
+   python tools/option_greeks_backfill.py --etf 510050 510300 --all
+
+注意事项：
+1. 合约代码形如 510300P2401M03800，C/P 之后的4位为到期年月，到期日按当月第四个星期三计算
+2. 标的价格取 etf_daily 同日收盘价，缺少标的价格或已到期的合约跳过
+3. 违反无套利边界（价格低于内在价值等）的合约无法求解，隐含波动率保持为空
+4. 已有的交易所 Delta 只在 --all 时被覆盖
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.config import MARKET_DATA_DB
+from utils.option_utils import calculate_implied_volatility_vec, calculate_option_greeks_vec
+
+RISK_FREE_RATE = 0.02
+
+
+def ensure_iv_column(conn: sqlite3.Connection):
+    """option_daily 缺少隐含波动率字段时补充"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(option_daily)")]
+    if 'implied_volatility' not in columns:
+        conn.execute("ALTER TABLE option_daily ADD COLUMN implied_volatility REAL")
+        conn.commit()
+
+
+def parse_contracts(contract_codes: pd.Series) -> pd.DataFrame:
+    """
+    从合约代码解析期权类型和到期日
+
+    Returns:
+        DataFrame: is_call (bool), expiry (datetime64)，无法解析的到期日为 NaT
+    """
+    parts = contract_codes.str.extract(r'([CP])(\d{2})(\d{2})')
+    year = pd.to_numeric(parts[1], errors='coerce') + 2000
+    month = pd.to_numeric(parts[2], errors='coerce')
+    first_day = pd.to_datetime(
+        pd.DataFrame({'year': year, 'month': month, 'day': 1}), errors='coerce'
+    )
+    # 当月第四个星期三
+    offset = (2 - first_day.dt.weekday) % 7 + 21
+    expiry = first_day + pd.to_timedelta(offset, unit='D')
+    return pd.DataFrame({'is_call': parts[0] == 'C', 'expiry': expiry})
+
+
+def backfill_etf(conn: sqlite3.Connection, etf_code: str, overwrite: bool = False,
+                 risk_free_rate: float = RISK_FREE_RATE) -> int:
+    """
+    回填单个ETF的隐含波动率和Delta
+
+    Returns:
+        int: 更新的行数
+    """
+    condition = "" if overwrite else "AND (o.delta IS NULL OR o.implied_volatility IS NULL)"
+    df = pd.read_sql_query(
+        f"""
+            SELECT o.rowid AS rid, o.date, o.contract_code, o.close_price, o.strike_price,
+                   o.delta, o.implied_volatility, e.close_price AS spot
+            FROM option_daily o
+            JOIN etf_daily e ON e.etf_code = o.etf_code AND e.date = o.date
+            WHERE o.etf_code = ? {condition}
+        """,
+        conn,
+        params=(etf_code,)
+    )
+    if df.empty:
+        return 0
+
+    contracts = parse_contracts(df['contract_code'])
+    time_to_expiry = (contracts['expiry'] - pd.to_datetime(df['date'])).dt.days.values / 365.0
+    valid = (
+        contracts['expiry'].notna().values
+        & (time_to_expiry > 0)
+        & df['spot'].notna().values
+        & df['close_price'].notna().values
+        & df['strike_price'].notna().values
+    )
+    df = df[valid]
+    if df.empty:
+        return 0
+    time_to_expiry = time_to_expiry[valid]
+    is_call = contracts['is_call'].values[valid]
+
+    spot = df['spot'].values.astype(float)
+    strike = df['strike_price'].values.astype(float)
+    iv = calculate_implied_volatility_vec(
+        df['close_price'].values.astype(float), spot, strike, time_to_expiry, risk_free_rate, is_call
+    )
+    greeks = calculate_option_greeks_vec(spot, strike, time_to_expiry, iv, risk_free_rate, is_call)
+
+    # 未覆盖模式下保留已有值，只填补空缺
+    delta = greeks['delta']
+    if not overwrite:
+        existing_delta = df['delta'].values.astype(float)
+        existing_iv = df['implied_volatility'].values.astype(float)
+        delta = np.where(np.isnan(existing_delta), delta, existing_delta)
+        iv = np.where(np.isnan(existing_iv), iv, existing_iv)
+
+    updates = [
+        (None if np.isnan(d) else round(float(d), 6),
+         None if np.isnan(v) else round(float(v), 6),
+         int(rid))
+        for d, v, rid in zip(delta, iv, df['rid'].values)
+    ]
+    conn.executemany(
+        "UPDATE option_daily SET delta = ?, implied_volatility = ? WHERE rowid = ?",
+        updates
+    )
+    conn.commit()
+    return len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量回填期权隐含波动率和Delta')
+    parser.add_argument('--etf', nargs='*', help='ETF代码，不指定时处理全部')
+    parser.add_argument('--all', action='store_true', help='重算全部历史，覆盖已有值')
+    parser.add_argument('--db', default=MARKET_DATA_DB, help='数据库路径')
+    parser.add_argument('--rate', type=float, default=RISK_FREE_RATE, help='无风险利率')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        ensure_iv_column(conn)
+        etf_codes = args.etf or [
+            row[0] for row in conn.execute("SELECT DISTINCT etf_code FROM option_daily ORDER BY etf_code")
+        ]
+        for etf_code in etf_codes:
+            start = time.time()
+            count = backfill_etf(conn, etf_code, overwrite=args.all, risk_free_rate=args.rate)
+            print(f"{etf_code}: 更新 {count} 行，耗时 {time.time() - start:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
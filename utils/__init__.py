@@ -1,9 +1,11 @@
 from .error_handler import log_error, api_error_handler
 from .common import *  # 导出原utils.py中的所有功能
+from .expiry_calendar import ExpiryCalendar
 
 # 如果需要控制导出的内容，可以明确指定
 __all__ = [
     'log_error',
     'api_error_handler',
+    'ExpiryCalendar',
     # 添加原utils.py中的功能
 ] 
\ No newline at end of file
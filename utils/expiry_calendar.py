@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 到期日不是交易日时最多向后顺延的天数
+MAX_ROLL_DAYS = 10
+
+
+def fourth_wednesday(year: int, month: int) -> datetime:
+    """当月第四个星期三"""
+    first_day = datetime(year, month, 1)
+    return first_day + timedelta(days=(2 - first_day.weekday()) % 7 + 21)
+
+
+class ExpiryCalendar:
+    """期权月度到期日历
+
+    每个数据集构建一次：
+    1. 交易日保存为升序的 datetime64[D] 数组，查找时二分定位
+    2. 预先计算数据覆盖的每个月的到期日（第四个星期三，非交易日向后顺延，最多10天）
+    口径与 get_monthly_expiry / get_next_monthly_expiry 一致。
+    """
+
+    # ETF代码 -> 最近一次构建的日历，供多次回测复用
+    _cache: Dict[str, 'ExpiryCalendar'] = {}
+
+    def __init__(self, trading_dates: Iterable):
+        self.trading_days: np.ndarray = self._to_days(trading_dates)
+        self.max_date: Optional[pd.Timestamp] = (
+            pd.Timestamp(self.trading_days[-1]) if len(self.trading_days) else None
+        )
+        self._expiries: Dict[Tuple[int, int], Optional[datetime]] = {}
+
+        # 预计算数据覆盖的月份（含下一个月）
+        if len(self.trading_days):
+            first = pd.Timestamp(self.trading_days[0])
+            year, month = first.year, first.month
+            last = (self.max_date.year + 1, 1) if self.max_date.month == 12 else (self.max_date.year, self.max_date.month + 1)
+            while (year, month) <= last:
+                self._expiry(year, month)
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    @staticmethod
+    def _to_days(trading_dates: Iterable) -> np.ndarray:
+        """交易日转换为去重升序的 datetime64[D] 数组"""
+        days = pd.DatetimeIndex(pd.to_datetime(np.asarray(trading_dates))).values.astype('datetime64[D]')
+        return np.unique(days)
+
+    @classmethod
+    def from_option_data(cls, option_data: pd.DataFrame) -> 'ExpiryCalendar':
+        """从期权数据的日期列构建"""
+        return cls(option_data['日期'].unique())
+
+    @classmethod
+    def for_etf(cls, etf_code: str, trading_dates: Iterable) -> 'ExpiryCalendar':
+        """按ETF获取日历：已缓存的日历覆盖本次交易日时直接切片复用，否则重新构建并缓存"""
+        days = cls._to_days(trading_dates)
+        cached = cls._cache.get(etf_code)
+        if cached is not None and len(days):
+            if np.array_equal(cached.trading_days, days):
+                return cached
+            view = cached.slice(days[0], days[-1])
+            if np.array_equal(view.trading_days, days):
+                return view
+        calendar = cls(days)
+        if cached is None or len(days) >= len(cached.trading_days):
+            cls._cache[etf_code] = calendar
+        return calendar
+
+    def slice(self, start_date, end_date) -> 'ExpiryCalendar':
+        """截取日期范围内的交易日，得到与只加载该范围数据时一致的日历"""
+        lo = np.searchsorted(self.trading_days, np.datetime64(pd.Timestamp(start_date), 'D'), side='left')
+        hi = np.searchsorted(self.trading_days, np.datetime64(pd.Timestamp(end_date), 'D'), side='right')
+        return ExpiryCalendar(self.trading_days[lo:hi])
+
+    def _expiry(self, year: int, month: int) -> Optional[datetime]:
+        """某月的到期日（已顺延到交易日），10天内没有交易日返回None"""
+        key = (year, month)
+        if key not in self._expiries:
+            target = fourth_wednesday(year, month)
+            target_day = np.datetime64(target.date(), 'D')
+            idx = np.searchsorted(self.trading_days, target_day, side='left')
+            expiry = None
+            if idx < len(self.trading_days):
+                gap = int((self.trading_days[idx] - target_day).astype(np.int64))
+                if gap <= MAX_ROLL_DAYS:
+                    expiry = target + timedelta(days=gap)
+            self._expiries[key] = expiry
+        return self._expiries[key]
+
+    def monthly_expiry(self, current_date: datetime) -> datetime:
+        """当月到期日
+
+        Raises:
+            ValueError: 到期日之后10天内没有交易日
+        """
+        expiry = self._expiry(current_date.year, current_date.month)
+        if expiry is None:
+            raise ValueError(f"无法找到{fourth_wednesday(current_date.year, current_date.month)}之后的有效交易日")
+        return expiry
+
+    def next_monthly_expiry(self, date: datetime) -> Optional[datetime]:
+        """下月到期日，超出数据范围返回None"""
+        if self.max_date is None or date >= self.max_date:
+            print(f"警告: 当前日期 {date.strftime('%Y-%m-%d')} 已超出数据范围")
+            return None
+
+        year, month = (date.year + 1, 1) if date.month == 12 else (date.year, date.month + 1)
+        if datetime(year, month, 1) > self.max_date:
+            print(f"警告: 下月 {year}-{month:02d} 已超出数据范围")
+
+        expiry = self._expiry(year, month)
+        if expiry is None:
+            target = fourth_wednesday(year, month)
+            if target > self.max_date:
+                print(f"警告: 目标到期日 {target.strftime('%Y-%m-%d')} 已超出数据范围： {self.max_date.strftime('%Y-%m-%d')}")
+            else:
+                print(f"警告: 无法找到 {target.strftime('%Y-%m-%d')} 之后的有效交易日")
+        return expiry
+
+    def target_expiry(self, current_date: datetime, first_open: bool) -> Optional[datetime]:
+        """开仓目标到期日：首次开仓且未到当月到期日用当月，否则用下月"""
+        current_expiry = self.monthly_expiry(current_date)
+        if first_open and current_date < current_expiry:
+            return current_expiry
+        return self.next_monthly_expiry(current_date)
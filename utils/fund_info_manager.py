@@ -11,7 +11,7 @@ class FundInfoManager:
             db_path: 数据库文件路径
         """
         self.db = Database(db_path)
-        self._init_table()
+        self.db.init_schema_once('FundInfoManager', self._init_table)
         
     def _init_table(self):
         """初始化基金信息表"""
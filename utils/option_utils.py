@@ -1,5 +1,6 @@
 from typing import Optional, Tuple, List
 import numpy as np
+from scipy.special import ndtr
 from scipy.stats import norm
 
 def find_strike_price_by_volatility(
@@ -157,3 +158,189 @@ def calculate_implied_volatility(
             return None
     
     return None
+
+
+def _to_is_call(option_type) -> np.ndarray:
+    """期权类型数组转换为布尔数组（True 为看涨）
+
+    支持 'call'/'put'、'C'/'P'、'认购'/'认沽' 以及布尔值
+    """
+    arr = np.asarray(option_type)
+    if arr.dtype == bool:
+        return arr
+    arr = arr.astype(str)
+    return np.isin(np.char.lower(arr), ['call', 'c', '认购'])
+
+
+def black_scholes_price_vec(
+    spot_price,
+    strike_price,
+    time_to_expiry,
+    volatility,
+    risk_free_rate,
+    option_type
+) -> np.ndarray:
+    """
+    向量化 Black-Scholes 期权价格
+    
+    Args:
+        spot_price: 现货价格（数组或标量，下同）
+        strike_price: 行权价
+        time_to_expiry: 到期时间（年）
+        volatility: 波动率
+        risk_free_rate: 无风险利率
+        option_type: 期权类型数组 ('call'/'put' 等，见 _to_is_call)
+    
+    Returns:
+        np.ndarray: 期权理论价格
+    """
+    s = np.asarray(spot_price, dtype=float)
+    k = np.asarray(strike_price, dtype=float)
+    t = np.asarray(time_to_expiry, dtype=float)
+    v = np.asarray(volatility, dtype=float)
+    is_call = _to_is_call(option_type)
+
+    sqrt_t = np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(s / k) + (risk_free_rate + 0.5 * v ** 2) * t) / (v * sqrt_t)
+    d2 = d1 - v * sqrt_t
+    discount = k * np.exp(-risk_free_rate * t)
+
+    call_price = s * ndtr(d1) - discount * ndtr(d2)
+    put_price = discount * ndtr(-d2) - s * ndtr(-d1)
+    return np.where(is_call, call_price, put_price)
+
+
+def calculate_option_greeks_vec(
+    spot_price,
+    strike_price,
+    time_to_expiry,
+    volatility,
+    risk_free_rate,
+    option_type
+) -> dict:
+    """
+    向量化计算期权希腊字母，口径与 calculate_option_greeks 一致
+    
+    Returns:
+        dict: delta, gamma, theta, vega 数组
+    """
+    s = np.asarray(spot_price, dtype=float)
+    k = np.asarray(strike_price, dtype=float)
+    t = np.asarray(time_to_expiry, dtype=float)
+    v = np.asarray(volatility, dtype=float)
+    is_call = _to_is_call(option_type)
+
+    sqrt_t = np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(s / k) + (risk_free_rate + 0.5 * v ** 2) * t) / (v * sqrt_t)
+        d2 = d1 - v * sqrt_t
+
+        nd1 = ndtr(d1)
+        nd2 = ndtr(d2)
+        npd1 = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+
+        decay = -s * npd1 * v / (2 * sqrt_t)
+        carry = risk_free_rate * k * np.exp(-risk_free_rate * t)
+        delta = np.where(is_call, nd1, nd1 - 1)
+        theta = np.where(is_call, decay - carry * nd2, decay + carry * (1 - nd2))
+        gamma = npd1 / (s * v * sqrt_t)
+        vega = s * sqrt_t * npd1
+
+    return {
+        'delta': delta,
+        'gamma': gamma,
+        'theta': theta,
+        'vega': vega
+    }
+
+
+def calculate_implied_volatility_vec(
+    option_price,
+    spot_price,
+    strike_price,
+    time_to_expiry,
+    risk_free_rate,
+    option_type,
+    precision: float = 1.0e-5,
+    max_iterations: int = 100,
+    vol_lower: float = 1.0e-4,
+    vol_upper: float = 5.0
+) -> np.ndarray:
+    """
+    向量化计算隐含波动率（牛顿法 + 二分法混合）
+    
+    每个合约维护一个 [lo, hi] 区间：牛顿步落在区间内时采用牛顿步，否则退化为二分，
+    保证收敛；已收敛的合约被掩码剔除，后续迭代只计算未收敛部分。
+    
+    Args:
+        option_price: 期权价格数组
+        spot_price: 现货价格
+        strike_price: 行权价
+        time_to_expiry: 到期时间（年）
+        risk_free_rate: 无风险利率
+        option_type: 期权类型数组
+        precision: 价格误差收敛阈值（与 calculate_implied_volatility 一致）
+        max_iterations: 最大迭代次数
+        vol_lower / vol_upper: 波动率搜索区间
+    
+    Returns:
+        np.ndarray: 隐含波动率，违反无套利边界或无法收敛的为 NaN
+    """
+    price = np.atleast_1d(np.asarray(option_price, dtype=float))
+    n = len(price)
+    s = np.broadcast_to(np.asarray(spot_price, dtype=float), (n,))
+    k = np.broadcast_to(np.asarray(strike_price, dtype=float), (n,))
+    t = np.broadcast_to(np.asarray(time_to_expiry, dtype=float), (n,))
+    is_call = np.broadcast_to(_to_is_call(option_type), (n,))
+
+    result = np.full(n, np.nan)
+
+    # 无套利边界之外或输入无效的合约无解
+    discount = k * np.exp(-risk_free_rate * t)
+    lower_bound = np.where(is_call, np.maximum(s - discount, 0.0), np.maximum(discount - s, 0.0))
+    upper_bound = np.where(is_call, s, discount)
+    with np.errstate(invalid='ignore'):
+        valid = (
+            np.isfinite(price) & np.isfinite(s) & np.isfinite(k) & np.isfinite(t)
+            & (t > 0) & (s > 0) & (k > 0)
+            & (price > lower_bound) & (price < upper_bound)
+        )
+
+    idx = np.flatnonzero(valid)
+    if len(idx) == 0:
+        return result
+
+    lo = np.full(len(idx), vol_lower)
+    hi = np.full(len(idx), vol_upper)
+    vol = np.full(len(idx), 0.5)
+    p, ss, kk, tt, cc = price[idx], s[idx], k[idx], t[idx], is_call[idx]
+
+    active = np.ones(len(idx), dtype=bool)
+    for _ in range(max_iterations):
+        a = np.flatnonzero(active)
+        if len(a) == 0:
+            break
+
+        model = black_scholes_price_vec(ss[a], kk[a], tt[a], vol[a], risk_free_rate, cc[a])
+        diff = p[a] - model
+
+        converged = np.abs(diff) < precision
+        result[idx[a[converged]]] = vol[a[converged]]
+        active[a[converged]] = False
+
+        # 价格关于波动率单调递增，据此收缩区间
+        below = diff > 0
+        lo[a] = np.where(below, vol[a], lo[a])
+        hi[a] = np.where(below, hi[a], vol[a])
+
+        vega = ss[a] * np.sqrt(tt[a]) * np.exp(
+            -0.5 * ((np.log(ss[a] / kk[a]) + (risk_free_rate + 0.5 * vol[a] ** 2) * tt[a])
+                    / (vol[a] * np.sqrt(tt[a]))) ** 2
+        ) / np.sqrt(2 * np.pi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = vol[a] + diff / vega
+        use_newton = np.isfinite(newton) & (newton > lo[a]) & (newton < hi[a])
+        vol[a] = np.where(converged, vol[a], np.where(use_newton, newton, 0.5 * (lo[a] + hi[a])))
+
+    return result